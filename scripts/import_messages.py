@@ -0,0 +1,62 @@
+"""Import chat history into the messages table.
+
+Run: python -m scripts.import_messages history.jsonl
+
+One JSON object per line: conversation_id, role (user | bot), content, and
+optionally id, step_name and created_at (ISO 8601). The conversations must
+already exist. Rows are streamed with COPY in batches, all in one
+transaction — a bad line aborts the whole import.
+"""
+
+import asyncio
+import sys
+import uuid
+from datetime import datetime
+
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.config import settings
+from src.conversation.history import persist_messages_bulk
+
+BATCH_SIZE = 5000
+
+
+def _parse_line(line: bytes) -> dict:
+    """One history line → message dict for persist_messages_bulk()."""
+    message = orjson.loads(line)
+    if message.get("id"):
+        message["id"] = uuid.UUID(message["id"])
+    if message.get("created_at"):
+        message["created_at"] = datetime.fromisoformat(message["created_at"])
+    return message
+
+
+async def import_messages(path: str):
+    """Copy every message in `path` into the DB."""
+    engine = create_async_engine(settings.database_url)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession)
+    total = 0
+
+    async with session_factory() as session:
+        batch: list[dict] = []
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                batch.append(_parse_line(line))
+                if len(batch) >= BATCH_SIZE:
+                    total += await persist_messages_bulk(session, batch)
+                    batch = []
+                    print(f"  copied {total} messages")
+        total += await persist_messages_bulk(session, batch)
+        await session.commit()
+
+    await engine.dispose()
+    print(f"\nDone! Imported {total} messages")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m scripts.import_messages <history.jsonl>")
+    asyncio.run(import_messages(sys.argv[1]))
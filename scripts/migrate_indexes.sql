@@ -0,0 +1,35 @@
+-- Migration: Indexes for hot admin / webhook queries
+-- Run this on Supabase SQL Editor
+
+-- Admin login: newest active shop for an owner_telegram_id
+CREATE INDEX IF NOT EXISTS idx_shops_owner_tg_created
+    ON shops(owner_telegram_id, created_at DESC) WHERE is_active;
+
+-- Webhooks: active shop by bot token / WhatsApp number
+CREATE INDEX IF NOT EXISTS idx_shops_bot_token ON shops(telegram_bot_token) WHERE is_active;
+CREATE INDEX IF NOT EXISTS idx_shops_whatsapp_number ON shops(whatsapp_phone_number) WHERE is_active;
+
+-- Admin conversations search: trigram indexes for ILIKE '%term%'
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_conversations_customer_name_trgm ON conversations USING gin (customer_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_conversations_device_brand_trgm ON conversations USING gin (device_brand gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_conversations_device_model_trgm ON conversations USING gin (device_model gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_conversations_problem_description_trgm ON conversations USING gin (problem_description gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_leads_customer_name_trgm ON leads USING gin (customer_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_leads_device_full_name_trgm ON leads USING gin (device_full_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_leads_problem_summary_trgm ON leads USING gin (problem_summary gin_trgm_ops);
+
+-- Admin conversations list order + keyset pagination
+CREATE INDEX IF NOT EXISTS idx_conversations_shop_last_msg_id ON conversations(shop_id, last_message_at DESC NULLS LAST, id DESC);
+
+-- Status-filtered conversations list, same order. Supersedes the
+-- (shop_id, status) prefix index.
+CREATE INDEX IF NOT EXISTS idx_conversations_shop_status_last_msg
+    ON conversations(shop_id, status, last_message_at DESC NULLS LAST, id DESC);
+DROP INDEX IF EXISTS idx_conversations_shop_status;
+
+-- (shop_id, last_message_at DESC) sorts NULLs first and no longer matches
+-- any query; idx_conversations_shop_last_msg_id replaces it.
+DROP INDEX IF EXISTS idx_conversations_shop_last_msg;
@@ -2,6 +2,7 @@
 
 import asyncio
 
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 
 from src.config import settings
@@ -41,29 +42,33 @@ async def seed():
     session_factory = async_sessionmaker(engine, class_=AsyncSession)
 
     async with session_factory() as session:
-        # Seed device categories
-        category_map = {}
-        for cat_data in DEVICE_CATEGORIES:
-            cat = DeviceCategory(**cat_data)
-            session.add(cat)
-            await session.flush()
-            category_map[cat_data["slug"]] = cat.id
-            print(f"  + Category: {cat_data['name_ru']}")
-
-        # Seed repair types
-        for rt_data in REPAIR_TYPES:
-            cat_slug = rt_data.pop("category")
-            duration = rt_data.pop("duration")
-            rt = RepairType(
-                **rt_data,
-                device_category_id=category_map.get(cat_slug),
-                typical_duration_minutes=duration,
-            )
-            session.add(rt)
-            print(f"  + Repair: {rt_data['name_ru']}")
+        # Seed device categories — one INSERT ... RETURNING for all rows
+        result = await session.execute(
+            insert(DeviceCategory).returning(DeviceCategory.id, DeviceCategory.slug),
+            DEVICE_CATEGORIES,
+        )
+        category_map = {slug: cat_id for cat_id, slug in result.all()}
+
+        # Seed repair types — single bulk INSERT
+        rt_rows = [
+            {
+                "slug": rt["slug"],
+                "name_ru": rt["name_ru"],
+                "name_en": rt["name_en"],
+                "device_category_id": category_map.get(rt["category"]),
+                "typical_duration_minutes": rt["duration"],
+            }
+            for rt in REPAIR_TYPES
+        ]
+        await session.execute(insert(RepairType), rt_rows)
 
         await session.commit()
 
+    for cat_data in DEVICE_CATEGORIES:
+        print(f"  + Category: {cat_data['name_ru']}")
+    for rt_data in REPAIR_TYPES:
+        print(f"  + Repair: {rt_data['name_ru']}")
+
     await engine.dispose()
     print("\nSeed completed!")
 
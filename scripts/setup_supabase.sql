@@ -6,6 +6,9 @@
 -- Enable UUID extension
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- Trigram matching for admin search (ILIKE '%term%')
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- ============================================================
 -- SHOPS (multi-tenancy core)
 -- ============================================================
@@ -47,7 +50,9 @@ CREATE TABLE IF NOT EXISTS shops (
 );
 
 CREATE INDEX IF NOT EXISTS idx_shops_bot_token ON shops(telegram_bot_token) WHERE is_active;
+CREATE INDEX IF NOT EXISTS idx_shops_whatsapp_number ON shops(whatsapp_phone_number) WHERE is_active;
 CREATE INDEX IF NOT EXISTS idx_shops_owner_tg ON shops(owner_telegram_id) WHERE is_active;
+CREATE INDEX IF NOT EXISTS idx_shops_owner_tg_created ON shops(owner_telegram_id, created_at DESC) WHERE is_active;
 
 -- ============================================================
 -- DEVICE CATEGORIES (global reference)
@@ -151,8 +156,12 @@ CREATE TABLE IF NOT EXISTS conversations (
     updated_at      TIMESTAMPTZ DEFAULT NOW()
 );
 
-CREATE INDEX IF NOT EXISTS idx_conversations_shop_status ON conversations(shop_id, status);
-CREATE INDEX IF NOT EXISTS idx_conversations_shop_last_msg ON conversations(shop_id, last_message_at DESC);
+CREATE INDEX IF NOT EXISTS idx_conversations_shop_status_last_msg ON conversations(shop_id, status, last_message_at DESC NULLS LAST, id DESC);
+CREATE INDEX IF NOT EXISTS idx_conversations_shop_last_msg_id ON conversations(shop_id, last_message_at DESC NULLS LAST, id DESC);
+CREATE INDEX IF NOT EXISTS idx_conversations_customer_name_trgm ON conversations USING gin (customer_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_conversations_device_brand_trgm ON conversations USING gin (device_brand gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_conversations_device_model_trgm ON conversations USING gin (device_model gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_conversations_problem_description_trgm ON conversations USING gin (problem_description gin_trgm_ops);
 
 -- ============================================================
 -- MESSAGES
@@ -195,6 +204,9 @@ CREATE TABLE IF NOT EXISTS leads (
 );
 
 CREATE INDEX IF NOT EXISTS idx_leads_shop ON leads(shop_id, status, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_leads_customer_name_trgm ON leads USING gin (customer_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_leads_device_full_name_trgm ON leads USING gin (device_full_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_leads_problem_summary_trgm ON leads USING gin (problem_summary gin_trgm_ops);
 
 -- ============================================================
 -- APPOINTMENTS
@@ -2,12 +2,13 @@
 
 from __future__ import annotations
 
+import functools
 import hashlib
 import hmac
-import json
 import secrets
 from typing import Optional
 
+import orjson
 import structlog
 from redis.asyncio import Redis
 
@@ -15,6 +16,17 @@ logger = structlog.get_logger()
 
 SESSION_TTL = 86400  # 24 hours
 SESSION_PREFIX = "admin_session:"
+# Set of a shop's session tokens, so they can all be revoked at once
+SHOP_SESSIONS_PREFIX = "admin_shop_sessions:"
+
+
+@functools.lru_cache(maxsize=256)
+def _telegram_secret_key(bot_token: str) -> bytes:
+    """Return SHA256(bot_token) — the HMAC key for Telegram Login checks.
+
+    Bot tokens are stable per shop, so the digest is memoized.
+    """
+    return hashlib.sha256(bot_token.encode("utf-8")).digest()
 
 
 def verify_telegram_login(data: dict, bot_token: str) -> bool:
@@ -35,18 +47,13 @@ def verify_telegram_login(data: dict, bot_token: str) -> bool:
         return False
 
     # Build data-check-string: all fields except hash, sorted alphabetically
-    filtered = {k: v for k, v in data.items() if k != "hash"}
-    data_check_string = "\n".join(
-        f"{k}={v}" for k, v in sorted(filtered.items())
-    )
-
-    # Secret key = SHA256(bot_token)
-    secret_key = hashlib.sha256(bot_token.encode("utf-8")).digest()
+    items = sorted((k, v) for k, v in data.items() if k != "hash")
+    payload = "\n".join(f"{k}={v}" for k, v in items).encode("utf-8")
 
-    # HMAC-SHA256
+    # HMAC-SHA256 with secret key = SHA256(bot_token)
     computed_hash = hmac.new(
-        secret_key,
-        data_check_string.encode("utf-8"),
+        _telegram_secret_key(bot_token),
+        payload,
         hashlib.sha256,
     ).hexdigest()
 
@@ -58,30 +65,39 @@ async def create_session(
     shop_id: str,
     telegram_id: int,
     shop_name: str = "",
+    is_active: bool = True,
 ) -> str:
     """Create admin session in Redis.
 
+    The session carries a snapshot of the shop fields the admin UI needs
+    on every page, so authenticated requests don't have to hit the DB.
+
     Args:
         redis: Redis client
         shop_id: UUID of the shop
         telegram_id: Owner's Telegram user ID
         shop_name: Shop name for display
+        is_active: Whether the shop is active
 
     Returns:
         Session token (random string)
     """
     token = secrets.token_urlsafe(32)
-    session_data = json.dumps({
+    session_data = orjson.dumps({
         "shop_id": shop_id,
         "telegram_id": telegram_id,
         "shop_name": shop_name,
+        "is_active": is_active,
     })
 
-    await redis.setex(
-        f"{SESSION_PREFIX}{token}",
-        SESSION_TTL,
-        session_data,
-    )
+    # The index lives as long as the shop's newest session; tokens of
+    # expired sessions left in it are harmless
+    index_key = f"{SHOP_SESSIONS_PREFIX}{shop_id}"
+    pipe = redis.pipeline()
+    pipe.setex(f"{SESSION_PREFIX}{token}", SESSION_TTL, session_data)
+    pipe.sadd(index_key, token)
+    pipe.expire(index_key, SESSION_TTL)
+    await pipe.execute()
 
     logger.info(
         "admin_session_created",
@@ -110,11 +126,33 @@ async def get_session(redis: Redis, token: str) -> Optional[dict]:
         return None
 
     try:
-        return json.loads(data)
-    except (json.JSONDecodeError, TypeError):
+        return orjson.loads(data)
+    except (orjson.JSONDecodeError, TypeError):
         return None
 
 
+async def update_session(redis: Redis, token: str, **fields) -> None:
+    """Merge fields into an existing session, keeping its remaining TTL.
+
+    Used to refresh the shop snapshot after the shop is edited.
+    """
+    session = await get_session(redis, token)
+    if not session:
+        return
+
+    session.update(fields)
+    await redis.set(f"{SESSION_PREFIX}{token}", orjson.dumps(session), keepttl=True)
+
+
 async def delete_session(redis: Redis, token: str) -> None:
     """Delete admin session from Redis."""
     await redis.delete(f"{SESSION_PREFIX}{token}")
+
+
+async def delete_shop_sessions(redis: Redis, shop_id: str) -> int:
+    """Revoke every admin session of a shop. Returns how many tokens were indexed."""
+    index_key = f"{SHOP_SESSIONS_PREFIX}{shop_id}"
+    tokens = await redis.smembers(index_key)
+    await redis.delete(index_key, *(f"{SESSION_PREFIX}{token}" for token in tokens))
+    logger.info("admin_sessions_revoked", shop_id=shop_id, count=len(tokens))
+    return len(tokens)
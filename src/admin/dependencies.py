@@ -2,35 +2,61 @@
 
 from __future__ import annotations
 
+import uuid
+from dataclasses import dataclass
 from typing import Optional
 
 import structlog
+from cachetools import TTLCache
 from fastapi import Cookie, Depends, Request
-from fastapi.responses import RedirectResponse
-from sqlalchemy import select
+from redis.asyncio import Redis
+from sqlalchemy import bindparam, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.admin.auth import get_session
-from src.database import get_db
+from src.database import async_session_factory, get_db
 from src.models.shop import Shop
 from src.redis_client import get_redis
 
 logger = structlog.get_logger()
 
+# The session snapshot is taken at login and never refreshed, so whether the
+# shop is still active is re-checked against the DB — a primary-key lookup,
+# remembered per process for SHOP_ACTIVE_CACHE_TTL. Deactivating a shop locks
+# its admins out within that window.
+SHOP_ACTIVE_CACHE_TTL = 30  # seconds
+_active_shops: TTLCache = TTLCache(maxsize=1024, ttl=SHOP_ACTIVE_CACHE_TTL)
+_SHOP_IS_ACTIVE = select(Shop.is_active).where(Shop.id == bindparam("shop_id"))
+
+
+@dataclass(frozen=True)
+class ShopProxy:
+    """Lightweight shop snapshot built from the admin session.
+
+    Carries only the fields most admin pages need (id for scoping
+    queries, name for the sidebar). Routes that need other shop fields
+    should depend on `get_current_shop_full` instead.
+    """
+
+    id: uuid.UUID
+    name: str
+    is_active: bool = True
+
 
 async def get_current_shop(
     request: Request,
     admin_token: Optional[str] = Cookie(None),
-    db: AsyncSession = Depends(get_db),
-) -> Optional[Shop]:
+    redis: Redis = Depends(get_redis),
+) -> Optional[ShopProxy]:
     """Get the currently authenticated shop from session cookie.
 
+    Built from the Redis session snapshot; only the shop's active flag is
+    checked against the DB (cached briefly).
     Returns None if not authenticated (views should redirect to login).
     """
     if not admin_token:
         return None
 
-    redis = await get_redis()
     session = await get_session(redis, admin_token)
     if not session:
         return None
@@ -39,17 +65,52 @@ async def get_current_shop(
     if not shop_id:
         return None
 
-    result = await db.execute(
-        select(Shop).where(Shop.id == shop_id, Shop.is_active == True)  # noqa: E712
-    )
-    shop = result.scalar_one_or_none()
+    try:
+        shop = ShopProxy(
+            id=uuid.UUID(shop_id),
+            name=session.get("shop_name") or "",
+        )
+    except ValueError:
+        return None
 
+    if not await _shop_is_active(shop.id):
+        return None
     return shop
 
 
+async def _shop_is_active(shop_id: uuid.UUID) -> bool:
+    """Whether the shop exists and is active, cached for SHOP_ACTIVE_CACHE_TTL."""
+    active = _active_shops.get(shop_id)
+    if active is None:
+        # Own short session: only cache misses touch the DB
+        async with async_session_factory() as db:
+            result = await db.execute(_SHOP_IS_ACTIVE, {"shop_id": shop_id})
+            active = bool(result.scalar_one_or_none())
+        _active_shops[shop_id] = active
+    return active
+
+
+async def get_current_shop_full(
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
+    db: AsyncSession = Depends(get_db),
+) -> Optional[Shop]:
+    """Load the full Shop row for the authenticated session.
+
+    Use in routes that need fields beyond the session snapshot
+    (bot token, settings, working hours).
+    """
+    if shop is None:
+        return None
+
+    result = await db.execute(
+        select(Shop).where(Shop.id == shop.id, Shop.is_active == True)  # noqa: E712
+    )
+    return result.scalar_one_or_none()
+
+
 async def require_auth(
     request: Request,
-    shop: Optional[Shop] = Depends(get_current_shop),
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
 ):
     """Dependency that redirects to login if not authenticated.
 
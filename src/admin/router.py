@@ -2,11 +2,13 @@
 
 from __future__ import annotations
 
+from http.cookies import SimpleCookie
+
 import structlog
-from fastapi import APIRouter, Cookie, Depends, Form, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy import select
+from fastapi import APIRouter, Cookie, Depends, Request
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
+from redis.asyncio import Redis
+from sqlalchemy import bindparam, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
@@ -15,7 +17,8 @@ from src.admin.auth import (
     delete_session,
     verify_telegram_login,
 )
-from src.admin.dependencies import get_current_shop
+from src.admin.dependencies import ShopProxy, get_current_shop
+from src.admin.templating import templates
 from src.config import settings
 from src.database import get_db
 from src.models.shop import Shop
@@ -25,12 +28,6 @@ logger = structlog.get_logger()
 
 router = APIRouter(prefix="/admin", tags=["admin-panel"])
 
-# Templates directory relative to this file
-import pathlib
-
-TEMPLATES_DIR = pathlib.Path(__file__).parent / "templates"
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
-
 
 @router.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
@@ -40,47 +37,74 @@ async def login_page(request: Request):
     })
 
 
-@router.post("/auth/telegram")
-async def telegram_auth(
-    request: Request,
-    db: AsyncSession = Depends(get_db),
-):
-    """Handle Telegram Login Widget callback.
+# Newest active shop owned by a Telegram user — built once, reused per login
+_OWNER_SHOP = (
+    select(Shop)
+    .where(
+        Shop.owner_telegram_id == bindparam("telegram_id"),
+        Shop.is_active == True,  # noqa: E712
+    )
+    .order_by(Shop.created_at.desc())
+    .limit(1)
+)
 
-    Telegram sends data as query params or form data.
-    We verify the hash and create a session.
-    """
-    # Get auth data from form or query params
-    form = await request.form()
-    auth_data = dict(form)
+SESSION_COOKIE = "admin_token"
+_SESSION_COOKIE_ATTRS = "; HttpOnly; Max-Age=86400; Path=/; SameSite=lax; Secure"  # 24 hours
 
-    if not auth_data or "id" not in auth_data:
-        # Try query params
-        auth_data = dict(request.query_params)
 
+def _session_cookie(token: str) -> str:
+    """Set-Cookie value for the admin session (same attributes as set_cookie)."""
+    cookie = SimpleCookie()
+    cookie[SESSION_COOKIE] = token
+    return cookie[SESSION_COOKIE].OutputString() + _SESSION_COOKIE_ATTRS
+
+
+_LOGIN_ERRORS = {
+    "no_data": "Не удалось получить данные авторизации",
+    "shop_not_found": (
+        "Мастерская не найдена. Убедитесь, что ваш Telegram ID привязан к мастерской."
+    ),
+    "invalid_hash": "Ошибка проверки авторизации. Попробуйте ещё раз.",
+}
+
+
+def _login_error(request: Request, code: str, error_redirect: bool) -> Response:
+    """Render the login page with an error, or redirect back to it."""
+    if error_redirect:
+        if code == "no_data":
+            return RedirectResponse(url="/admin/login")
+        return RedirectResponse(url=f"/admin/login?error={code}")
+    return templates.TemplateResponse("login.html", {
+        "request": request,
+        "error": _LOGIN_ERRORS[code],
+    })
+
+
+async def _perform_login(
+    request: Request,
+    auth_data: dict,
+    db: AsyncSession,
+    redis: Redis,
+    error_redirect: bool,
+) -> Response:
+    """Verify Telegram auth data, create a session and redirect to the panel.
+
+    Args:
+        auth_data: Telegram Login Widget fields (id, auth_date, hash, ...)
+        error_redirect: On failure redirect to /admin/login?error=...
+            instead of rendering the login page (GET redirect mode).
+    """
     if not auth_data or "id" not in auth_data:
-        return templates.TemplateResponse("login.html", {
-            "request": request,
-            "error": "Не удалось получить данные авторизации",
-        })
+        return _login_error(request, "no_data", error_redirect)
 
     telegram_id = int(auth_data["id"])
 
-    # Find shop by owner_telegram_id (use first() to handle multiple shops)
-    result = await db.execute(
-        select(Shop).where(
-            Shop.owner_telegram_id == telegram_id,
-            Shop.is_active == True,  # noqa: E712
-        ).order_by(Shop.created_at.desc())
-    )
-    shop = result.scalars().first()
+    result = await db.execute(_OWNER_SHOP, {"telegram_id": telegram_id})
+    shop = result.scalar_one_or_none()
 
     if not shop:
         logger.warning("admin_login_no_shop", telegram_id=telegram_id)
-        return templates.TemplateResponse("login.html", {
-            "request": request,
-            "error": "Мастерская не найдена. Убедитесь, что ваш Telegram ID привязан к мастерской.",
-        })
+        return _login_error(request, "shop_not_found", error_redirect)
 
     # Verify Telegram login hash (dev bypass only in development environment)
     is_dev_login = (
@@ -90,110 +114,84 @@ async def telegram_auth(
     if shop.telegram_bot_token and not is_dev_login:
         if not verify_telegram_login(auth_data, shop.telegram_bot_token):
             logger.warning("admin_login_invalid_hash", telegram_id=telegram_id)
-            return templates.TemplateResponse("login.html", {
-                "request": request,
-                "error": "Ошибка проверки авторизации. Попробуйте ещё раз.",
-            })
+            return _login_error(request, "invalid_hash", error_redirect)
 
     if is_dev_login:
         logger.info("admin_dev_login", telegram_id=telegram_id)
 
     # Create session
-    redis = await get_redis()
     token = await create_session(
         redis=redis,
         shop_id=str(shop.id),
         telegram_id=telegram_id,
         shop_name=shop.name,
+        is_active=shop.is_active,
     )
 
     # Set cookie and redirect
-    response = RedirectResponse(url="/admin/leads", status_code=303)
-    response.set_cookie(
-        key="admin_token",
-        value=token,
-        httponly=True,
-        secure=True,
-        samesite="lax",
-        max_age=86400,  # 24 hours
+    response = RedirectResponse(
+        url="/admin/conversations",
+        status_code=303,
+        headers={"set-cookie": _session_cookie(token)},
     )
 
     logger.info("admin_login_success", shop_id=str(shop.id), shop_name=shop.name)
     return response
 
 
-@router.get("/auth/telegram")
-async def telegram_auth_get(
+@router.post("/auth/telegram")
+async def telegram_auth(
     request: Request,
     db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
 ):
-    """Handle Telegram Login Widget callback via GET (redirect mode)."""
-    # Telegram Login Widget can redirect with query params
-    auth_data = dict(request.query_params)
+    """Handle Telegram Login Widget callback.
 
-    if not auth_data or "id" not in auth_data:
-        return RedirectResponse(url="/admin/login")
+    Telegram sends data as query params or form data.
+    We verify the hash and create a session.
+    """
+    # Get auth data from form or query params
+    form = await request.form()
+    auth_data = dict(form)
 
-    telegram_id = int(auth_data["id"])
+    if not auth_data or "id" not in auth_data:
+        # Try query params
+        auth_data = dict(request.query_params)
 
-    result = await db.execute(
-        select(Shop).where(
-            Shop.owner_telegram_id == telegram_id,
-            Shop.is_active == True,  # noqa: E712
-        ).order_by(Shop.created_at.desc())
-    )
-    shop = result.scalars().first()
+    return await _perform_login(request, auth_data, db, redis, error_redirect=False)
 
-    if not shop:
-        return RedirectResponse(url="/admin/login?error=shop_not_found")
 
-    is_dev_login = (
-        str(auth_data.get("auth_date", "")) == "0"
-        and settings.environment == "development"
-    )
-    if shop.telegram_bot_token and not is_dev_login:
-        if not verify_telegram_login(auth_data, shop.telegram_bot_token):
-            return RedirectResponse(url="/admin/login?error=invalid_hash")
-
-    redis = await get_redis()
-    token = await create_session(
-        redis=redis,
-        shop_id=str(shop.id),
-        telegram_id=telegram_id,
-        shop_name=shop.name,
-    )
-
-    response = RedirectResponse(url="/admin/leads", status_code=303)
-    response.set_cookie(
-        key="admin_token",
-        value=token,
-        httponly=True,
-        secure=True,
-        samesite="lax",
-        max_age=86400,
-    )
-    return response
+@router.get("/auth/telegram")
+async def telegram_auth_get(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+):
+    """Handle Telegram Login Widget callback via GET (redirect mode)."""
+    # Telegram Login Widget can redirect with query params
+    auth_data = dict(request.query_params)
+    return await _perform_login(request, auth_data, db, redis, error_redirect=True)
 
 
 @router.get("/logout")
 async def logout(
     admin_token: Optional[str] = Cookie(None),
+    redis: Redis = Depends(get_redis),
 ):
     """Clear session and redirect to login."""
     if admin_token:
-        redis = await get_redis()
         await delete_session(redis, admin_token)
 
     response = RedirectResponse(url="/admin/login", status_code=303)
-    response.delete_cookie("admin_token")
+    response.delete_cookie(SESSION_COOKIE)
     return response
 
 
 @router.get("/", response_class=HTMLResponse)
 async def admin_root(
-    shop: Optional[Shop] = Depends(get_current_shop),
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
 ):
-    """Redirect to leads or login."""
+    """Redirect to clients or login."""
     if shop is None:
         return RedirectResponse(url="/admin/login")
-    return RedirectResponse(url="/admin/leads")
+    return RedirectResponse(url="/admin/conversations")
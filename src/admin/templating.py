@@ -0,0 +1,37 @@
+"""Shared Jinja2 environment for all admin panel views."""
+
+from __future__ import annotations
+
+import pathlib
+
+import structlog
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+
+from src.config import settings
+
+logger = structlog.get_logger()
+
+TEMPLATES_DIR = pathlib.Path(__file__).parent / "templates"
+
+# One environment for the whole panel, so each template is compiled once
+# per process. Outside development templates don't change on disk: skip the
+# per-render mtime check and keep every compiled template (cache_size=-1).
+# The bytecode cache lets a restarted worker skip recompiling.
+_env = Environment(
+    loader=FileSystemLoader(str(TEMPLATES_DIR)),
+    autoescape=select_autoescape(),
+    auto_reload=settings.environment == "development",
+    cache_size=-1,
+    bytecode_cache=FileSystemBytecodeCache(),
+)
+
+templates = Jinja2Templates(env=_env)
+
+
+def warm_templates() -> None:
+    """Compile every admin template up front (called at startup)."""
+    names = _env.list_templates(extensions=["html"])
+    for name in names:
+        _env.get_template(name)
+    logger.info("admin_templates_compiled", count=len(names))
@@ -1,30 +1,56 @@
-"""Master chat views — takeover, release, send messages, polling."""
+"""Master chat views — takeover, release, send messages, live updates."""
 
 from __future__ import annotations
 
+import re
 import uuid
-import pathlib
-from datetime import datetime, timezone
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
 from typing import Optional
 
+import orjson
 import structlog
-from fastapi import APIRouter, Depends, Form, Query, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy import select, update as sa_update
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, Query, Request
+from fastapi.responses import HTMLResponse, StreamingResponse
+from redis.asyncio import Redis
+from sqlalchemy import and_, bindparam, insert, or_, select, true, update as sa_update
 from sqlalchemy.ext.asyncio import AsyncSession
-
-from src.admin.dependencies import get_current_shop
-from src.database import get_db
+from sqlalchemy.orm import aliased
+
+from src.admin.dependencies import ShopProxy, get_current_shop
+from src.admin.templating import templates
+from src.bot.factory import get_or_create_bot
+from src.config import settings
+from src.conversation.events import conversation_channel
+from src.conversation.session import SessionManager
+from src.database import async_session_factory, get_db
 from src.models.conversation import Conversation, Message
 from src.models.shop import Shop
+from src.redis_client import get_redis
 
 logger = structlog.get_logger()
 
 router = APIRouter(prefix="/admin/chat", tags=["admin-chat"])
 
-TEMPLATES_DIR = pathlib.Path(__file__).parent.parent / "templates"
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+# How many messages the chat panel shows at once (older ones load on demand)
+CHAT_PANEL_MESSAGE_LIMIT = 50
+
+# Canonical UUID text form — checked before uuid.UUID() so garbage IDs
+# are rejected without raising and catching ValueError
+_UUID_RE = re.compile(
+    r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
+)
+
+# Seconds between SSE keep-alive comments when no messages arrive
+STREAM_KEEPALIVE_SECONDS = 15.0
+
+# Telegram rejects messages longer than this
+MAX_MESSAGE_LENGTH = 4096
+
+# Notices sent to the customer when a master takes over / hands back
+TAKEOVER_NOTICE = "Сейчас с вами свяжется наш специалист 👨‍🔧"
+RELEASE_NOTICE = "Спасибо за ожидание! Бот снова на связи 🤖"
 
 # Quick reply templates
 QUICK_REPLIES: dict[str, str] = {
@@ -35,15 +61,121 @@ QUICK_REPLIES: dict[str, str] = {
     "will_call": "Наш мастер перезвонит вам в ближайшее время.",
 }
 
+# ─── Prebuilt statements ─────────────────────────────────────────────────────
+# Built once at import and executed with bind parameters, so SQLAlchemy's
+# compiled cache and asyncpg's prepared-statement cache are hit every time.
+
+_CONVERSATION_FOR_SHOP = select(Conversation).where(
+    Conversation.id == bindparam("conversation_id"),
+    Conversation.shop_id == bindparam("shop_id"),
+)
+
+_recent_messages = (
+    select(Message)
+    .where(Message.conversation_id == Conversation.id)
+    .order_by(Message.created_at.desc())
+    .limit(CHAT_PANEL_MESSAGE_LIMIT)
+    .lateral("recent_messages")
+)
+_RecentMessage = aliased(Message, _recent_messages)
+
+_CONVERSATION_WITH_MESSAGES = (
+    select(Conversation, _RecentMessage)
+    .outerjoin(_recent_messages, true())
+    .where(
+        Conversation.id == bindparam("conversation_id"),
+        Conversation.shop_id == bindparam("shop_id"),
+    )
+    .order_by(_recent_messages.c.created_at.asc())
+)
+
+_SHOP_BOT_TOKEN = select(Shop.telegram_bot_token).where(Shop.id == bindparam("shop_id"))
+
+_INSERT_MESSAGE = insert(Message).returning(Message)
+
+_SET_CONVERSATION_MODE = (
+    sa_update(Conversation)
+    .where(Conversation.id == bindparam("conversation_id"))
+    .values(
+        mode=bindparam("new_mode"),
+        status=bindparam("new_status"),
+        last_message_at=bindparam("ts"),
+    )
+    .returning(Conversation)
+    .execution_options(populate_existing=True)
+)
+
+_TOUCH_CONVERSATION = (
+    sa_update(Conversation)
+    .where(Conversation.id == bindparam("conversation_id"))
+    .values(last_message_at=bindparam("ts"))
+    .execution_options(synchronize_session=False)
+)
+
+_POLL_MESSAGES = (
+    select(Message)
+    .join(Conversation, Message.conversation_id == Conversation.id)
+    .where(
+        Message.conversation_id == bindparam("conversation_id"),
+        Conversation.shop_id == bindparam("shop_id"),
+    )
+    .order_by(Message.created_at.asc())
+)
+_POLL_MESSAGES_AFTER = _POLL_MESSAGES.where(Message.created_at > bindparam("after"))
+
+# One page of history, newest first, ownership-checked. Fetches one extra
+# row to tell whether anything older remains. Ordered by (created_at, id)
+# so messages saved in the same transaction page deterministically.
+_HISTORY_PAGE = (
+    select(Message)
+    .join(Conversation, Message.conversation_id == Conversation.id)
+    .where(
+        Message.conversation_id == bindparam("conversation_id"),
+        Conversation.shop_id == bindparam("shop_id"),
+    )
+    .order_by(Message.created_at.desc(), Message.id.desc())
+    .limit(CHAT_PANEL_MESSAGE_LIMIT + 1)
+)
+_HISTORY_PAGE_BEFORE = _HISTORY_PAGE.where(
+    or_(
+        Message.created_at < bindparam("before"),
+        and_(
+            Message.created_at == bindparam("before"),
+            Message.id < bindparam("before_id"),
+        ),
+    )
+)
+
+
+def _resolve_quick_reply(template: str) -> Optional[str]:
+    """Return the quick-reply text for a template key, or None if unknown."""
+    return QUICK_REPLIES.get(template)
+
 
-async def send_telegram_message(shop: Shop, user_id: str, text: str) -> bool:
+def _clean_message_text(text: str) -> Optional[str]:
+    """Strip master input; None if nothing is left to send."""
+    return text.strip() or None
+
+
+async def _get_bot_token(shop_id: uuid.UUID) -> Optional[str]:
+    """Load the shop's bot token on a short-lived session of its own.
+
+    Chat routes only carry the session's ShopProxy; the token is needed
+    only by the background send, so it's read there, off the request path.
+    """
+    async with async_session_factory() as session:
+        result = await session.execute(_SHOP_BOT_TOKEN, {"shop_id": shop_id})
+        return result.scalar_one_or_none()
+
+
+async def send_telegram_message(shop_id: uuid.UUID, user_id: str, text: str) -> bool:
     """Send a message to a Telegram user via the shop's bot."""
-    from src.bot.factory import get_or_create_bot
-    if not shop.telegram_bot_token:
-        logger.warning("send_telegram_no_token", shop_id=str(shop.id))
-        return False
     try:
-        bot = await get_or_create_bot(shop.telegram_bot_token)
+        bot_token = await _get_bot_token(shop_id)
+        if not bot_token:
+            logger.warning("send_telegram_no_token", shop_id=str(shop_id))
+            return False
+        bot = await get_or_create_bot(bot_token)
         await bot.send_message(chat_id=int(user_id), text=text)
         return True
     except Exception as e:
@@ -51,18 +183,18 @@ async def send_telegram_message(shop: Shop, user_id: str, text: str) -> bool:
             "send_telegram_error",
             error=str(e),
             user_id=user_id,
-            shop_id=str(shop.id),
+            shop_id=str(shop_id),
         )
         return False
 
 
-async def send_whatsapp_message(shop: Shop, user_phone: str, text: str) -> bool:
+async def send_whatsapp_message(shop_id: uuid.UUID, user_phone: str, text: str) -> bool:
     """Send a message to a WhatsApp user via Twilio."""
     from src.whatsapp.client import get_whatsapp_client
 
     wa_client = get_whatsapp_client()
     if not wa_client:
-        logger.warning("send_whatsapp_no_client", shop_id=str(shop.id))
+        logger.warning("send_whatsapp_no_client", shop_id=str(shop_id))
         return False
     try:
         await wa_client.send_message(user_phone, text)
@@ -72,40 +204,48 @@ async def send_whatsapp_message(shop: Shop, user_phone: str, text: str) -> bool:
             "send_whatsapp_error",
             error=str(e),
             user_phone=user_phone,
-            shop_id=str(shop.id),
+            shop_id=str(shop_id),
         )
         return False
 
 
 async def send_to_channel(
-    shop: Shop, conversation: Conversation, text: str
+    shop_id: uuid.UUID, conversation: Conversation, text: str
 ) -> bool:
-    """Send a message to the customer via the appropriate channel."""
+    """Send a message to the customer via the appropriate channel.
+
+    Runs as a background task after the HTTP response; failures are
+    logged by the channel senders and never raised.
+    """
     if conversation.channel == "whatsapp":
         return await send_whatsapp_message(
-            shop, conversation.external_user_id, text
+            shop_id, conversation.external_user_id, text
         )
     return await send_telegram_message(
-        shop, conversation.external_user_id, text
+        shop_id, conversation.external_user_id, text
     )
 
 
+def _parse_conversation_id(conversation_id: str) -> Optional[uuid.UUID]:
+    """Parse a conversation ID from the URL, or None if it isn't a UUID."""
+    if not _UUID_RE.match(conversation_id):
+        return None
+    return uuid.UUID(conversation_id)
+
+
 async def _get_conversation_for_shop(
     conversation_id: str,
-    shop: Shop,
+    shop: ShopProxy,
     db: AsyncSession,
 ) -> Optional[Conversation]:
     """Fetch conversation and verify it belongs to the current shop."""
-    try:
-        conv_uuid = uuid.UUID(conversation_id)
-    except ValueError:
+    conv_uuid = _parse_conversation_id(conversation_id)
+    if conv_uuid is None:
         return None
 
     result = await db.execute(
-        select(Conversation).where(
-            Conversation.id == conv_uuid,
-            Conversation.shop_id == shop.id,
-        )
+        _CONVERSATION_FOR_SHOP,
+        {"conversation_id": conv_uuid, "shop_id": shop.id},
     )
     return result.scalar_one_or_none()
 
@@ -117,24 +257,125 @@ async def _save_message(
     content: str,
     step_name: str = "human_chat",
 ) -> Message:
-    """Save a message to the database and return it."""
-    msg = Message(
-        conversation_id=conversation_id,
-        role=role,
-        content=content,
-        step_name=step_name,
+    """Insert a message and return it — generated columns come back via RETURNING."""
+    result = await db.execute(
+        _INSERT_MESSAGE,
+        {
+            "conversation_id": conversation_id,
+            "role": role,
+            "content": content,
+            "step_name": step_name,
+        },
     )
-    db.add(msg)
-    await db.flush()
-    await db.refresh(msg)
-    return msg
+    return result.scalar_one()
+
+
+async def _get_conversation_with_messages(
+    conversation_id: str,
+    shop: ShopProxy,
+    db: AsyncSession,
+) -> tuple[Optional[Conversation], list]:
+    """Fetch conversation (ownership-checked) plus its recent messages in one query.
+
+    The last CHAT_PANEL_MESSAGE_LIMIT messages come from a LATERAL subquery
+    backed by the (conversation_id, created_at) index. Returns
+    (None, []) if the conversation doesn't exist or belongs to another shop.
+    """
+    conv_uuid = _parse_conversation_id(conversation_id)
+    if conv_uuid is None:
+        return None, []
+
+    result = await db.execute(
+        _CONVERSATION_WITH_MESSAGES,
+        {"conversation_id": conv_uuid, "shop_id": shop.id},
+    )
+    rows = result.all()
+    if not rows:
+        return None, []
+
+    conversation = rows[0][0]
+    messages = [msg for _, msg in rows if msg is not None]
+    return conversation, messages
+
+
+async def get_message_history(
+    db: AsyncSession,
+    conversation_id: uuid.UUID,
+    shop_id: uuid.UUID,
+    before: Optional[tuple[datetime, uuid.UUID]] = None,
+) -> tuple[list, bool]:
+    """Load one page of chat history for the panel.
+
+    Args:
+        before: (created_at, id) of the oldest message already shown;
+            None for the latest page.
+
+    Returns:
+        (messages oldest-first, whether older messages remain). Empty if
+        the conversation belongs to another shop.
+    """
+    params = {"conversation_id": conversation_id, "shop_id": shop_id}
+    stmt = _HISTORY_PAGE
+    if before is not None:
+        params["before"], params["before_id"] = before
+        stmt = _HISTORY_PAGE_BEFORE
+
+    result = await db.execute(stmt, params)
+    messages = list(result.scalars().all())
+    has_older = len(messages) > CHAT_PANEL_MESSAGE_LIMIT
+    del messages[CHAT_PANEL_MESSAGE_LIMIT:]
+    messages.reverse()
+    return messages, has_older
+
+
+def _with_new_message(messages: list, msg: Message) -> list:
+    """Append a just-saved message, keeping the panel window size."""
+    return (messages + [msg])[-CHAT_PANEL_MESSAGE_LIMIT:]
+
+
+async def _sync_human_mode(
+    redis: Redis, conversation: Conversation, human: bool
+) -> None:
+    """Mirror the conversation's mode into the session the bot reads.
+
+    The engine checks this flag instead of querying Conversation.mode on
+    every incoming message.
+    """
+    await SessionManager(redis).set_human_mode(
+        str(conversation.shop_id),
+        conversation.external_user_id,
+        str(conversation.id),
+        human=human,
+    )
+
+
+async def restore_human_mode_flags(redis: Redis) -> int:
+    """Re-create takeover flags for conversations a master holds in the DB.
+
+    Run at startup: Conversation.mode stays the record, and flags lost to
+    a Redis flush — or predating the flag — would otherwise let the bot
+    answer over a live master. Sessions older than the TTL are gone, so
+    only recent conversations need one. Returns the number restored.
+    """
+    since = datetime.now(timezone.utc) - timedelta(seconds=settings.session_ttl_seconds)
+    async with async_session_factory() as db:
+        result = await db.execute(
+            select(Conversation.shop_id, Conversation.external_user_id, Conversation.id)
+            .where(Conversation.mode == "human", Conversation.last_message_at >= since)
+        )
+        taken_over = [
+            (str(shop_id), user_id, str(conversation_id))
+            for shop_id, user_id, conversation_id in result.all()
+        ]
+    await SessionManager(redis).restore_human_modes(taken_over)
+    return len(taken_over)
 
 
 async def _render_chat_panel(
     request: Request,
     conversation: Conversation,
     messages: list,
-    shop: Shop,
+    shop: ShopProxy,
     flash: Optional[str] = None,
 ) -> HTMLResponse:
     """Render the chat panel partial template."""
@@ -144,6 +385,8 @@ async def _render_chat_panel(
             "request": request,
             "conversation": conversation,
             "messages": messages,
+            # The panel window is full — there may be older history
+            "has_older": len(messages) >= CHAT_PANEL_MESSAGE_LIMIT,
             "shop": shop,
             "flash": flash,
         },
@@ -156,54 +399,53 @@ async def _render_chat_panel(
 @router.post("/{conversation_id}/takeover", response_class=HTMLResponse)
 async def takeover(
     request: Request,
+    background_tasks: BackgroundTasks,
     conversation_id: str,
-    shop: Optional[Shop] = Depends(get_current_shop),
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
     db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
 ):
     """Set conversation mode to human, notify customer, return updated chat panel."""
     if shop is None:
         return HTMLResponse("Unauthorized", status_code=401)
 
-    conversation = await _get_conversation_for_shop(conversation_id, shop, db)
+    conversation, messages = await _get_conversation_with_messages(
+        conversation_id, shop, db
+    )
     if not conversation:
         return HTMLResponse("Диалог не найден", status_code=404)
 
+    log = logger.bind(conversation_id=conversation_id, shop_id=str(shop.id))
+
     now = datetime.now(timezone.utc)
 
     # Update conversation mode and status
-    await db.execute(
-        sa_update(Conversation)
-        .where(Conversation.id == conversation.id)
-        .values(
-            mode="human",
-            status="human_active",
-            last_message_at=now,
-        )
+    result = await db.execute(
+        _SET_CONVERSATION_MODE,
+        {
+            "conversation_id": conversation.id,
+            "new_mode": "human",
+            "new_status": "human_active",
+            "ts": now,
+        },
     )
+    conversation = result.scalar_one()
 
     # Save notification message as bot role
-    notice_text = "Сейчас с вами свяжется наш специалист 👨‍🔧"
-    await _save_message(db, conversation.id, "bot", notice_text, step_name="takeover")
+    notice = await _save_message(
+        db, conversation.id, "bot", TAKEOVER_NOTICE, step_name="takeover"
+    )
 
     await db.commit()
+    await _sync_human_mode(redis, conversation, human=True)
 
-    # Send to customer (Telegram or WhatsApp)
-    await send_to_channel(shop, conversation, notice_text)
+    # Send to customer (Telegram or WhatsApp) after the response is sent
+    background_tasks.add_task(send_to_channel, shop.id, conversation, TAKEOVER_NOTICE)
 
-    logger.info(
-        "chat_takeover",
-        conversation_id=conversation_id,
-        shop_id=str(shop.id),
-    )
+    log.info("chat_takeover")
 
-    # Reload fresh conversation + messages
-    await db.refresh(conversation)
-    msg_result = await db.execute(
-        select(Message)
-        .where(Message.conversation_id == conversation.id)
-        .order_by(Message.created_at.asc())
-    )
-    messages = msg_result.scalars().all()
+    # Conversation is already fresh from UPDATE ... RETURNING
+    messages = _with_new_message(messages, notice)
 
     return await _render_chat_panel(request, conversation, messages, shop)
 
@@ -211,50 +453,49 @@ async def takeover(
 @router.post("/{conversation_id}/release", response_class=HTMLResponse)
 async def release(
     request: Request,
+    background_tasks: BackgroundTasks,
     conversation_id: str,
-    shop: Optional[Shop] = Depends(get_current_shop),
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
     db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
 ):
     """Return conversation to bot mode."""
     if shop is None:
         return HTMLResponse("Unauthorized", status_code=401)
 
-    conversation = await _get_conversation_for_shop(conversation_id, shop, db)
+    conversation, messages = await _get_conversation_with_messages(
+        conversation_id, shop, db
+    )
     if not conversation:
         return HTMLResponse("Диалог не найден", status_code=404)
 
+    log = logger.bind(conversation_id=conversation_id, shop_id=str(shop.id))
+
     now = datetime.now(timezone.utc)
 
-    await db.execute(
-        sa_update(Conversation)
-        .where(Conversation.id == conversation.id)
-        .values(
-            mode="bot",
-            status="active",
-            last_message_at=now,
-        )
+    result = await db.execute(
+        _SET_CONVERSATION_MODE,
+        {
+            "conversation_id": conversation.id,
+            "new_mode": "bot",
+            "new_status": "active",
+            "ts": now,
+        },
     )
+    conversation = result.scalar_one()
 
-    release_text = "Спасибо за ожидание! Бот снова на связи 🤖"
-    await _save_message(db, conversation.id, "bot", release_text, step_name="release")
+    notice = await _save_message(
+        db, conversation.id, "bot", RELEASE_NOTICE, step_name="release"
+    )
 
     await db.commit()
+    await _sync_human_mode(redis, conversation, human=False)
 
-    await send_to_channel(shop, conversation, release_text)
+    background_tasks.add_task(send_to_channel, shop.id, conversation, RELEASE_NOTICE)
 
-    logger.info(
-        "chat_released",
-        conversation_id=conversation_id,
-        shop_id=str(shop.id),
-    )
+    log.info("chat_released")
 
-    await db.refresh(conversation)
-    msg_result = await db.execute(
-        select(Message)
-        .where(Message.conversation_id == conversation.id)
-        .order_by(Message.created_at.asc())
-    )
-    messages = msg_result.scalars().all()
+    messages = _with_new_message(messages, notice)
 
     return await _render_chat_panel(request, conversation, messages, shop)
 
@@ -262,47 +503,47 @@ async def release(
 @router.post("/{conversation_id}/send", response_class=HTMLResponse)
 async def send_message(
     request: Request,
+    background_tasks: BackgroundTasks,
     conversation_id: str,
     text: str = Form(...),
-    shop: Optional[Shop] = Depends(get_current_shop),
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
     db: AsyncSession = Depends(get_db),
 ):
     """Send a message from the master to the customer."""
     if shop is None:
         return HTMLResponse("Unauthorized", status_code=401)
 
-    if not text.strip():
+    text = _clean_message_text(text)
+    if text is None:
         return HTMLResponse("Пустое сообщение", status_code=400)
+    if len(text) > MAX_MESSAGE_LENGTH:
+        return HTMLResponse("Слишком длинное сообщение", status_code=400)
 
     conversation = await _get_conversation_for_shop(conversation_id, shop, db)
     if not conversation:
         return HTMLResponse("Диалог не найден", status_code=404)
 
+    log = logger.bind(conversation_id=conversation_id, shop_id=str(shop.id))
+
     now = datetime.now(timezone.utc)
 
     # Save master message
     msg = await _save_message(
-        db, conversation.id, "master", text.strip(), step_name="human_chat"
+        db, conversation.id, "master", text, step_name="human_chat"
     )
 
     # Update last_message_at on the conversation
     await db.execute(
-        sa_update(Conversation)
-        .where(Conversation.id == conversation.id)
-        .values(last_message_at=now)
+        _TOUCH_CONVERSATION,
+        {"conversation_id": conversation.id, "ts": now},
     )
 
     await db.commit()
 
-    # Send to customer (Telegram or WhatsApp)
-    await send_to_channel(shop, conversation, text.strip())
+    # Send to customer (Telegram or WhatsApp) after the response is sent
+    background_tasks.add_task(send_to_channel, shop.id, conversation, text)
 
-    logger.info(
-        "master_message_sent",
-        conversation_id=conversation_id,
-        shop_id=str(shop.id),
-        text_len=len(text),
-    )
+    log.info("master_message_sent", text_len=len(text))
 
     # Return the single new message bubble (appended to existing list)
     return templates.TemplateResponse(
@@ -314,42 +555,93 @@ async def send_message(
     )
 
 
-@router.get("/{conversation_id}/messages", response_class=HTMLResponse)
-async def poll_messages(
+async def _stream_events(
     request: Request,
+    redis: Redis,
     conversation_id: str,
-    after: Optional[str] = Query(None),
-    shop: Optional[Shop] = Depends(get_current_shop),
+) -> AsyncIterator[str]:
+    """Yield SSE events with rendered message bubbles from Redis Pub/Sub."""
+    bubble = templates.get_template("chat/message_bubble.html")
+    pubsub = redis.pubsub()
+    await pubsub.subscribe(conversation_channel(conversation_id))
+    try:
+        while not await request.is_disconnected():
+            event = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=STREAM_KEEPALIVE_SECONDS,
+            )
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+
+            payload = orjson.loads(event["data"])
+            payload["created_at"] = datetime.fromisoformat(payload["created_at"])
+            html = bubble.render(msg=SimpleNamespace(**payload))
+            data = "\n".join(f"data: {line}" for line in html.splitlines())
+            yield f"event: message\n{data}\n\n"
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
+
+
+@router.get("/{conversation_id}/stream")
+async def stream_messages(
+    request: Request,
+    conversation_id: str,
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
     db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
 ):
-    """Poll for new messages since a given ISO timestamp (for HTMX polling)."""
+    """Server-Sent Events stream of new customer messages for the chat panel."""
     if shop is None:
-        return HTMLResponse("", status_code=200)
+        return HTMLResponse("Unauthorized", status_code=401)
 
     conversation = await _get_conversation_for_shop(conversation_id, shop, db)
+    # Release the DB connection — the stream itself only needs Redis
+    await db.close()
     if not conversation:
+        return HTMLResponse("Диалог не найден", status_code=404)
+
+    return StreamingResponse(
+        _stream_events(request, redis, conversation_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{conversation_id}/messages", response_class=HTMLResponse)
+async def poll_messages(
+    request: Request,
+    conversation_id: str,
+    after: Optional[str] = Query(None),
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
+    db: AsyncSession = Depends(get_db),
+):
+    """Poll for new messages since a given ISO timestamp.
+
+    Fallback for the SSE stream — the panel polls this at a slow interval
+    in case a live event was missed.
+    """
+    if shop is None:
         return HTMLResponse("", status_code=200)
 
-    try:
-        conv_uuid = uuid.UUID(conversation_id)
-    except ValueError:
+    conv_uuid = _parse_conversation_id(conversation_id)
+    if conv_uuid is None:
         return HTMLResponse("", status_code=200)
 
-    stmt = (
-        select(Message)
-        .where(Message.conversation_id == conv_uuid)
-        .order_by(Message.created_at.asc())
-    )
+    # Ownership check folded into the message query
+    stmt = _POLL_MESSAGES
+    params = {"conversation_id": conv_uuid, "shop_id": shop.id}
 
     if after:
         try:
             # Parse ISO timestamp — handle both with and without timezone info
-            after_dt = datetime.fromisoformat(after.replace("Z", "+00:00"))
-            stmt = stmt.where(Message.created_at > after_dt)
+            params["after"] = datetime.fromisoformat(after.replace("Z", "+00:00"))
+            stmt = _POLL_MESSAGES_AFTER
         except ValueError:
             pass  # Ignore malformed timestamp — return all messages
 
-    result = await db.execute(stmt)
+    result = await db.execute(stmt, params)
     new_messages = result.scalars().all()
 
     if not new_messages:
@@ -365,26 +657,71 @@ async def poll_messages(
     )
 
 
+@router.get("/{conversation_id}/older", response_class=HTMLResponse)
+async def older_messages(
+    request: Request,
+    conversation_id: str,
+    before: str = Query(...),
+    before_id: str = Query(...),
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
+    db: AsyncSession = Depends(get_db),
+):
+    """Load the page of history preceding the oldest message shown.
+
+    Replaces the panel's "load older" button with the older bubbles
+    (and a new button if there is still more).
+    """
+    if shop is None:
+        return HTMLResponse("", status_code=200)
+
+    conv_uuid = _parse_conversation_id(conversation_id)
+    if conv_uuid is None:
+        return HTMLResponse("", status_code=200)
+
+    try:
+        cursor = (
+            datetime.fromisoformat(before.replace("Z", "+00:00")),
+            uuid.UUID(before_id),
+        )
+    except ValueError:
+        return HTMLResponse("", status_code=200)
+
+    messages, has_older = await get_message_history(db, conv_uuid, shop.id, cursor)
+
+    return templates.TemplateResponse(
+        "chat/older_messages.html",
+        {
+            "request": request,
+            "conv_id": str(conv_uuid),
+            "messages": messages,
+            "has_older": has_older,
+        },
+    )
+
+
 @router.post("/{conversation_id}/quick-reply", response_class=HTMLResponse)
 async def quick_reply(
     request: Request,
+    background_tasks: BackgroundTasks,
     conversation_id: str,
     template: str = Form(...),
-    shop: Optional[Shop] = Depends(get_current_shop),
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
     db: AsyncSession = Depends(get_db),
 ):
     """Send a predefined quick-reply template as master message."""
     if shop is None:
         return HTMLResponse("Unauthorized", status_code=401)
 
-    text = QUICK_REPLIES.get(template)
-    if not text:
+    text = _resolve_quick_reply(template)
+    if text is None:
         return HTMLResponse("Неизвестный шаблон", status_code=400)
 
     conversation = await _get_conversation_for_shop(conversation_id, shop, db)
     if not conversation:
         return HTMLResponse("Диалог не найден", status_code=404)
 
+    log = logger.bind(conversation_id=conversation_id, shop_id=str(shop.id))
+
     now = datetime.now(timezone.utc)
 
     msg = await _save_message(
@@ -392,21 +729,15 @@ async def quick_reply(
     )
 
     await db.execute(
-        sa_update(Conversation)
-        .where(Conversation.id == conversation.id)
-        .values(last_message_at=now)
+        _TOUCH_CONVERSATION,
+        {"conversation_id": conversation.id, "ts": now},
     )
 
     await db.commit()
 
-    await send_to_channel(shop, conversation, text)
+    background_tasks.add_task(send_to_channel, shop.id, conversation, text)
 
-    logger.info(
-        "quick_reply_sent",
-        conversation_id=conversation_id,
-        template=template,
-        shop_id=str(shop.id),
-    )
+    log.info("quick_reply_sent", template=template)
 
     # Return the new message bubble appended to the chat
     return templates.TemplateResponse(
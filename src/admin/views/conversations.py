@@ -2,37 +2,50 @@
 
 from __future__ import annotations
 
+import asyncio
 import uuid
-import pathlib
 from datetime import datetime, timezone
 from typing import Optional
 
 import structlog
+from cachetools import TTLCache
 from fastapi import APIRouter, Depends, Query, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy import select, func, update
+from sqlalchemy import and_, bindparam, case, or_, select, func
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import aliased
 
-from src.admin.dependencies import get_current_shop
-from src.database import get_db
-from src.models.conversation import Conversation, Message
+from src.admin.dependencies import ShopProxy, get_current_shop
+from src.admin.templating import templates
+from src.admin.views.chat import get_message_history
+from src.database import async_session_factory, get_db
+from src.models.conversation import Conversation
 from src.models.lead import Lead
-from src.models.shop import Shop
 
 logger = structlog.get_logger()
 
 router = APIRouter(prefix="/admin/conversations", tags=["admin-conversations"])
 
-TEMPLATES_DIR = pathlib.Path(__file__).parent.parent / "templates"
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
-
 # Steps that map to each warmth level
 HOT_STEPS = {"estimate", "contact_info", "completed"}
 WARM_STEPS = {"problem", "device_model"}
 COLD_STEPS = {"greeting", "device_type"}
 
+# Sorted tuples for IN (...) — built once, and the same SQL text every process
+WARMTH_STEPS = {
+    "hot": tuple(sorted(HOT_STEPS)),
+    "warm": tuple(sorted(WARM_STEPS)),
+    "cold": tuple(sorted(COLD_STEPS)),
+}
+BEYOND_PROBLEM_STEPS = tuple(sorted(WARM_STEPS | HOT_STEPS))
+
+_STEP_TO_WARMTH = (
+    {step: "cold" for step in COLD_STEPS}
+    | {step: "warm" for step in WARM_STEPS}
+    | {step: "hot" for step in HOT_STEPS}
+)
+
+WARMTH_LABELS = {"hot": "Горячий", "warm": "Тёплый", "cold": "Холодный"}
+
 CONVERSATION_STATUS_LABELS = {
     "active": "Активный",
     "abandoned": "Брошен",
@@ -74,51 +87,126 @@ STEP_LABELS = {
 
 def _get_warmth(step: Optional[str]) -> str:
     """Return warmth level string for a conversation step."""
-    if step in HOT_STEPS:
-        return "hot"
-    if step in WARM_STEPS:
-        return "warm"
-    return "cold"
+    return _STEP_TO_WARMTH.get(step, "cold")
 
 
 def _warmth_label(warmth: str) -> str:
-    labels = {"hot": "Горячий", "warm": "Тёплый", "cold": "Холодный"}
-    return labels.get(warmth, warmth)
+    return WARMTH_LABELS.get(warmth, warmth)
+
+
+# Static lookups for the conversation templates — registered once on the
+# shared admin Jinja environment instead of copied into every context.
+# Context values take precedence, so views passing their own
+# `status_labels` etc. (leads, schedule) and the detail page's
+# `warmth_label` string are unaffected.
+templates.env.globals.update(
+    status_labels=CONVERSATION_STATUS_LABELS,
+    lead_status_labels=LEAD_STATUS_LABELS,
+    device_category_labels=DEVICE_CATEGORY_LABELS,
+    step_labels=STEP_LABELS,
+    get_warmth=_get_warmth,
+    warmth_label=_warmth_label,
+)
+
+
+# List order; the trailing id makes it total, so it can serve as a keyset
+LIST_ORDER = (
+    Conversation.last_message_at.desc().nullslast(),
+    Conversation.id.desc(),
+)
+
+
+def _after_cursor(last_message_at: Optional[datetime], conv_id: uuid.UUID):
+    """Rows strictly after (last_message_at, id) in LIST_ORDER (NULLs sort last)."""
+    if last_message_at is None:
+        return and_(
+            Conversation.last_message_at.is_(None),
+            Conversation.id < conv_id,
+        )
+    return or_(
+        Conversation.last_message_at < last_message_at,
+        and_(
+            Conversation.last_message_at == last_message_at,
+            Conversation.id < conv_id,
+        ),
+        Conversation.last_message_at.is_(None),
+    )
 
 
-async def _get_funnel_stats(db: AsyncSession, shop_id: uuid.UUID) -> dict:
-    """Compute mini-funnel statistics for the shop."""
-    # Total conversations
-    total_result = await db.execute(
-        select(func.count()).where(Conversation.shop_id == shop_id)
-    )
-    total_started = total_result.scalar_one() or 0
+def _parse_cursor(
+    after_last_message_at: Optional[str], after_id: Optional[str]
+) -> Optional[tuple[Optional[datetime], uuid.UUID]]:
+    """Parse the next-page cursor from query params; None if absent or malformed.
 
-    # Reached problem step (step is problem or beyond)
-    beyond_problem = list(WARM_STEPS | HOT_STEPS)
-    reached_problem_result = await db.execute(
-        select(func.count()).where(
-            Conversation.shop_id == shop_id,
-            Conversation.current_step.in_(beyond_problem),
+    A cursor with `after_id` but no timestamp points into the NULL
+    last_message_at tail of the list.
+    """
+    if not after_id:
+        return None
+    try:
+        conv_id = uuid.UUID(after_id)
+        ts = (
+            datetime.fromisoformat(after_last_message_at)
+            if after_last_message_at
+            else None
         )
-    )
-    reached_problem = reached_problem_result.scalar_one() or 0
-
-    # Became a lead (conversation has a matching lead row)
-    became_lead_result = await db.execute(
+    except ValueError:
+        return None
+    return ts, conv_id
+
+
+# Mini-funnel: conversations started, reached the problem step (or beyond),
+# became a lead — one statement, built once and bound per shop.
+_FUNNEL_STATS = select(
+    func.count().label("total_started"),
+    func.sum(
+        case((Conversation.current_step.in_(BEYOND_PROBLEM_STEPS), 1), else_=0)
+    ).label("reached_problem"),
+    (
         select(func.count())
         .select_from(Lead)
-        .where(Lead.shop_id == shop_id, Lead.conversation_id.isnot(None))
-    )
-    became_lead = became_lead_result.scalar_one() or 0
+        .where(
+            Lead.shop_id == bindparam("shop_id"),
+            Lead.conversation_id.isnot(None),
+        )
+        .scalar_subquery()
+        .label("became_lead")
+    ),
+).where(Conversation.shop_id == bindparam("shop_id"))
+
+
+# Funnel numbers move slowly; a few seconds of staleness spares the
+# aggregate on every list page load. Per process, keyed by shop_id.
+FUNNEL_CACHE_TTL_SECONDS = 30
+_funnel_cache: TTLCache = TTLCache(maxsize=256, ttl=FUNNEL_CACHE_TTL_SECONDS)
+
+
+async def _get_funnel_stats(db: AsyncSession, shop_id: uuid.UUID) -> dict:
+    """Compute mini-funnel statistics for the shop in a single query."""
+    row = (await db.execute(_FUNNEL_STATS, {"shop_id": shop_id})).one()
 
     return {
-        "total_started": total_started,
-        "reached_problem": reached_problem,
-        "became_lead": became_lead,
+        "total_started": row.total_started or 0,
+        "reached_problem": row.reached_problem or 0,
+        "became_lead": row.became_lead or 0,
     }
 
 
+async def _get_funnel_stats_own_session(shop_id: uuid.UUID) -> dict:
+    """Funnel stats on a separate pooled session, so they can run alongside the page query.
+
+    Served from a short per-process cache when fresh.
+    """
+    stats = _funnel_cache.get(shop_id)
+    if stats is not None:
+        return stats
+
+    async with async_session_factory() as session:
+        stats = await _get_funnel_stats(session, shop_id)
+    _funnel_cache[shop_id] = stats
+    return stats
+
+
 async def _fetch_conversations(
     db: AsyncSession,
     shop_id: uuid.UUID,
@@ -127,72 +215,121 @@ async def _fetch_conversations(
     search: Optional[str],
     page: int,
     per_page: int,
+    after: Optional[tuple[Optional[datetime], uuid.UUID]] = None,
 ) -> tuple[list, int]:
     """
     Fetch ALL conversations with optional LEFT JOIN on Lead.
 
+    `after` is the (last_message_at, id) of the last row on the previous
+    page; when given, the page is fetched by keyset instead of OFFSET.
+
     Returns list of (Conversation, Lead|None) tuples and total count.
     """
-    stmt = (
-        select(Conversation, Lead)
-        .outerjoin(Lead, Lead.conversation_id == Conversation.id)
-        .where(Conversation.shop_id == shop_id)
-    )
+    conditions = [Conversation.shop_id == shop_id]
+    # Whether any predicate touches Lead (otherwise a count can skip the join)
+    lead_filtered = False
 
     # Status filter — unified across conversation and lead statuses
     if status_filter:
         if status_filter in ("new", "viewed", "contacted", "won", "lost", "pending"):
             # Lead statuses
-            stmt = stmt.where(Lead.status == status_filter)
+            conditions.append(Lead.status == status_filter)
+            lead_filtered = True
         else:
             # Conversation statuses (active, abandoned, handoff, human_active, completed)
-            stmt = stmt.where(Conversation.status == status_filter)
+            conditions.append(Conversation.status == status_filter)
     else:
         # Default: show all meaningful statuses
-        stmt = stmt.where(
+        conditions.append(
             Conversation.status.in_(
                 ["active", "abandoned", "handoff", "human_active", "completed"]
             )
         )
 
     # Warmth filter
-    if warmth_filter:
-        if warmth_filter == "hot":
-            stmt = stmt.where(Conversation.current_step.in_(list(HOT_STEPS)))
-        elif warmth_filter == "warm":
-            stmt = stmt.where(Conversation.current_step.in_(list(WARM_STEPS)))
-        elif warmth_filter == "cold":
-            stmt = stmt.where(Conversation.current_step.in_(list(COLD_STEPS)))
+    warmth_steps = WARMTH_STEPS.get(warmth_filter) if warmth_filter else None
+    if warmth_steps:
+        conditions.append(Conversation.current_step.in_(warmth_steps))
 
     # Search — across both tables
     if search:
-        search_like = f"%{search.lower()}%"
-        stmt = stmt.where(
-            func.lower(func.coalesce(Lead.customer_name, Conversation.customer_name, "")).like(search_like)
-            | func.lower(func.coalesce(Lead.device_full_name, "")).like(search_like)
-            | func.lower(func.coalesce(Conversation.device_brand, "")).like(search_like)
-            | func.lower(func.coalesce(Conversation.device_model, "")).like(search_like)
-            | func.lower(func.coalesce(Lead.problem_summary, Conversation.problem_description, "")).like(search_like)
+        search_like = f"%{search}%"
+        # Bare columns (no coalesce/lower) so each ILIKE can use its trigram index
+        conditions.append(
+            Lead.customer_name.ilike(search_like)
+            | Conversation.customer_name.ilike(search_like)
+            | Lead.device_full_name.ilike(search_like)
+            | Conversation.device_brand.ilike(search_like)
+            | Conversation.device_model.ilike(search_like)
+            | Lead.problem_summary.ilike(search_like)
+            | Conversation.problem_description.ilike(search_like)
         )
+        lead_filtered = True
 
-    # Count
-    count_stmt = select(func.count()).select_from(stmt.subquery())
-    total = (await db.execute(count_stmt)).scalar_one() or 0
-
-    # Order + paginate
-    offset = (page - 1) * per_page
     stmt = (
-        stmt.order_by(Conversation.last_message_at.desc().nullslast())
-        .offset(offset)
-        .limit(per_page)
+        select(Conversation, Lead)
+        .outerjoin(Lead, Lead.conversation_id == Conversation.id)
+        .where(*conditions)
     )
 
-    result = await db.execute(stmt)
-    rows = result.all()  # list of (Conversation, Lead|None)
+    # Order + paginate. With a cursor from the previous page, seek past it
+    # instead of OFFSET so later pages cost the same as the first.
+    # The total rides along as a window count over the filtered rows
+    # (leads.conversation_id is unique, so the join doesn't inflate it).
+    offset = (page - 1) * per_page
+    page_stmt = stmt.add_columns(func.count().over().label("total"))
+    if after is not None:
+        page_stmt = page_stmt.where(_after_cursor(*after))
+    else:
+        page_stmt = page_stmt.offset(offset)
+    page_stmt = page_stmt.order_by(*LIST_ORDER).limit(per_page)
+
+    result = await db.execute(page_stmt)
+    page_rows = result.all()
+    rows = [(conv, lead) for conv, lead, _ in page_rows]  # list of (Conversation, Lead|None)
+
+    if page_rows:
+        # With a cursor the window only sees rows after it
+        total = page_rows[0].total + (offset if after is not None else 0)
+    elif page > 1:
+        # Past the last page — no row to carry the window count. Plain COUNT
+        # over the same predicates, joining Lead only when filtering on it.
+        count_stmt = select(func.count()).select_from(Conversation)
+        if lead_filtered:
+            count_stmt = count_stmt.outerjoin(
+                Lead, Lead.conversation_id == Conversation.id
+            )
+        count_stmt = count_stmt.where(*conditions)
+        total = (await db.execute(count_stmt)).scalar_one() or 0
+    else:
+        total = 0
 
     return rows, total
 
 
+async def _get_conversation_with_lead(
+    db: AsyncSession, conv_uuid: uuid.UUID, shop_id: uuid.UUID
+):
+    """Fetch (Conversation, Lead|None) for the shop, or None if not found."""
+    result = await db.execute(
+        select(Conversation, Lead)
+        .outerjoin(Lead, Lead.conversation_id == Conversation.id)
+        .where(
+            Conversation.id == conv_uuid,
+            Conversation.shop_id == shop_id,
+        )
+    )
+    return result.one_or_none()
+
+
+async def _get_messages_own_session(
+    conv_uuid: uuid.UUID, shop_id: uuid.UUID
+) -> tuple[list, bool]:
+    """Latest page of chat history on a separate pooled session (runs alongside the conversation fetch)."""
+    async with async_session_factory() as session:
+        return await get_message_history(session, conv_uuid, shop_id)
+
+
 @router.get("", response_class=HTMLResponse)
 async def conversations_list(
     request: Request,
@@ -200,7 +337,9 @@ async def conversations_list(
     status: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
-    shop: Optional[Shop] = Depends(get_current_shop),
+    after_last_message_at: Optional[str] = Query(None),
+    after_id: Optional[str] = Query(None),
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
     db: AsyncSession = Depends(get_db),
 ):
     """Unified list of all clients — conversations + leads."""
@@ -208,27 +347,30 @@ async def conversations_list(
         return RedirectResponse(url="/admin/login")
 
     per_page = 20
-    funnel_stats = await _get_funnel_stats(db, shop.id)
-    rows, total = await _fetch_conversations(
-        db, shop.id, warmth, status, search, page, per_page
+    # Funnel and page are independent — run them concurrently
+    funnel_stats, (rows, total) = await asyncio.gather(
+        _get_funnel_stats_own_session(shop.id),
+        _fetch_conversations(
+            db, shop.id, warmth, status, search, page, per_page,
+            after=_parse_cursor(after_last_message_at, after_id),
+        ),
     )
 
-    # Mark new leads as viewed
-    new_lead_ids = [lead.id for conv, lead in rows if lead and lead.status == "new"]
-    if new_lead_ids:
-        await db.execute(
-            update(Lead)
-            .where(Lead.id.in_(new_lead_ids))
-            .values(status="viewed", updated_at=datetime.now(timezone.utc))
-        )
-        await db.commit()
-
-    # Attach warmth to each conversation for template use
-    for conv, lead in rows:
-        conv._warmth = _get_warmth(conv.current_step)
-
     total_pages = max(1, (total + per_page - 1) // per_page)
 
+    # Keyset cursor for the "next page" link
+    next_cursor = None
+    if rows and page < total_pages:
+        last_conv = rows[-1][0]
+        next_cursor = {
+            "after_last_message_at": (
+                last_conv.last_message_at.isoformat()
+                if last_conv.last_message_at
+                else None
+            ),
+            "after_id": str(last_conv.id),
+        }
+
     ctx = {
         "request": request,
         "shop": shop,
@@ -237,15 +379,11 @@ async def conversations_list(
         "total": total,
         "page": page,
         "total_pages": total_pages,
+        "next_cursor": next_cursor,
         "warmth_filter": warmth,
         "status_filter": status,
         "search": search or "",
         "funnel": funnel_stats,
-        "status_labels": CONVERSATION_STATUS_LABELS,
-        "lead_status_labels": LEAD_STATUS_LABELS,
-        "device_category_labels": DEVICE_CATEGORY_LABELS,
-        "step_labels": STEP_LABELS,
-        "warmth_label": _warmth_label,
     }
 
     if request.headers.get("HX-Request"):
@@ -259,42 +397,29 @@ async def conversations_list(
 @router.get("/{conversation_id}", response_class=HTMLResponse)
 async def conversation_detail(
     request: Request,
-    conversation_id: str,
-    shop: Optional[Shop] = Depends(get_current_shop),
+    conversation_id: uuid.UUID,
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
     db: AsyncSession = Depends(get_db),
 ):
     """Conversation detail — full chat history + collected data."""
     if shop is None:
         return RedirectResponse(url="/admin/login")
 
-    try:
-        conv_uuid = uuid.UUID(conversation_id)
-    except ValueError:
-        return RedirectResponse(url="/admin/conversations")
-
-    result = await db.execute(
-        select(Conversation).where(
-            Conversation.id == conv_uuid,
-            Conversation.shop_id == shop.id,
-        )
+    # Conversation + its lead in one query (leads.conversation_id is unique);
+    # the latest page of messages loads concurrently on a second session.
+    conv_row, (messages, has_older) = await asyncio.gather(
+        _get_conversation_with_lead(db, conversation_id, shop.id),
+        _get_messages_own_session(conversation_id, shop.id),
     )
-    conversation = result.scalar_one_or_none()
-    if not conversation:
+    if conv_row is None:
         return RedirectResponse(url="/admin/conversations")
+    conversation, lead = conv_row
 
-    # Fetch messages
-    msg_result = await db.execute(
-        select(Message)
-        .where(Message.conversation_id == conv_uuid)
-        .order_by(Message.created_at.asc())
-    )
-    messages = msg_result.scalars().all()
-
-    # Check if a lead exists for this conversation
-    lead_result = await db.execute(
-        select(Lead).where(Lead.conversation_id == conv_uuid)
-    )
-    lead = lead_result.scalar_one_or_none()
+    # Opening the conversation is what marks its lead as viewed
+    if lead and lead.status == "new":
+        lead.status = "viewed"
+        lead.updated_at = datetime.now(timezone.utc)
+        await db.commit()
 
     warmth = _get_warmth(conversation.current_step)
 
@@ -306,12 +431,9 @@ async def conversation_detail(
             "active_page": "conversations",
             "conversation": conversation,
             "chat_messages": messages,
+            "has_older": has_older,
             "lead": lead,
             "warmth": warmth,
             "warmth_label": _warmth_label(warmth),
-            "status_labels": CONVERSATION_STATUS_LABELS,
-            "lead_status_labels": LEAD_STATUS_LABELS,
-            "device_category_labels": DEVICE_CATEGORY_LABELS,
-            "step_labels": STEP_LABELS,
         },
     )
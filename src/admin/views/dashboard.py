@@ -6,32 +6,103 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 import structlog
+from cachetools import TTLCache
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy import select, func, and_, case
+from sqlalchemy import bindparam, select, func, case
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.admin.dependencies import get_current_shop
+from src.admin.dependencies import ShopProxy, get_current_shop
+from src.admin.templating import templates
 from src.database import get_db
 from src.models.conversation import Conversation, Message
 from src.models.lead import Appointment, Lead
-from src.models.shop import Shop
 
 logger = structlog.get_logger()
 
 router = APIRouter(prefix="/admin/dashboard", tags=["admin-dashboard"])
 
-import pathlib
 
-TEMPLATES_DIR = pathlib.Path(__file__).parent.parent / "templates"
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+# Dashboard statements are built once at import and bound per request
+# (shop_id, today_start, tomorrow_start, month_start).
+
+_LEAD_STATS = (
+    select(
+        Lead.status,
+        func.count().label("total"),
+        func.sum(
+            case((Lead.created_at >= bindparam("today_start"), 1), else_=0)
+        ).label("today"),
+        func.sum(
+            case((Lead.created_at >= bindparam("month_start"), 1), else_=0)
+        ).label("month"),
+    )
+    .where(Lead.shop_id == bindparam("shop_id"))
+    .group_by(Lead.status)
+)
+
+# Appointments today, token usage and conversations this month —
+# independent scalars fetched together in a single round-trip.
+_ACTIVITY_TOTALS = select(
+    select(func.count())
+    .select_from(Appointment)
+    .where(
+        Appointment.shop_id == bindparam("shop_id"),
+        Appointment.scheduled_at >= bindparam("today_start"),
+        Appointment.scheduled_at < bindparam("tomorrow_start"),
+        Appointment.status.in_(["pending", "confirmed"]),
+    )
+    .scalar_subquery()
+    .label("appointments_today"),
+    select(func.coalesce(func.sum(Message.llm_tokens_used), 0))
+    .join(Conversation, Message.conversation_id == Conversation.id)
+    .where(
+        Conversation.shop_id == bindparam("shop_id"),
+        Message.created_at >= bindparam("month_start"),
+    )
+    .scalar_subquery()
+    .label("tokens_month"),
+    select(func.count())
+    .select_from(Conversation)
+    .where(
+        Conversation.shop_id == bindparam("shop_id"),
+        Conversation.created_at >= bindparam("month_start"),
+    )
+    .scalar_subquery()
+    .label("conversations_month"),
+)
+
+
+# Lead aggregates move slowly; a few seconds of staleness spares the
+# GROUP BY on every dashboard load. Per process, keyed by (shop_id, day).
+LEAD_STATS_CACHE_TTL_SECONDS = 30
+_lead_stats_cache: TTLCache = TTLCache(maxsize=256, ttl=LEAD_STATS_CACHE_TTL_SECONDS)
+
+
+async def _get_lead_stats(db: AsyncSession, params: dict) -> tuple[dict, int, int]:
+    """Return (status_counts, leads_today, leads_this_month) for the shop."""
+    cache_key = (params["shop_id"], params["today_start"])
+    cached = _lead_stats_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    status_counts = {}
+    leads_today = 0
+    leads_this_month = 0
+    for row in await db.execute(_LEAD_STATS, params):
+        status_counts[row.status] = row.total
+        leads_today += row.today
+        leads_this_month += row.month
+
+    stats = (status_counts, leads_today, leads_this_month)
+    _lead_stats_cache[cache_key] = stats
+    return stats
 
 
 @router.get("", response_class=HTMLResponse)
 async def dashboard_page(
     request: Request,
-    shop: Optional[Shop] = Depends(get_current_shop),
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
     db: AsyncSession = Depends(get_db),
 ):
     """Main dashboard with stats."""
@@ -42,84 +113,34 @@ async def dashboard_page(
     today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
     month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
-    # Leads stats
-    leads_total = (await db.execute(
-        select(func.count()).select_from(Lead).where(Lead.shop_id == shop.id)
-    )).scalar_one()
-
-    leads_today = (await db.execute(
-        select(func.count()).select_from(Lead).where(
-            Lead.shop_id == shop.id,
-            Lead.created_at >= today_start,
-        )
-    )).scalar_one()
-
-    leads_this_month = (await db.execute(
-        select(func.count()).select_from(Lead).where(
-            Lead.shop_id == shop.id,
-            Lead.created_at >= month_start,
-        )
-    )).scalar_one()
-
-    leads_new = (await db.execute(
-        select(func.count()).select_from(Lead).where(
-            Lead.shop_id == shop.id,
-            Lead.status.in_(["new", "viewed"]),
-        )
-    )).scalar_one()
-
-    leads_won = (await db.execute(
-        select(func.count()).select_from(Lead).where(
-            Lead.shop_id == shop.id,
-            Lead.status == "won",
-        )
-    )).scalar_one()
+    params = {
+        "shop_id": shop.id,
+        "today_start": today_start,
+        "tomorrow_start": today_start + timedelta(days=1),
+        "month_start": month_start,
+    }
+
+    # Leads stats — one pass over the shop's leads, grouped by status;
+    # totals, "new" and "won" are derived from the breakdown.
+    status_counts, leads_today, leads_this_month = await _get_lead_stats(db, params)
+
+    leads_total = sum(status_counts.values())
+    leads_new = status_counts.get("new", 0) + status_counts.get("viewed", 0)
+    leads_won = status_counts.get("won", 0)
 
     # Conversion rate
     conversion = (leads_won / leads_total * 100) if leads_total > 0 else 0
 
-    # Appointments today
-    appointments_today = (await db.execute(
-        select(func.count()).select_from(Appointment).where(
-            Appointment.shop_id == shop.id,
-            Appointment.scheduled_at >= today_start,
-            Appointment.scheduled_at < today_start + timedelta(days=1),
-            Appointment.status.in_(["pending", "confirmed"]),
-        )
-    )).scalar_one()
-
-    # Token usage this month
-    tokens_month = (await db.execute(
-        select(func.coalesce(func.sum(Message.llm_tokens_used), 0))
-        .join(Conversation, Message.conversation_id == Conversation.id)
-        .where(
-            Conversation.shop_id == shop.id,
-            Message.created_at >= month_start,
-        )
-    )).scalar_one()
-
-    # Conversations this month
-    conversations_month = (await db.execute(
-        select(func.count()).select_from(Conversation).where(
-            Conversation.shop_id == shop.id,
-            Conversation.created_at >= month_start,
-        )
-    )).scalar_one()
+    totals = (await db.execute(_ACTIVITY_TOTALS, params)).one()
+
+    appointments_today = totals.appointments_today
+    tokens_month = totals.tokens_month
+    conversations_month = totals.conversations_month
 
     # Estimated token cost (Sonnet 4: ~$3/1M input + $15/1M output, average ~$9/1M)
     estimated_cost_usd = tokens_month / 1_000_000 * 9
     estimated_cost_rub = estimated_cost_usd * 90  # approximate rate
 
-    # Status breakdown
-    status_counts = {}
-    status_result = await db.execute(
-        select(Lead.status, func.count())
-        .where(Lead.shop_id == shop.id)
-        .group_by(Lead.status)
-    )
-    for status, count in status_result:
-        status_counts[status] = count
-
     return templates.TemplateResponse("dashboard.html", {
         "request": request,
         "shop": shop,
@@ -7,28 +7,22 @@ from datetime import datetime, timezone
 from typing import Optional
 
 import structlog
-from fastapi import APIRouter, Depends, Form, Query, Request
+from fastapi import APIRouter, Depends, Form, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy import select, func, update
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from src.admin.dependencies import get_current_shop
+from src.admin.dependencies import ShopProxy, get_current_shop
+from src.admin.templating import templates
+from src.admin.views.chat import get_message_history
 from src.database import get_db
-from src.models.conversation import Conversation, Message
+from src.models.conversation import Conversation
 from src.models.lead import Lead
-from src.models.shop import Shop
 
 logger = structlog.get_logger()
 
 router = APIRouter(prefix="/admin/leads", tags=["admin-leads"])
 
-import pathlib
-
-TEMPLATES_DIR = pathlib.Path(__file__).parent.parent / "templates"
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
-
 STATUS_LABELS = {
     "pending": "Ожидает",
     "new": "Новая",
@@ -56,23 +50,19 @@ DEVICE_CATEGORY_LABELS = {
 
 
 @router.get("", response_class=HTMLResponse)
-async def leads_list(
-    request: Request,
-    status: Optional[str] = Query(None),
-    search: Optional[str] = Query(None),
-    page: int = Query(1, ge=1),
-    shop: Optional[Shop] = Depends(get_current_shop),
-    db: AsyncSession = Depends(get_db),
-):
-    """Redirect to unified clients page."""
-    return RedirectResponse(url="/admin/conversations")
+async def leads_list():
+    """Leads live in the unified clients page now — permanent redirect.
+
+    No auth/DB dependencies: nothing here needs a session or a connection.
+    """
+    return RedirectResponse(url="/admin/conversations", status_code=308)
 
 
 @router.get("/{lead_id}", response_class=HTMLResponse)
 async def lead_detail(
     request: Request,
-    lead_id: str,
-    shop: Optional[Shop] = Depends(get_current_shop),
+    lead_id: uuid.UUID,
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
     db: AsyncSession = Depends(get_db),
 ):
     """Lead detail page with conversation history."""
@@ -81,14 +71,21 @@ async def lead_detail(
 
     # Fetch lead
     result = await db.execute(
-        select(Lead).where(Lead.id == uuid.UUID(lead_id), Lead.shop_id == shop.id)
+        select(Lead).where(Lead.id == lead_id, Lead.shop_id == shop.id)
     )
     lead = result.scalar_one_or_none()
     if not lead:
-        return RedirectResponse(url="/admin/leads")
+        return RedirectResponse(url="/admin/conversations")
+
+    # Opening the lead is what marks it as viewed
+    if lead.status == "new":
+        lead.status = "viewed"
+        lead.updated_at = datetime.now(timezone.utc)
+        await db.commit()
 
-    # Fetch conversation + messages
+    # Fetch conversation + latest page of messages
     messages = []
+    has_older = False
     conversation = None
     if lead.conversation_id:
         conv_result = await db.execute(
@@ -96,12 +93,9 @@ async def lead_detail(
         )
         conversation = conv_result.scalar_one_or_none()
 
-        msg_result = await db.execute(
-            select(Message)
-            .where(Message.conversation_id == lead.conversation_id)
-            .order_by(Message.created_at.asc())
+        messages, has_older = await get_message_history(
+            db, lead.conversation_id, shop.id
         )
-        messages = msg_result.scalars().all()
 
     return templates.TemplateResponse("leads/detail.html", {
         "request": request,
@@ -110,6 +104,7 @@ async def lead_detail(
         "lead": lead,
         "conversation": conversation,
         "chat_messages": messages,
+        "has_older": has_older,
         "status_labels": STATUS_LABELS,
         "urgency_labels": URGENCY_LABELS,
         "device_category_labels": DEVICE_CATEGORY_LABELS,
@@ -119,9 +114,9 @@ async def lead_detail(
 @router.patch("/{lead_id}/status", response_class=HTMLResponse)
 async def update_lead_status(
     request: Request,
-    lead_id: str,
+    lead_id: uuid.UUID,
     new_status: str = Form(...),
-    shop: Optional[Shop] = Depends(get_current_shop),
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
     db: AsyncSession = Depends(get_db),
 ):
     """Update lead status (HTMX partial)."""
@@ -132,14 +127,18 @@ async def update_lead_status(
     if new_status not in valid_statuses:
         return HTMLResponse("Invalid status", status_code=400)
 
-    await db.execute(
+    result = await db.execute(
         update(Lead)
-        .where(Lead.id == uuid.UUID(lead_id), Lead.shop_id == shop.id)
+        .where(Lead.id == lead_id, Lead.shop_id == shop.id)
         .values(status=new_status, updated_at=datetime.now(timezone.utc))
+        .returning(Lead.id)
     )
+    if result.scalar_one_or_none() is None:
+        # Unknown lead or another shop's — nothing was updated
+        return HTMLResponse("Lead not found", status_code=404)
     await db.commit()
 
-    logger.info("lead_status_updated", lead_id=lead_id, new_status=new_status)
+    logger.info("lead_status_updated", lead_id=str(lead_id), new_status=new_status)
 
     # Return updated badge
     label = STATUS_LABELS.get(new_status, new_status)
@@ -151,9 +150,9 @@ async def update_lead_status(
 @router.patch("/{lead_id}/notes", response_class=HTMLResponse)
 async def update_lead_notes(
     request: Request,
-    lead_id: str,
+    lead_id: uuid.UUID,
     master_notes: str = Form(""),
-    shop: Optional[Shop] = Depends(get_current_shop),
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
     db: AsyncSession = Depends(get_db),
 ):
     """Update lead master notes (HTMX partial)."""
@@ -162,7 +161,7 @@ async def update_lead_notes(
 
     await db.execute(
         update(Lead)
-        .where(Lead.id == uuid.UUID(lead_id), Lead.shop_id == shop.id)
+        .where(Lead.id == lead_id, Lead.shop_id == shop.id)
         .values(master_notes=master_notes, updated_at=datetime.now(timezone.utc))
     )
     await db.commit()
@@ -7,64 +7,63 @@ from datetime import datetime, timezone
 from typing import Optional
 
 import structlog
-from fastapi import APIRouter, Depends, Form, Query, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy import select, update, func
+from fastapi import APIRouter, Depends, Form, Request
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
+from sqlalchemy import bindparam, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload
 
-from src.admin.dependencies import get_current_shop
+from src.admin.dependencies import ShopProxy, get_current_shop
+from src.admin.templating import templates
 from src.database import get_db
-from src.models.device import DeviceCategory, RepairType
+from src.models.device import RepairType
 from src.models.pricing import PriceRule
-from src.models.shop import Shop
 
 logger = structlog.get_logger()
 
 router = APIRouter(prefix="/admin/pricing", tags=["admin-pricing"])
 
-import pathlib
-
-TEMPLATES_DIR = pathlib.Path(__file__).parent.parent / "templates"
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+# Statements scoped to one of the shop's rules — built once, bound per
+# request, so every call hits the engine's compiled-statement cache.
+_RULE_SCOPE = (
+    PriceRule.id == bindparam("rule_id"),
+    PriceRule.shop_id == bindparam("rule_shop_id"),
+)
+_SHOP_RULE = select(PriceRule).where(*_RULE_SCOPE)
+_UPDATE_RULE = update(PriceRule).where(*_RULE_SCOPE)
 
 
 @router.get("", response_class=HTMLResponse)
 async def pricing_list(
     request: Request,
-    shop: Optional[Shop] = Depends(get_current_shop),
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
     db: AsyncSession = Depends(get_db),
 ):
     """List all price rules for the shop."""
     if shop is None:
         return RedirectResponse(url="/admin/login")
 
-    # Fetch price rules with repair types
+    # Fetch price rules with their repair types in the same query
     result = await db.execute(
         select(PriceRule)
+        .options(joinedload(PriceRule.repair_type))
         .where(PriceRule.shop_id == shop.id, PriceRule.is_active == True)  # noqa: E712
         .order_by(PriceRule.priority.desc(), PriceRule.device_brand, PriceRule.device_model_pattern)
     )
     rules = result.scalars().all()
 
-    # Fetch repair types for labels
-    rt_result = await db.execute(select(RepairType))
-    repair_types = {str(rt.id): rt for rt in rt_result.scalars().all()}
-
     return templates.TemplateResponse("pricing/list.html", {
         "request": request,
         "shop": shop,
         "active_page": "pricing",
         "rules": rules,
-        "repair_types": repair_types,
     })
 
 
 @router.get("/new", response_class=HTMLResponse)
 async def pricing_new(
     request: Request,
-    shop: Optional[Shop] = Depends(get_current_shop),
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
     db: AsyncSession = Depends(get_db),
 ):
     """Form to create a new price rule."""
@@ -100,7 +99,7 @@ async def pricing_create(
     tier_description: str = Form(""),
     warranty_months: int = Form(3),
     notes: str = Form(""),
-    shop: Optional[Shop] = Depends(get_current_shop),
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
     db: AsyncSession = Depends(get_db),
 ):
     """Create a new price rule."""
@@ -138,8 +137,8 @@ async def pricing_create(
 @router.get("/{rule_id}/edit", response_class=HTMLResponse)
 async def pricing_edit(
     request: Request,
-    rule_id: str,
-    shop: Optional[Shop] = Depends(get_current_shop),
+    rule_id: uuid.UUID,
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
     db: AsyncSession = Depends(get_db),
 ):
     """Form to edit an existing price rule."""
@@ -147,10 +146,7 @@ async def pricing_edit(
         return RedirectResponse(url="/admin/login")
 
     result = await db.execute(
-        select(PriceRule).where(
-            PriceRule.id == uuid.UUID(rule_id),
-            PriceRule.shop_id == shop.id,
-        )
+        _SHOP_RULE, {"rule_id": rule_id, "rule_shop_id": shop.id}
     )
     rule = result.scalar_one_or_none()
     if not rule:
@@ -173,7 +169,7 @@ async def pricing_edit(
 @router.post("/{rule_id}", response_class=HTMLResponse)
 async def pricing_update(
     request: Request,
-    rule_id: str,
+    rule_id: uuid.UUID,
     repair_type_id: str = Form(...),
     device_brand: str = Form(""),
     device_model_pattern: str = Form(""),
@@ -183,7 +179,7 @@ async def pricing_update(
     tier_description: str = Form(""),
     warranty_months: int = Form(3),
     notes: str = Form(""),
-    shop: Optional[Shop] = Depends(get_current_shop),
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
     db: AsyncSession = Depends(get_db),
 ):
     """Update a price rule."""
@@ -196,10 +192,8 @@ async def pricing_update(
     if device_brand.strip() and device_model_pattern.strip():
         priority = 10
 
-    await db.execute(
-        update(PriceRule)
-        .where(PriceRule.id == uuid.UUID(rule_id), PriceRule.shop_id == shop.id)
-        .values(
+    result = await db.execute(
+        _UPDATE_RULE.values(
             repair_type_id=uuid.UUID(repair_type_id) if repair_type_id else None,
             device_brand=device_brand.strip() or None,
             device_model_pattern=device_model_pattern.strip() or None,
@@ -211,33 +205,42 @@ async def pricing_update(
             notes=notes.strip() or None,
             priority=priority,
             updated_at=datetime.now(timezone.utc),
-        )
+        ).returning(PriceRule.id),
+        {"rule_id": rule_id, "rule_shop_id": shop.id},
     )
+    if result.scalar_one_or_none() is None:
+        # Unknown rule or another shop's — nothing was updated
+        return RedirectResponse(url="/admin/pricing", status_code=303)
     await db.commit()
 
-    logger.info("price_rule_updated", rule_id=rule_id)
+    logger.info("price_rule_updated", rule_id=str(rule_id))
     return RedirectResponse(url="/admin/pricing", status_code=303)
 
 
 @router.delete("/{rule_id}", response_class=HTMLResponse)
 async def pricing_delete(
     request: Request,
-    rule_id: str,
-    shop: Optional[Shop] = Depends(get_current_shop),
+    rule_id: uuid.UUID,
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
     db: AsyncSession = Depends(get_db),
 ):
     """Soft-delete a price rule (set is_active=False)."""
     if shop is None:
         return HTMLResponse("Unauthorized", status_code=401)
 
-    await db.execute(
-        update(PriceRule)
-        .where(PriceRule.id == uuid.UUID(rule_id), PriceRule.shop_id == shop.id)
-        .values(is_active=False, updated_at=datetime.now(timezone.utc))
+    result = await db.execute(
+        _UPDATE_RULE.values(
+            is_active=False, updated_at=datetime.now(timezone.utc)
+        ).returning(PriceRule.id),
+        {"rule_id": rule_id, "rule_shop_id": shop.id},
     )
+    if result.scalar_one_or_none() is None:
+        # Unknown rule or another shop's — nothing was deleted
+        return HTMLResponse("Rule not found", status_code=404)
     await db.commit()
 
-    logger.info("price_rule_deleted", rule_id=rule_id)
+    logger.info("price_rule_deleted", rule_id=str(rule_id))
 
-    # Return empty for HTMX (row removed)
-    return HTMLResponse("")
+    # Empty body: HTMX swaps it in place of the row, removing it. (Not 204 —
+    # HTMX skips the swap entirely on 204 and the row would stay.)
+    return Response(status_code=200)
@@ -3,31 +3,26 @@
 from __future__ import annotations
 
 import uuid
-from datetime import datetime, timedelta, timezone
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone
 from typing import Optional
 
 import structlog
 from fastapi import APIRouter, Depends, Form, Query, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy import select, update, and_
+from sqlalchemy import and_, bindparam, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, raiseload
 
-from src.admin.dependencies import get_current_shop
+from src.admin.dependencies import ShopProxy, get_current_shop
+from src.admin.templating import templates
 from src.database import get_db
-from src.models.lead import Appointment, Lead
-from src.models.shop import Shop
+from src.models.lead import Appointment
 
 logger = structlog.get_logger()
 
 router = APIRouter(prefix="/admin/schedule", tags=["admin-schedule"])
 
-import pathlib
-
-TEMPLATES_DIR = pathlib.Path(__file__).parent.parent / "templates"
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
-
 STATUS_LABELS = {
     "pending": "Ожидает",
     "confirmed": "Подтверждена",
@@ -37,12 +32,20 @@ STATUS_LABELS = {
 
 DAYS_RU_SHORT = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
 
+_MIDNIGHT_UTC = time(0, 0, tzinfo=timezone.utc)
+
+# Status change for one of the shop's appointments — built once, bound per request
+_UPDATE_APPOINTMENT = update(Appointment).where(
+    Appointment.id == bindparam("appointment_id"),
+    Appointment.shop_id == bindparam("appointment_shop_id"),
+)
+
 
 @router.get("", response_class=HTMLResponse)
 async def schedule_page(
     request: Request,
     week_offset: int = Query(0),
-    shop: Optional[Shop] = Depends(get_current_shop),
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
     db: AsyncSession = Depends(get_db),
 ):
     """Weekly schedule view."""
@@ -57,26 +60,29 @@ async def schedule_page(
     # Fetch appointments for the week
     result = await db.execute(
         select(Appointment)
-        .options(selectinload(Appointment.lead))
+        # Many-to-one: fetch the lead in the same JOIN; any other lazy load
+        # (the template only touches apt.lead) raises instead of querying.
+        .options(joinedload(Appointment.lead), raiseload("*"))
         .where(
             and_(
                 Appointment.shop_id == shop.id,
-                Appointment.scheduled_at >= datetime.combine(week_start, datetime.min.time()).replace(tzinfo=timezone.utc),
-                Appointment.scheduled_at < datetime.combine(week_end, datetime.min.time()).replace(tzinfo=timezone.utc),
+                Appointment.scheduled_at >= datetime.combine(week_start, _MIDNIGHT_UTC),
+                Appointment.scheduled_at < datetime.combine(week_end, _MIDNIGHT_UTC),
             )
         )
         .order_by(Appointment.scheduled_at)
     )
     appointments = result.scalars().all()
 
-    # Group by day
+    # Group by day — one pass over the (time-ordered) appointments
+    by_day = defaultdict(list)
+    for a in appointments:
+        by_day[a.scheduled_at.date()].append(a)
+
     days = []
     for i in range(7):
         day = week_start + timedelta(days=i)
-        day_appointments = [
-            a for a in appointments
-            if a.scheduled_at.date() == day
-        ]
+        day_appointments = by_day.get(day, [])
         days.append({
             "date": day,
             "day_name": DAYS_RU_SHORT[i],
@@ -100,9 +106,9 @@ async def schedule_page(
 @router.patch("/{appointment_id}/status", response_class=HTMLResponse)
 async def update_appointment_status(
     request: Request,
-    appointment_id: str,
+    appointment_id: uuid.UUID,
     new_status: str = Form(...),
-    shop: Optional[Shop] = Depends(get_current_shop),
+    shop: Optional[ShopProxy] = Depends(get_current_shop),
     db: AsyncSession = Depends(get_db),
 ):
     """Update appointment status."""
@@ -113,17 +119,18 @@ async def update_appointment_status(
     if new_status not in valid:
         return HTMLResponse("Invalid status", status_code=400)
 
-    await db.execute(
-        update(Appointment)
-        .where(
-            Appointment.id == uuid.UUID(appointment_id),
-            Appointment.shop_id == shop.id,
-        )
-        .values(status=new_status)
+    result = await db.execute(
+        _UPDATE_APPOINTMENT.values(status=new_status).returning(Appointment.status),
+        {"appointment_id": appointment_id, "appointment_shop_id": shop.id},
     )
+    status = result.scalar_one_or_none()
+    if status is None:
+        # Unknown appointment or another shop's — nothing was updated
+        return HTMLResponse("Appointment not found", status_code=404)
     await db.commit()
 
-    label = STATUS_LABELS.get(new_status, new_status)
+    # Badge reflects the row as written
+    label = STATUS_LABELS.get(status, status)
     return HTMLResponse(
-        f'<span class="badge badge-{new_status}">{label}</span>'
+        f'<span class="badge badge-{status}">{label}</span>'
     )
@@ -3,28 +3,28 @@
 from __future__ import annotations
 
 import json
+from datetime import datetime
 from typing import Optional
 
 import structlog
-from fastapi import APIRouter, Depends, Form, Request
+from fastapi import APIRouter, Cookie, Depends, Form, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from redis.asyncio import Redis
 from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.admin.dependencies import get_current_shop
+from src.admin.auth import update_session
+from src.admin.dependencies import get_current_shop_full
+from src.admin.templating import templates
+from src.bot.middleware import invalidate_shop_cache
 from src.database import get_db
 from src.models.shop import Shop
+from src.redis_client import get_redis
 
 logger = structlog.get_logger()
 
 router = APIRouter(prefix="/admin/settings", tags=["admin-settings"])
 
-import pathlib
-
-TEMPLATES_DIR = pathlib.Path(__file__).parent.parent / "templates"
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
-
 PERSONALITY_OPTIONS = [
     ("friendly", "Дружелюбный", "Тёплый и неформальный стиль. Эмодзи, шутки, эмпатия."),
     ("professional", "Профессиональный", "Вежливый и деловой. Без лишних эмоций."),
@@ -46,7 +46,7 @@ DAYS_RU = {
 async def settings_page(
     request: Request,
     saved: Optional[str] = None,
-    shop: Optional[Shop] = Depends(get_current_shop),
+    shop: Optional[Shop] = Depends(get_current_shop_full),
     db: AsyncSession = Depends(get_db),
 ):
     """Shop and bot settings page."""
@@ -80,8 +80,12 @@ async def save_settings(
     offer_appointment: bool = Form(False),
     # Working hours (JSON string from form)
     working_hours_json: str = Form("{}"),
-    shop: Optional[Shop] = Depends(get_current_shop),
+    # Shop.updated_at as rendered into the form — guards against lost updates
+    known_updated_at: str = Form(""),
+    admin_token: Optional[str] = Cookie(None),
+    shop: Optional[Shop] = Depends(get_current_shop_full),
     db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
 ):
     """Save shop settings."""
     if shop is None:
@@ -107,10 +111,34 @@ async def save_settings(
         "working_hours": working_hours,
     }
 
-    await db.execute(
-        update(Shop).where(Shop.id == shop.id).values(**values)
-    )
+    stmt = update(Shop).where(Shop.id == shop.id)
+    if known_updated_at:
+        # Optimistic check: only write if nobody saved since this form was rendered
+        try:
+            stmt = stmt.where(Shop.updated_at == datetime.fromisoformat(known_updated_at))
+        except ValueError:
+            return HTMLResponse("Invalid form", status_code=400)
+
+    result = await db.execute(stmt.values(**values).returning(Shop.id))
+    if result.scalar_one_or_none() is None:
+        # Saved from another tab in the meantime — show the current values
+        logger.info("shop_settings_conflict", shop_id=str(shop.id))
+        return templates.TemplateResponse("settings/index.html", {
+            "request": request,
+            "shop": shop,
+            "active_page": "settings",
+            "personality_options": PERSONALITY_OPTIONS,
+            "days_ru": DAYS_RU,
+            "conflict": True,
+        }, status_code=409)
+    # Commit before touching the caches: a webhook reading in between would
+    # otherwise re-cache the old settings
     await db.commit()
 
+    # Keep the session's shop snapshot in sync (sidebar shows the name)
+    await update_session(redis, admin_token, shop_name=values["name"])
+    # Webhooks read bot settings from a cached snapshot — refresh it
+    await invalidate_shop_cache(redis, shop)
+
     logger.info("shop_settings_saved", shop_id=str(shop.id))
     return RedirectResponse(url="/admin/settings?saved=1", status_code=303)
@@ -1,15 +1,22 @@
 """Admin API — shop management (superadmin)."""
 
+import uuid
+
 import structlog
 from aiogram import Bot
 from fastapi import APIRouter, Depends, HTTPException, Security
 from fastapi.security import APIKeyHeader
+from redis.asyncio import Redis
+from sqlalchemy import update as sa_update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.admin.auth import delete_shop_sessions
 from src.bot.factory import get_or_create_bot
+from src.bot.middleware import forget_unknown_token, invalidate_shop_cache
 from src.config import settings
 from src.database import get_db
 from src.models.shop import Shop
+from src.redis_client import get_redis
 from src.schemas.shop import ShopCreate, ShopResponse
 
 logger = structlog.get_logger()
@@ -88,6 +95,42 @@ async def create_shop(
         )
 
     await db.commit()
+    forget_unknown_token(data.telegram_bot_token)
+
+    return ShopResponse(
+        id=str(shop.id),
+        slug=shop.slug,
+        name=shop.name,
+        telegram_bot_username=shop.telegram_bot_username,
+        language=shop.language,
+        currency=shop.currency,
+        is_active=shop.is_active,
+    )
+
+
+@router.post("/shops/{shop_id}/deactivate", response_model=ShopResponse)
+async def deactivate_shop(
+    shop_id: uuid.UUID,
+    _key: str = Depends(require_admin_key),
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
+) -> ShopResponse:
+    """Deactivate a shop: its bot stops answering and its admins are logged out."""
+    result = await db.execute(
+        sa_update(Shop)
+        .where(Shop.id == shop_id)
+        .values(is_active=False)
+        .returning(Shop)
+    )
+    shop = result.scalar_one_or_none()
+    if shop is None:
+        raise HTTPException(status_code=404, detail="Shop not found")
+    await db.commit()
+
+    # Only after the commit — a webhook in between would re-cache the shop
+    await invalidate_shop_cache(redis, shop)
+    await delete_shop_sessions(redis, str(shop.id))
+    logger.info("shop_deactivated", shop_id=str(shop.id), slug=shop.slug)
 
     return ShopResponse(
         id=str(shop.id),
@@ -1,10 +1,8 @@
 """Landing page demo request endpoint — sends leads to Telegram."""
 
-import time
-from collections import defaultdict
-
 import httpx
 import structlog
+from cachetools import TTLCache
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 
@@ -13,9 +11,10 @@ from src.config import settings
 logger = structlog.get_logger()
 router = APIRouter(prefix="/api/landing", tags=["landing"])
 
-# Simple per-IP rate limit: 1 request per 60 seconds
-_last_request: dict[str, float] = defaultdict(float)
+# Simple per-IP rate limit: 1 request per 60 seconds. An IP stays in the
+# cache for the cooldown only, so the table can't grow without bound.
 _COOLDOWN = 60
+_recent_ips: TTLCache = TTLCache(maxsize=10_000, ttl=_COOLDOWN)
 
 _TELEGRAM_API = "https://api.telegram.org/bot{token}/sendMessage"
 
@@ -45,10 +44,9 @@ async def submit_demo_request(body: DemoRequest, request: Request):
     """Accept demo request from landing page and send to Telegram."""
     # Rate limit by IP
     ip = request.client.host if request.client else "unknown"
-    now = time.time()
-    if now - _last_request[ip] < _COOLDOWN:
+    if ip in _recent_ips:
         raise HTTPException(status_code=429, detail="Подождите минуту перед повторной отправкой")
-    _last_request[ip] = now
+    _recent_ips[ip] = True
 
     token = settings.notify_tg_bot_token
     chat_id = settings.notify_tg_chat_id
@@ -15,6 +15,21 @@ logger = structlog.get_logger()
 
 router = APIRouter(prefix="/api/v1", tags=["leads"])
 
+# Fields returned per lead, in response order
+_LEAD_COLUMNS = (
+    Lead.id,
+    Lead.customer_name,
+    Lead.customer_phone,
+    Lead.device_category,
+    Lead.device_full_name,
+    Lead.problem_summary,
+    Lead.urgency,
+    Lead.estimated_price_min,
+    Lead.estimated_price_max,
+    Lead.status,
+    Lead.created_at,
+)
+
 
 @router.get("/leads")
 async def list_leads(
@@ -37,36 +52,44 @@ async def list_leads(
     Returns:
         {"leads": [...], "total": int}
     """
-    stmt = select(Lead).where(Lead.shop_id == shop_id)
-
+    conditions = [Lead.shop_id == shop_id]
     if status:
-        stmt = stmt.where(Lead.status == status)
+        conditions.append(Lead.status == status)
+
+    # Fetch page — plain rows, no ORM objects to build and track. The
+    # total rides along as a window count over the filtered set.
+    stmt = (
+        select(*_LEAD_COLUMNS, func.count().over().label("total"))
+        .where(*conditions)
+        .order_by(Lead.created_at.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+    rows = (await db.execute(stmt)).mappings().all()
 
-    # Count total
-    count_stmt = select(func.count()).select_from(stmt.subquery())
-    total = (await db.execute(count_stmt)).scalar_one()
+    if rows:
+        total = rows[0]["total"]
+    elif offset > 0:
+        # Past the end — no row to carry the window count
+        count_stmt = select(func.count()).select_from(Lead).where(*conditions)
+        total = (await db.execute(count_stmt)).scalar_one()
+    else:
+        total = 0
 
-    # Fetch page
-    stmt = stmt.order_by(Lead.created_at.desc()).offset(offset).limit(limit)
-    result = await db.execute(stmt)
-    leads = result.scalars().all()
+    leads = []
+    for row in rows:
+        lead = dict(row)
+        del lead["total"]
+        lead["id"] = str(lead["id"])
+        price_min = lead["estimated_price_min"]
+        lead["estimated_price_min"] = float(price_min) if price_min else None
+        price_max = lead["estimated_price_max"]
+        lead["estimated_price_max"] = float(price_max) if price_max else None
+        created_at = lead["created_at"]
+        lead["created_at"] = created_at.isoformat() if created_at else None
+        leads.append(lead)
 
     return {
-        "leads": [
-            {
-                "id": str(lead.id),
-                "customer_name": lead.customer_name,
-                "customer_phone": lead.customer_phone,
-                "device_category": lead.device_category,
-                "device_full_name": lead.device_full_name,
-                "problem_summary": lead.problem_summary,
-                "urgency": lead.urgency,
-                "estimated_price_min": float(lead.estimated_price_min) if lead.estimated_price_min else None,
-                "estimated_price_max": float(lead.estimated_price_max) if lead.estimated_price_max else None,
-                "status": lead.status,
-                "created_at": lead.created_at.isoformat() if lead.created_at else None,
-            }
-            for lead in leads
-        ],
+        "leads": leads,
         "total": total,
     }
@@ -2,25 +2,33 @@
 
 from typing import Optional
 
+import orjson
 import structlog
 from aiogram import Bot
-from aiogram.types import Update
+from aiogram.types import CallbackQuery, Message
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.bot.factory import get_or_create_bot
-from src.bot.handlers.message import handle_callback, handle_message
-from src.bot.middleware import get_shop_by_token
+from src.bot.factory import evict_bot, get_or_create_bot
+from src.bot.handlers.message import dispatcher, handle_callback, handle_message
+from src.bot.middleware import get_cached_shop_by_token
 from src.config import settings
-from src.conversation.engine import ConversationEngine
 from src.conversation.session import SessionManager
-from src.database import get_db
+from src.database import async_session_factory, get_db
 from src.redis_client import get_redis
 
 logger = structlog.get_logger()
 
 router = APIRouter()
 
+# Update kind (the payload key carrying the event) -> (event model, handler).
+# Only the event object is validated — not the Update wrapper around it.
+_UPDATE_HANDLERS = {
+    "message": (Message, handle_message),
+    "callback_query": (CallbackQuery, handle_callback),
+}
+
+
 @router.post("/webhook/telegram/{shop_token}")
 async def telegram_webhook(
     shop_token: str,
@@ -46,80 +54,90 @@ async def telegram_webhook(
         logger.warning("webhook_invalid_secret", token_prefix=shop_token[:10])
         raise HTTPException(status_code=403, detail="Invalid secret")
 
-    # 2. Resolve shop from token
-    shop = await get_shop_by_token(db, shop_token)
-    if not shop:
-        logger.warning("webhook_unknown_shop", token_prefix=shop_token[:10])
-        raise HTTPException(status_code=404, detail="Shop not found")
-
-    # 3. Parse the Telegram update
+    # 2. Decode the body
     try:
-        body = await request.json()
-        bot = await get_or_create_bot(shop_token)
-        update = Update.model_validate(body, context={"bot": bot})
-    except Exception as e:
+        body = orjson.loads(await request.body())
+    except orjson.JSONDecodeError as e:
         logger.error("webhook_parse_error", error=str(e))
         raise HTTPException(status_code=400, detail="Invalid update")
+    if not isinstance(body, dict):
+        logger.error("webhook_parse_error", error="update is not an object")
+        raise HTTPException(status_code=400, detail="Invalid update")
 
-    # 4. Create engine with shop settings for LLM personalization
-    redis = await get_redis()
-
-    shop_config = {
-        "bot_personality": getattr(shop, "bot_personality", None) or "friendly",
-        "greeting_text": getattr(shop, "greeting_text", None),
-        "promo_text": getattr(shop, "promo_text", None),
-        "bot_faq_custom": getattr(shop, "bot_faq_custom", None),
-        "address": getattr(shop, "address", None),
-        "shop_name": getattr(shop, "name", None),
-        "timezone": getattr(shop, "timezone", None) or "Europe/Moscow",
-        "owner_telegram_id": getattr(shop, "owner_telegram_id", None),
-        "telegram_bot_token": shop_token,
-    }
-
-    # Route to the correct engine based on shop.product_type
-    product_type = getattr(shop, "product_type", "auto_repair") or "auto_repair"
+    # 3. Pick the handler by update kind — the one key besides update_id.
+    #    Kinds we don't handle (edited messages, member updates, ...) are
+    #    acknowledged before the shop lookup, validation or engine setup.
+    kind = next((key for key in body if key != "update_id"), None)
+    route = _UPDATE_HANDLERS.get(kind)
+    if route is None:
+        return {"ok": True}
+    event_model, handler = route
 
-    engine = _create_engine(product_type, redis, shop_config, db)
+    # 4. Resolve shop from token (cached snapshot, not an ORM row)
+    redis = await get_redis()
+    shop = await get_cached_shop_by_token(db, redis, shop_token)
+    if not shop:
+        logger.warning("webhook_unknown_shop", token_prefix=shop_token[:10])
+        # Token no longer maps to an active shop — don't keep its Bot around
+        evict_bot(shop_token)
+        raise HTTPException(status_code=404, detail="Shop not found")
 
     # 5. Owner-only restriction: if shop.plan == "free", only the owner can use the bot
-    #    This is a dev/testing restriction — remove when opening to public
-    user_id = _extract_user_id(update)
-    owner_id = getattr(shop, "owner_telegram_id", None)
+    #    This is a dev/testing restriction — remove when opening to public.
+    #    Checked on the raw payload so rejected updates skip model validation.
+    user_id = _extract_user_id(body)
+    owner_id = shop.get("owner_telegram_id")
     if owner_id and user_id and user_id != owner_id:
         logger.info("webhook_blocked_non_owner", user_id=user_id, owner_id=owner_id)
         # Silently ignore — don't even respond
         return {"ok": True}
 
-    # 6. Route to handler
-    shop_id = str(shop.id)
-
-    if update.message:
-        await handle_message(
-            message=update.message,
-            bot=bot,
-            engine=engine,
-            shop_id=shop_id,
-            shop_config=shop_config,
-        )
-    elif update.callback_query:
-        await handle_callback(
-            callback=update.callback_query,
-            bot=bot,
-            engine=engine,
-            shop_id=shop_id,
-            shop_config=shop_config,
-        )
+    # 6. Validate the update and create engine with shop settings for LLM personalization
+    try:
+        bot = await get_or_create_bot(shop_token)
+        event = event_model.model_validate(body[kind], context={"bot": bot})
+    except Exception as e:
+        logger.error("webhook_parse_error", error=str(e))
+        raise HTTPException(status_code=400, detail="Invalid update")
+
+    # The cached snapshot carries no token; this request's URL has it
+    shop_config = {**shop["shop_config"], "telegram_bot_token": shop_token}
+    shop_id = shop["id"]
+
+    # Route to the correct engine based on shop.product_type
+    product_type = shop.get("product_type") or "auto_repair"
+
+    # 7. Hand off to the dispatcher and acknowledge right away — the LLM
+    #    call would otherwise hold Telegram's request open. The work runs
+    #    after this request's DB session is gone, so it gets its own.
+    async def process() -> None:
+        async with async_session_factory() as session:
+            engine = _create_engine(product_type, redis, shop_config, session)
+            await handler(
+                event,
+                bot=bot,
+                engine=engine,
+                shop=shop,
+            )
+            await session.commit()
+
+    dispatcher.submit(f"{shop_id}:{user_id}", process)
 
     return {"ok": True}
 
 
-def _extract_user_id(update: Update) -> Optional[int]:
-    """Extract Telegram user ID from any update type."""
-    if update.message and update.message.from_user:
-        return update.message.from_user.id
-    if update.callback_query and update.callback_query.from_user:
-        return update.callback_query.from_user.id
-    return None
+def _extract_user_id(body: dict) -> Optional[int]:
+    """Extract the sender's Telegram user ID from a raw update payload."""
+    if not isinstance(body, dict):
+        return None
+    event = body.get("message") or body.get("callback_query")
+    if not isinstance(event, dict):
+        return None
+    sender = event.get("from")
+    if not isinstance(sender, dict):
+        return None
+    user_id = sender.get("id")
+    return user_id if isinstance(user_id, int) else None
 
 
 def _create_engine(product_type: str, redis, shop_config: dict, db):
@@ -131,6 +149,9 @@ def _create_engine(product_type: str, redis, shop_config: dict, db):
         session_manager = SessionManager(redis, state_model=BuildSessionState)
         return BuildConversationEngine(session_manager, shop_config=shop_config, db=db)
     else:
-        # Default: auto_repair
+        # Default: auto_repair. Imported here, like the inbuild engine, so
+        # the LLM client stack loads on the first update, not at app startup.
+        from src.conversation.engine import ConversationEngine
+
         session_manager = SessionManager(redis)
         return ConversationEngine(session_manager, shop_config=shop_config, db=db)
@@ -2,12 +2,16 @@
 
 from __future__ import annotations
 
+import time
+import uuid
+
 import structlog
 from fastapi import APIRouter, Depends, Form, Request, Response
+from redis.asyncio import Redis
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.conversation.engine import ConversationEngine
+from src.bot.middleware import get_cached_shop_by_whatsapp, shop_snapshot
 from src.conversation.session import SessionManager
 from src.database import get_db
 from src.models.shop import Shop
@@ -25,30 +29,51 @@ logger = structlog.get_logger()
 router = APIRouter()
 
 
-async def _resolve_shop(db: AsyncSession, to_number: str) -> Shop | None:
+async def _resolve_shop(db: AsyncSession, redis: Redis, to_number: str) -> dict | None:
     """Find shop by WhatsApp phone number.
 
     For sandbox testing, if no shop has whatsapp_phone_number set,
     fall back to the first active shop (single-tenant mode).
+
+    Returns a shop snapshot dict (see src.bot.middleware.shop_snapshot).
     """
     # Try exact match on whatsapp_phone_number
-    result = await db.execute(
-        select(Shop).where(
-            Shop.whatsapp_phone_number == to_number,
-            Shop.is_active == True,  # noqa: E712
-        )
-    )
-    shop = result.scalar_one_or_none()
-    if shop:
-        return shop
+    snapshot = await get_cached_shop_by_whatsapp(db, redis, to_number)
+    if snapshot:
+        return snapshot
 
     # Sandbox fallback: use first active shop
+    shop = await _get_fallback_shop(db)
+    if shop:
+        logger.info("whatsapp_sandbox_fallback", shop_id=str(shop.id))
+        return shop_snapshot(shop)
+    return None
+
+
+# Sandbox fallback shop id and when it was picked. In sandbox mode every
+# message takes the fallback path, so remember the pick and load it by
+# primary key instead of re-running the "first active shop" query.
+FALLBACK_SHOP_TTL = 300  # seconds
+_fallback_shop: tuple[uuid.UUID, float] | None = None
+
+
+async def _get_fallback_shop(db: AsyncSession) -> Shop | None:
+    """First active shop, remembered per process for FALLBACK_SHOP_TTL."""
+    global _fallback_shop
+    if _fallback_shop is not None:
+        shop_id, picked_at = _fallback_shop
+        if time.monotonic() - picked_at < FALLBACK_SHOP_TTL:
+            shop = await db.get(Shop, shop_id)
+            if shop is not None and shop.is_active:
+                return shop
+        _fallback_shop = None
+
     result = await db.execute(
         select(Shop).where(Shop.is_active == True).limit(1)  # noqa: E712
     )
     shop = result.scalar_one_or_none()
-    if shop:
-        logger.info("whatsapp_sandbox_fallback", shop_id=str(shop.id))
+    if shop is not None:
+        _fallback_shop = (shop.id, time.monotonic())
     return shop
 
 
@@ -91,28 +116,20 @@ async def whatsapp_webhook(
     )
 
     # 1. Resolve shop
-    shop = await _resolve_shop(db, to_number)
+    redis = await get_redis()
+    shop = await _resolve_shop(db, redis, to_number)
     if not shop:
         logger.warning("whatsapp_no_shop", to_number=to_number)
         return Response(status_code=200)
 
-    shop_id = str(shop.id)
+    shop_id = shop["id"]
+
+    # 2. Build engine (imported on first use — it pulls in the LLM client stack)
+    from src.conversation.engine import ConversationEngine
 
-    # 2. Build engine
-    redis = await get_redis()
     session_manager = SessionManager(redis)
 
-    shop_config = {
-        "bot_personality": getattr(shop, "bot_personality", None) or "friendly",
-        "greeting_text": getattr(shop, "greeting_text", None),
-        "promo_text": getattr(shop, "promo_text", None),
-        "bot_faq_custom": getattr(shop, "bot_faq_custom", None),
-        "address": getattr(shop, "address", None),
-        "shop_name": getattr(shop, "name", None),
-        "timezone": getattr(shop, "timezone", None) or "Europe/Moscow",
-        "owner_telegram_id": getattr(shop, "owner_telegram_id", None),
-        "telegram_bot_token": getattr(shop, "telegram_bot_token", None),
-    }
+    shop_config = shop["shop_config"]
 
     engine = ConversationEngine(session_manager, shop_config=shop_config, db=db)
 
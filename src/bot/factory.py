@@ -2,14 +2,28 @@
 
 from __future__ import annotations
 
+from typing import Optional
+
 from aiogram import Bot
-from cachetools import TTLCache
+from aiogram.client.session.aiohttp import AiohttpSession
 import structlog
 
 logger = structlog.get_logger()
 
-# Cache bot instances for 5 minutes to avoid re-creating on each request
-_bot_cache: TTLCache[str, Bot] = TTLCache(maxsize=100, ttl=300)
+# One Bot per token for the life of the process. Tokens only come from
+# shop rows, so the set stays small. All bots share a single HTTP session
+# (one aiohttp connector and pool to api.telegram.org) instead of each
+# opening its own.
+_bots: dict[str, Bot] = {}
+_session: Optional[AiohttpSession] = None
+
+
+def _get_session() -> AiohttpSession:
+    """Return the HTTP session shared by every cached Bot."""
+    global _session
+    if _session is None:
+        _session = AiohttpSession()
+    return _session
 
 
 async def get_or_create_bot(telegram_token: str) -> Bot:
@@ -21,13 +35,36 @@ async def get_or_create_bot(telegram_token: str) -> Bot:
     Returns:
         Bot instance ready to use
     """
-    if telegram_token not in _bot_cache:
-        bot = Bot(token=telegram_token)
-        _bot_cache[telegram_token] = bot
+    bot = _bots.get(telegram_token)
+    if bot is None:
+        # Construction is synchronous — nothing can interleave between the
+        # miss and the insert, so no lock is needed. Duplicates would be
+        # harmless anyway: bots own no connections of their own.
+        bot = _bots.setdefault(
+            telegram_token, Bot(token=telegram_token, session=_get_session())
+        )
         logger.debug("bot_created", token_prefix=telegram_token[:10])
-    return _bot_cache[telegram_token]
+    return bot
+
+
+def evict_bot(telegram_token: str) -> None:
+    """Drop a cached Bot, e.g. after a shop's token is changed or revoked.
+
+    The shared HTTP session stays open for the remaining bots.
+    """
+    if _bots.pop(telegram_token, None) is not None:
+        logger.debug("bot_evicted", token_prefix=telegram_token[:10])
 
 
 def clear_bot_cache() -> None:
     """Clear all cached bot instances."""
-    _bot_cache.clear()
+    _bots.clear()
+
+
+async def close_bots() -> None:
+    """Close the shared HTTP session and forget all bots (called on shutdown)."""
+    global _session
+    _bots.clear()
+    if _session is not None:
+        await _session.close()
+        _session = None
@@ -4,11 +4,18 @@ Supports any engine that implements handle_message/handle_callback
 (auto-repair ConversationEngine, construction BuildConversationEngine, etc.)
 """
 
+import asyncio
+import traceback
+from collections.abc import Awaitable, Callable
+from datetime import date
+from typing import Any, Optional, Protocol
+from weakref import WeakValueDictionary
+
 import structlog
 from aiogram import Bot
 from aiogram.types import Message, CallbackQuery
-from typing import Any, Optional, Protocol
 
+from src.config import settings
 from src.redis_client import get_redis
 
 logger = structlog.get_logger()
@@ -46,32 +53,35 @@ class EngineProtocol(Protocol):
     ) -> Any: ...
 
 
-async def _check_daily_new_users_limit(user_id: str, owner_telegram_id: Optional[int]) -> bool:
-    """Check if we've exceeded the daily new users cap (anti-abuse).
+async def _check_usage_limits(
+    user_id: str, owner_telegram_id: Optional[int]
+) -> tuple[bool, bool]:
+    """Check the daily new-users cap (anti-abuse) and the demo message limit.
 
-    Returns True if the user is allowed, False if blocked.
-    Already-seen users and the owner are always allowed.
+    Both counters are read in one Redis round-trip.
+
+    Returns (daily_ok, demo_ok). Already-seen users pass the daily cap;
+    the owner always gets unlimited access.
     """
     if owner_telegram_id and str(owner_telegram_id) == user_id:
-        return True
+        return True, True
 
     redis = await get_redis()
 
-    # If this user already has a message counter, they're not new — allow
-    existing = await redis.exists(f"demo_msg_count:{user_id}")
-    if existing:
-        return True
-
-    # Check daily new users counter
-    from datetime import date
     daily_key = f"demo_daily_new_users:{date.today().isoformat()}"
-    count = await redis.get(daily_key)
+    pipe = redis.pipeline()
+    pipe.get(f"demo_msg_count:{user_id}")
+    pipe.get(daily_key)
+    msg_count, new_users = await pipe.execute()
 
-    if count is not None and int(count) >= DAILY_NEW_USERS_LIMIT:
-        logger.warning("daily_new_users_limit_reached", user_id=user_id, count=int(count))
-        return False
+    # A user with a message counter is not new — the daily cap doesn't apply
+    daily_ok = True
+    if msg_count is None and new_users is not None and int(new_users) >= DAILY_NEW_USERS_LIMIT:
+        logger.warning("daily_new_users_limit_reached", user_id=user_id, count=int(new_users))
+        daily_ok = False
 
-    return True
+    demo_ok = msg_count is None or int(msg_count) < DEMO_MESSAGE_LIMIT
+    return daily_ok, demo_ok
 
 
 async def _increment_daily_new_users(user_id: str, owner_telegram_id: Optional[int]) -> None:
@@ -86,7 +96,6 @@ async def _increment_daily_new_users(user_id: str, owner_telegram_id: Optional[i
     if existing:
         return
 
-    from datetime import date
     daily_key = f"demo_daily_new_users:{date.today().isoformat()}"
     pipe = redis.pipeline()
     pipe.incr(daily_key)
@@ -94,27 +103,73 @@ async def _increment_daily_new_users(user_id: str, owner_telegram_id: Optional[i
     await pipe.execute()
 
 
-async def _check_demo_limit(
-    user_id: str,
-    owner_telegram_id: Optional[int],
-) -> bool:
-    """Check if the user has exceeded the demo message limit.
+async def _record_usage(user_id: str, owner_telegram_id: Optional[int]) -> None:
+    """Count a successfully handled message against the demo limits."""
+    # Register new user in daily counter (before incrementing msg count)
+    await _increment_daily_new_users(user_id, owner_telegram_id)
+    await _increment_demo_count(user_id, owner_telegram_id)
 
-    Returns True if the user is allowed to send messages, False if blocked.
-    Owner (owner_telegram_id) always gets unlimited access.
-    """
-    # Owner always has unlimited access
-    if owner_telegram_id and str(owner_telegram_id) == user_id:
-        return True
 
-    redis = await get_redis()
-    key = f"demo_msg_count:{user_id}"
-    count = await redis.get(key)
+class MessageDispatcher:
+    """Runs update handling in background tasks with bounded concurrency.
 
-    if count is not None and int(count) >= DEMO_MESSAGE_LIMIT:
-        return False
+    The webhook acknowledges Telegram right away instead of holding the
+    request open for the LLM call. At most `max_inflight` updates are
+    processed at once; one user's updates still run one at a time, in
+    arrival order. Each run is capped at `timeout` seconds.
+    """
 
-    return True
+    def __init__(self, max_inflight: int, timeout: float) -> None:
+        self._max_inflight = max_inflight
+        # Created on first use, inside the running loop — the instance is
+        # built at import time, and before 3.10 asyncio primitives bind to
+        # the loop current at construction
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._timeout = timeout
+        self._tasks: set[asyncio.Task] = set()
+        self._chat_locks: WeakValueDictionary[str, asyncio.Lock] = WeakValueDictionary()
+
+    def submit(self, chat_key: str, work: Callable[[], Awaitable[None]]) -> None:
+        """Schedule `work()` for the chat identified by `chat_key`."""
+        task = asyncio.create_task(self._run(chat_key, work))
+        # Strong reference until done — the loop only keeps weak ones
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, chat_key: str, work: Callable[[], Awaitable[None]]) -> None:
+        lock = self._chat_locks.get(chat_key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._chat_locks[chat_key] = lock
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_inflight)
+
+        async with lock, self._semaphore:
+            try:
+                await asyncio.wait_for(work(), timeout=self._timeout)
+            except asyncio.TimeoutError:
+                logger.error("dispatch_timeout", chat_key=chat_key, timeout=self._timeout)
+            except Exception as e:
+                logger.error(
+                    "dispatch_error",
+                    chat_key=chat_key,
+                    error=str(e),
+                    error_type=type(e).__name__,
+                    exc_info=e,
+                )
+
+    async def drain(self, timeout: float) -> None:
+        """Wait up to `timeout` seconds for in-flight work (called on shutdown)."""
+        if self._tasks:
+            logger.info("dispatch_draining", pending=len(self._tasks))
+            await asyncio.wait(set(self._tasks), timeout=timeout)
+
+
+dispatcher = MessageDispatcher(
+    max_inflight=settings.max_inflight_llm,
+    timeout=settings.llm_timeout_s,
+)
 
 
 async def _increment_demo_count(user_id: str, owner_telegram_id: Optional[int]) -> None:
@@ -134,8 +189,7 @@ async def handle_message(
     message: Message,
     bot: Bot,
     engine: EngineProtocol,
-    shop_id: str,
-    shop_config: Optional[dict] = None,
+    shop: dict,
 ) -> None:
     """Handle incoming text message from Telegram.
 
@@ -143,8 +197,8 @@ async def handle_message(
         message: Telegram message object
         bot: Bot instance for the shop
         engine: Any conversation engine (ConversationEngine or BuildConversationEngine)
-        shop_id: UUID of the shop
-        shop_config: Shop configuration dict (includes owner_telegram_id)
+        shop: Shop snapshot resolved once per update by the webhook
+            (see src.bot.middleware.shop_snapshot)
     """
     if not message.text:
         await message.answer("Пока я понимаю только текстовые сообщения.")
@@ -152,7 +206,8 @@ async def handle_message(
 
     user_id = str(message.from_user.id)
     username = message.from_user.username
-    owner_telegram_id = (shop_config or {}).get("owner_telegram_id")
+    shop_id = shop["id"]
+    owner_telegram_id = shop.get("owner_telegram_id")
 
     logger.info(
         "message_received",
@@ -162,18 +217,16 @@ async def handle_message(
     )
 
     # Check daily new users limit (anti-abuse: max 100 new users/day)
-    daily_ok = await _check_daily_new_users_limit(user_id, owner_telegram_id)
+    daily_ok, demo_ok = await _check_usage_limits(user_id, owner_telegram_id)
     if not daily_ok:
         await message.answer(DAILY_LIMIT_TEXT)
         return
 
     # Check demo message limit (skip for /start so users get the greeting)
     lower_text = message.text.lower().strip()
-    if lower_text not in ("/start", "start", "начать"):
-        allowed = await _check_demo_limit(user_id, owner_telegram_id)
-        if not allowed:
-            await message.answer(DEMO_LIMIT_TEXT)
-            return
+    if lower_text not in ("/start", "start", "начать") and not demo_ok:
+        await message.answer(DEMO_LIMIT_TEXT)
+        return
 
     try:
         result = await engine.handle_message(
@@ -183,36 +236,37 @@ async def handle_message(
             user_telegram_username=username,
         )
     except Exception as e:
-        import traceback
-        logger.error(
-            "handle_message_error",
-            error=str(e),
-            error_type=type(e).__name__,
-            traceback=traceback.format_exc(),
-            user_id=user_id,
-            text_preview=message.text[:50] if message.text else "",
-        )
-        await message.answer(
-            "Хм, что-то у меня не сложилось. Повторите, пожалуйста, "
-            "или напишите «мастер» — подключу живого специалиста."
-        )
+        # Apologise first — the user shouldn't wait on traceback formatting.
+        # The error is logged even if the apology itself fails.
+        try:
+            await message.answer(
+                "Хм, что-то у меня не сложилось. Повторите, пожалуйста, "
+                "или напишите «мастер» — подключу живого специалиста."
+            )
+        finally:
+            logger.error(
+                "handle_message_error",
+                error=str(e),
+                error_type=type(e).__name__,
+                traceback="".join(traceback.format_exception(type(e), e, e.__traceback__)),
+                user_id=user_id,
+                text_preview=message.text[:50],
+            )
         return
 
-    # Register new user in daily counter (before incrementing msg count)
-    await _increment_daily_new_users(user_id, owner_telegram_id)
-
-    # Increment demo counter after successful processing
-    await _increment_demo_count(user_id, owner_telegram_id)
-
-    await _send_result(message, result)
+    # Reply while the usage counters are updated — the counters only
+    # matter from the next message on.
+    await asyncio.gather(
+        _send_result(message, result),
+        _record_usage(user_id, owner_telegram_id),
+    )
 
 
 async def handle_callback(
     callback: CallbackQuery,
     bot: Bot,
     engine: EngineProtocol,
-    shop_id: str,
-    shop_config: Optional[dict] = None,
+    shop: dict,
 ) -> None:
     """Handle inline keyboard callback.
 
@@ -220,18 +274,19 @@ async def handle_callback(
         callback: Telegram callback query
         bot: Bot instance
         engine: Any conversation engine (ConversationEngine or BuildConversationEngine)
-        shop_id: UUID of the shop
-        shop_config: Shop configuration dict (includes owner_telegram_id)
+        shop: Shop snapshot resolved once per update by the webhook
+            (see src.bot.middleware.shop_snapshot)
     """
     if not callback.data:
         await callback.answer()
         return
 
     user_id = str(callback.from_user.id)
-    owner_telegram_id = (shop_config or {}).get("owner_telegram_id")
+    shop_id = shop["id"]
+    owner_telegram_id = shop.get("owner_telegram_id")
 
     # Check daily new users limit
-    daily_ok = await _check_daily_new_users_limit(user_id, owner_telegram_id)
+    daily_ok, demo_ok = await _check_usage_limits(user_id, owner_telegram_id)
     if not daily_ok:
         await callback.answer()
         if callback.message:
@@ -239,8 +294,7 @@ async def handle_callback(
         return
 
     # Check demo limit for callbacks too
-    allowed = await _check_demo_limit(user_id, owner_telegram_id)
-    if not allowed:
+    if not demo_ok:
         await callback.answer(DEMO_LIMIT_TEXT[:200])  # callback answer max 200 chars
         if callback.message:
             await callback.message.answer(DEMO_LIMIT_TEXT)
@@ -269,15 +323,12 @@ async def handle_callback(
             )
         return
 
-    # Increment demo counter after successful processing
-    await _increment_demo_count(user_id, owner_telegram_id)
-
-    # Answer the callback to remove loading state
-    await callback.answer()
-
-    # Send response
+    # Increment demo counter, clear the button's loading state and send the
+    # response — independent calls, so overlap them instead of queueing.
+    calls = [_increment_demo_count(user_id, owner_telegram_id), callback.answer()]
     if callback.message:
-        await _send_result(callback.message, result)
+        calls.append(_send_result(callback.message, result))
+    await asyncio.gather(*calls)
 
 
 async def _send_result(message: Message, result: Any) -> None:
@@ -293,7 +344,7 @@ async def _send_result(message: Message, result: Any) -> None:
         # Empty response means bot is silenced (human mode active)
         logger.debug(
             "send_result_skipped_empty",
-            user_id=str(message.from_user.id) if message.from_user else "unknown",
+            chat_id=message.chat.id,
         )
         return
 
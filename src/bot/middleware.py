@@ -1,16 +1,46 @@
 """Shop middleware — resolves shop from webhook token."""
 
+import asyncio
+import hashlib
 from typing import Optional
 from uuid import UUID
 
+import orjson
 import structlog
-from sqlalchemy import select
+from cachetools import TTLCache
+from redis.asyncio import Redis
+from sqlalchemy import bindparam, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models.shop import Shop
 
 logger = structlog.get_logger()
 
+# Active-shop lookups — built once, bound per call. Token and WhatsApp
+# number are not unique columns, so stop at the first match (partial
+# indexes idx_shops_bot_token / idx_shops_whatsapp_number); slug is unique.
+# The bare boolean column renders as the indexes' own `WHERE is_active`.
+_SHOP_BY_TOKEN = (
+    select(Shop)
+    .where(
+        Shop.telegram_bot_token == bindparam("bot_token"),
+        Shop.is_active,
+    )
+    .limit(1)
+)
+_SHOP_BY_SLUG = select(Shop).where(
+    Shop.slug == bindparam("shop_slug"),
+    Shop.is_active,
+)
+_SHOP_BY_WHATSAPP = (
+    select(Shop)
+    .where(
+        Shop.whatsapp_phone_number == bindparam("phone_number"),
+        Shop.is_active,
+    )
+    .limit(1)
+)
+
 
 async def get_shop_by_token(
     db: AsyncSession, bot_token: str
@@ -24,11 +54,7 @@ async def get_shop_by_token(
     Returns:
         Shop object or None
     """
-    stmt = select(Shop).where(
-        Shop.telegram_bot_token == bot_token,
-        Shop.is_active == True,  # noqa: E712
-    )
-    result = await db.execute(stmt)
+    result = await db.execute(_SHOP_BY_TOKEN, {"bot_token": bot_token})
     shop = result.scalar_one_or_none()
 
     if shop:
@@ -51,6 +77,175 @@ async def get_shop_by_slug(
     Returns:
         Shop object or None
     """
-    stmt = select(Shop).where(Shop.slug == slug, Shop.is_active == True)  # noqa: E712
-    result = await db.execute(stmt)
+    result = await db.execute(_SHOP_BY_SLUG, {"shop_slug": slug})
     return result.scalar_one_or_none()
+
+
+# Webhooks resolve the shop on every incoming message, but only need a few
+# of its fields. Cache that snapshot — with the engine's shop_config already
+# built — in Redis, and in front of it in a short per-process TTLCache so
+# the hot path is a dict lookup. Settings saves invalidate both (the local
+# layer only in the saving worker; others catch up within its TTL).
+SHOP_CACHE_TTL = 60  # seconds, Redis
+SHOP_LOCAL_CACHE_TTL = 15  # seconds, per process
+_local_shops: TTLCache = TTLCache(maxsize=1024, ttl=SHOP_LOCAL_CACHE_TTL)
+
+# Tokens that matched no active shop, keyed like the snapshot cache. Probes
+# with a bogus token are answered from memory instead of hitting Postgres on
+# every request. Creating a shop clears its token in the creating worker.
+UNKNOWN_TOKEN_TTL = 60  # seconds, per process
+_unknown_tokens: TTLCache = TTLCache(maxsize=4096, ttl=UNKNOWN_TOKEN_TTL)
+
+# Second invalidation after an edit — longer than a webhook's read-then-cache
+SHOP_CACHE_REDELETE_DELAY = 2.0  # seconds
+_pending_redeletes: set[asyncio.Task] = set()
+
+
+def _token_key(bot_token: str) -> str:
+    """Cache key for the shop snapshot resolved by Telegram bot token.
+
+    Hashed so bot tokens don't show up in Redis key listings.
+    """
+    digest = hashlib.sha256(bot_token.encode()).hexdigest()[:16]
+    return f"shop:by_token:{digest}"
+
+
+def _whatsapp_key(phone_number: str) -> str:
+    """Redis key for the shop snapshot resolved by WhatsApp number."""
+    return f"shop:by_wa:{phone_number}"
+
+
+def build_shop_config(shop: Shop) -> dict:
+    """Conversation engine shop_config for a shop.
+
+    Cached as part of the snapshot, so it leaves out the bot token — the
+    Telegram webhook adds the one from its URL.
+    """
+    return {
+        "bot_personality": shop.bot_personality or "friendly",
+        "greeting_text": shop.greeting_text,
+        "promo_text": shop.promo_text,
+        "bot_faq_custom": shop.bot_faq_custom,
+        "address": shop.address,
+        "shop_name": shop.name,
+        "timezone": shop.timezone or "Europe/Moscow",
+        "owner_telegram_id": shop.owner_telegram_id,
+    }
+
+
+def shop_snapshot(shop: Shop) -> dict:
+    """Plain-dict copy of what the webhooks need from a shop."""
+    return {
+        "id": str(shop.id),
+        "product_type": shop.product_type,
+        "owner_telegram_id": shop.owner_telegram_id,
+        "shop_config": build_shop_config(shop),
+    }
+
+
+async def _read_snapshot(redis: Redis, key: str) -> Optional[dict]:
+    """Cached shop snapshot, or None on a miss or unreadable entry."""
+    snapshot = _local_shops.get(key)
+    if snapshot is not None:
+        return snapshot
+
+    data = await redis.get(key)
+    if not data:
+        return None
+    try:
+        snapshot = orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return None
+    _local_shops[key] = snapshot
+    return snapshot
+
+
+async def cache_shop_snapshot(redis: Redis, key: str, shop: Shop) -> dict:
+    """Store a shop snapshot under `key` and return it."""
+    snapshot = shop_snapshot(shop)
+    await redis.set(key, orjson.dumps(snapshot), ex=SHOP_CACHE_TTL)
+    _local_shops[key] = snapshot
+    return snapshot
+
+
+async def get_cached_shop_by_token(
+    db: AsyncSession, redis: Redis, bot_token: str
+) -> Optional[dict]:
+    """Shop snapshot for a Telegram bot token, from cache or the DB.
+
+    Unknown tokens are remembered for UNKNOWN_TOKEN_TTL in this process
+    only — never in Redis — and cleared by forget_unknown_token().
+    """
+    key = _token_key(bot_token)
+    if key in _unknown_tokens:
+        return None
+    snapshot = await _read_snapshot(redis, key)
+    if snapshot is not None:
+        return snapshot
+
+    shop = await get_shop_by_token(db, bot_token)
+    if shop is None:
+        _unknown_tokens[key] = True
+        return None
+    return await cache_shop_snapshot(redis, key, shop)
+
+
+def forget_unknown_token(bot_token: str) -> None:
+    """Stop answering `bot_token` as unknown, e.g. once a shop registers it."""
+    _unknown_tokens.pop(_token_key(bot_token), None)
+
+
+async def get_cached_shop_by_whatsapp(
+    db: AsyncSession, redis: Redis, phone_number: str
+) -> Optional[dict]:
+    """Shop snapshot for the shop's own WhatsApp number, from cache or the DB."""
+    key = _whatsapp_key(phone_number)
+    snapshot = await _read_snapshot(redis, key)
+    if snapshot is not None:
+        return snapshot
+
+    result = await db.execute(_SHOP_BY_WHATSAPP, {"phone_number": phone_number})
+    shop = result.scalar_one_or_none()
+    if shop is None:
+        return None
+    return await cache_shop_snapshot(redis, key, shop)
+
+
+def _shop_cache_keys(shop: Shop) -> list[str]:
+    """Cache keys holding snapshots of `shop`."""
+    keys = []
+    if shop.telegram_bot_token:
+        keys.append(_token_key(shop.telegram_bot_token))
+    if shop.whatsapp_phone_number:
+        keys.append(_whatsapp_key(shop.whatsapp_phone_number))
+    return keys
+
+
+async def _drop_cached(redis: Redis, keys: list[str]) -> None:
+    for key in keys:
+        _local_shops.pop(key, None)
+    if keys:
+        await redis.delete(*keys)
+
+
+async def invalidate_shop_cache(redis: Redis, shop: Shop) -> None:
+    """Drop cached snapshots of `shop` after its edit is committed.
+
+    A webhook that read the row just before the commit can still store the
+    old snapshot after this delete, so the keys are dropped once more after
+    SHOP_CACHE_REDELETE_DELAY, in the background.
+    """
+    keys = _shop_cache_keys(shop)
+    await _drop_cached(redis, keys)
+    if keys:
+        task = asyncio.create_task(_drop_cached_later(redis, keys))
+        _pending_redeletes.add(task)
+        task.add_done_callback(_pending_redeletes.discard)
+
+
+async def _drop_cached_later(redis: Redis, keys: list[str]) -> None:
+    await asyncio.sleep(SHOP_CACHE_REDELETE_DELAY)
+    try:
+        await _drop_cached(redis, keys)
+    except Exception as e:
+        logger.warning("shop_cache_redelete_error", error=str(e))
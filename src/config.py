@@ -6,6 +6,10 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     # Database
     database_url: str
+    db_pool_size: int = 20
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30  # seconds to wait for a free connection
+    db_pool_recycle: int = 1800  # seconds; replace connections before idle cut-offs
 
     # Redis
     redis_url: str
@@ -32,6 +36,8 @@ class Settings(BaseSettings):
     # LLM
     llm_model: str = "claude-sonnet-4-20250514"
     llm_max_tokens: int = 300
+    max_inflight_llm: int = 20  # Telegram updates processed concurrently
+    llm_timeout_s: float = 90.0  # cap on handling one update, LLM calls included
 
     # Notification bot — sends ALL alerts (landing demo requests + bot leads)
     # Railway env vars: NOTIFY_TG_BOT_TOKEN, NOTIFY_TG_CHAT_ID
@@ -46,7 +52,8 @@ class Settings(BaseSettings):
     # Session
     session_ttl_seconds: int = 7200  # 2 hours
 
-    model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
+    # Read once at startup; frozen so nothing can change config at runtime
+    model_config = {"env_file": ".env", "env_file_encoding": "utf-8", "frozen": True}
 
 
 settings = Settings()  # type: ignore[call-arg]
@@ -7,15 +7,17 @@ and creates leads on completion.
 
 from __future__ import annotations
 
-import re
 import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 import structlog
+from sqlalchemy import insert as sa_insert
 from sqlalchemy import update as sa_update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.conversation.events import publish_message
+from src.conversation.handoff import is_master_request
 from src.conversation.session import SessionManager
 from src.conversation.steps.base import BaseStep, StepResult
 from src.conversation.steps.contact_info import ContactInfoStep
@@ -37,17 +39,28 @@ from src.schemas.lead import LeadNotification
 logger = structlog.get_logger()
 
 # Step registry (APPOINTMENT step removed — handled via text in ESTIMATE)
-STEP_HANDLERS: dict[str, BaseStep] = {
-    ConversationStep.GREETING.value: GreetingStep(),
-    ConversationStep.DEVICE_TYPE.value: DeviceTypeStep(),
-    ConversationStep.DEVICE_MODEL.value: DeviceModelStep(),
-    ConversationStep.PROBLEM.value: ProblemStep(),
-    ConversationStep.CONTACT_INFO.value: ContactInfoStep(),
-    ConversationStep.ESTIMATE.value: EstimateStep(),
+STEP_HANDLERS: dict[ConversationStep, BaseStep] = {
+    ConversationStep.GREETING: GreetingStep(),
+    ConversationStep.DEVICE_TYPE: DeviceTypeStep(),
+    ConversationStep.DEVICE_MODEL: DeviceModelStep(),
+    ConversationStep.PROBLEM: ProblemStep(),
+    ConversationStep.CONTACT_INFO: ContactInfoStep(),
+    ConversationStep.ESTIMATE: EstimateStep(),
 }
 
+# Step that "skip" moves to — the next in declaration order, None after the last
+_NEXT_STEP: dict[ConversationStep, Optional[ConversationStep]] = dict(
+    zip(ConversationStep, [*list(ConversationStep)[1:], None])
+)
+
 MAX_HISTORY = 6  # Keep last 3 exchanges (Redis sliding window for LLM)
 
+# Messages are write-only here — insert into the table directly and skip
+# the ORM's entity handling for rows nothing reads back
+_MESSAGES_TABLE = Message.__table__
+
+_UTC = timezone.utc
+
 # Human-readable labels for callback buttons
 CALLBACK_LABELS: dict[str, dict[str, str]] = {
     # "device:" prefix now carries car brand values from the greeting keyboard
@@ -77,6 +90,13 @@ CALLBACK_LABELS: dict[str, dict[str, str]] = {
     },
 }
 
+# Same labels keyed by the full callback_data ("device:Toyota" → "Toyota")
+_CALLBACK_LABELS_FLAT: dict[str, str] = {
+    f"{prefix}:{value}": label
+    for prefix, labels in CALLBACK_LABELS.items()
+    for value, label in labels.items()
+}
+
 
 class ConversationEngine:
     """Main orchestrator for the intake dialog."""
@@ -90,6 +110,13 @@ class ConversationEngine:
         self.session_manager = session_manager
         self.shop_config = shop_config
         self.db = db
+        # Message rows of the current turn — written along with the next
+        # conversation UPDATE, or by _flush_messages() when the turn ends
+        self._pending_messages: list[dict] = []
+        # Timestamp for the turn's writes — the clock is read once per update
+        self._now = datetime.now(_UTC)
+        # created_at of the last queued message (see _message_time)
+        self._last_message_time: Optional[datetime] = None
 
     # ─── Public entry points ─────────────────────────────────────────
 
@@ -102,12 +129,16 @@ class ConversationEngine:
         channel: str = "telegram",
     ) -> StepResult:
         """Process incoming user message and return bot response."""
+        self._now = datetime.now(_UTC)
         _config_token = current_shop_config.set(self.shop_config)
         try:
             return await self._handle_message_inner(
                 shop_id, user_id, message_text, user_telegram_username, channel
             )
         finally:
+            # Also on error: the rows queued so far (the incoming message
+            # at least) are still written before the update commits
+            await self._flush_messages()
             current_shop_config.reset(_config_token)
 
     async def handle_callback(
@@ -117,10 +148,14 @@ class ConversationEngine:
         callback_data: str,
     ) -> StepResult:
         """Process inline keyboard callback."""
+        self._now = datetime.now(_UTC)
         _config_token = current_shop_config.set(self.shop_config)
         try:
             return await self._handle_callback_inner(shop_id, user_id, callback_data)
         finally:
+            # Also on error: the rows queued so far (the incoming message
+            # at least) are still written before the update commits
+            await self._flush_messages()
             current_shop_config.reset(_config_token)
 
     # ─── Core message handler ────────────────────────────────────────
@@ -145,11 +180,11 @@ class ConversationEngine:
                     old_state.conversation_id, "abandoned"
                 )
 
-            await self.session_manager.delete(shop_id, user_id)
+            # save() overwrites the old session — no separate delete
             state = await self._create_new_session(shop_id, user_id, channel=channel)
             await self.session_manager.save(shop_id, user_id, state)
 
-            handler = STEP_HANDLERS[ConversationStep.GREETING.value]
+            handler = STEP_HANDLERS[ConversationStep.GREETING]
             result = await handler.get_initial_message(state)
 
             # Save /start + greeting to DB
@@ -160,7 +195,8 @@ class ConversationEngine:
 
         # ── "мастер" — handoff to human ──
         if self._is_master_request(lower_text):
-            state = await self.session_manager.get(shop_id, user_id)
+            # The session ends here: read and drop it in one round-trip
+            state = await self.session_manager.pop(shop_id, user_id)
             response_text = (
                 "Сейчас позову мастера — он ответит в течение 30 минут. "
                 "Если будут ещё вопросы, пишите!"
@@ -172,56 +208,58 @@ class ConversationEngine:
                 await self._save_message_to_db(conv_id, "bot", response_text, step_name="handoff")
                 await self._update_conversation_status(conv_id, "handoff")
 
-            await self.session_manager.delete(shop_id, user_id)
             return StepResult(
                 response_text=response_text,
                 next_step=ConversationStep.COMPLETED.value,
             )
 
+        # Read the session once (with the takeover flag, same round-trip);
+        # every path below works from this copy
+        state, human_mode = await self.session_manager.get_with_mode(shop_id, user_id)
+
         # ── Human mode check — save message but don't reply ──
-        if self.db:
-            from sqlalchemy import select as sa_select
-            state_for_mode = await self.session_manager.get(shop_id, user_id)
-            if state_for_mode:
-                conv_result = await self.db.execute(
-                    sa_select(Conversation.mode).where(
-                        Conversation.id == uuid.UUID(state_for_mode.conversation_id)
-                    )
+        if self.db and human_mode:
+            row = await self._save_message_to_db(
+                state.conversation_id,
+                "user",
+                message_text,
+                step_name="human_chat",
+            )
+            # Push to any open admin chat panel (SSE) — same id and timestamp as the row
+            if row:
+                await publish_message(
+                    self.session_manager.redis,
+                    state.conversation_id,
+                    row["id"],
+                    "user",
+                    message_text,
+                    row["created_at"],
+                    step_name="human_chat",
                 )
-                conv_mode = conv_result.scalar_one_or_none()
-                if conv_mode == "human":
-                    await self._save_message_to_db(
-                        state_for_mode.conversation_id,
-                        "user",
-                        message_text,
-                        step_name="human_chat",
-                    )
-                    # Also update last_message_at so master sees it
-                    try:
-                        now = datetime.now(timezone.utc)
-                        await self.db.execute(
-                            sa_update(Conversation)
-                            .where(Conversation.id == uuid.UUID(state_for_mode.conversation_id))
-                            .values(last_message_at=now)
-                        )
-                        await self.db.flush()
-                    except Exception as e:
-                        logger.warning("human_mode_update_ts_error", error=str(e))
-                    logger.info(
-                        "message_silenced_human_mode",
-                        shop_id=shop_id,
-                        user_id=user_id,
-                        conversation_id=state_for_mode.conversation_id,
-                    )
-                    return StepResult(response_text="")
+            # Also update last_message_at so master sees it
+            try:
+                now = self._now
+                await self.db.execute(
+                    sa_update(Conversation)
+                    .where(Conversation.id == uuid.UUID(state.conversation_id))
+                    .values(last_message_at=now)
+                )
+            except Exception as e:
+                logger.warning("human_mode_update_ts_error", error=str(e))
+            logger.info(
+                "message_silenced_human_mode",
+                shop_id=shop_id,
+                user_id=user_id,
+                conversation_id=state.conversation_id,
+            )
+            return StepResult(response_text="")
 
-        # ── Get or create session ──
-        state = await self.session_manager.get(shop_id, user_id)
+        # ── Create session on first contact ──
         if state is None:
             state = await self._create_new_session(shop_id, user_id, channel=channel)
             await self.session_manager.save(shop_id, user_id, state)
 
-            handler = STEP_HANDLERS[ConversationStep.GREETING.value]
+            handler = STEP_HANDLERS[ConversationStep.GREETING]
             result = await handler.get_initial_message(state)
 
             # Save first visit message + greeting
@@ -256,7 +294,7 @@ class ConversationEngine:
 
         # ── Normal step processing ──
         current = state.current_step.value
-        handler = STEP_HANDLERS.get(current)
+        handler = STEP_HANDLERS.get(state.current_step)
 
         if handler is None:
             logger.warning("unknown_step", step=current)
@@ -310,7 +348,7 @@ class ConversationEngine:
 
             # Attach keyboard / initial message from next step
             if result.next_step != ConversationStep.COMPLETED.value:
-                next_handler = STEP_HANDLERS.get(result.next_step)
+                next_handler = STEP_HANDLERS.get(state.current_step)
                 if next_handler:
                     next_result = await next_handler.get_initial_message(state)
 
@@ -409,7 +447,7 @@ class ConversationEngine:
             state.collected.device_brand = value
             state.current_step = ConversationStep.DEVICE_TYPE
             await self.session_manager.save(shop_id, user_id, state)
-            handler = STEP_HANDLERS[ConversationStep.DEVICE_TYPE.value]
+            handler = STEP_HANDLERS[ConversationStep.DEVICE_TYPE]
             result = await handler.get_initial_message(state)
 
             await self._save_message_to_db(state.conversation_id, "user", callback_label, step_name=step_before)
@@ -430,7 +468,7 @@ class ConversationEngine:
                 return StepResult(response_text=response)
             state.current_step = ConversationStep.DEVICE_MODEL
             await self.session_manager.save(shop_id, user_id, state)
-            handler = STEP_HANDLERS[ConversationStep.DEVICE_MODEL.value]
+            handler = STEP_HANDLERS[ConversationStep.DEVICE_MODEL]
             result = await handler.get_initial_message(state)
 
             await self._save_message_to_db(state.conversation_id, "user", callback_label, step_name=step_before)
@@ -448,7 +486,7 @@ class ConversationEngine:
             state.collected.device_model = value
             state.current_step = ConversationStep.PROBLEM
             await self.session_manager.save(shop_id, user_id, state)
-            handler = STEP_HANDLERS[ConversationStep.PROBLEM.value]
+            handler = STEP_HANDLERS[ConversationStep.PROBLEM]
             result = await handler.get_initial_message(state)
 
             await self._save_message_to_db(state.conversation_id, "user", callback_label, step_name=step_before)
@@ -472,7 +510,7 @@ class ConversationEngine:
                 user_telegram_username=None, status="pending",
             )
             await self.session_manager.save(shop_id, user_id, state)
-            handler = STEP_HANDLERS[ConversationStep.ESTIMATE.value]
+            handler = STEP_HANDLERS[ConversationStep.ESTIMATE]
             result = await handler.get_initial_message(state)
 
             await self._save_message_to_db(state.conversation_id, "user", callback_label, step_name=step_before)
@@ -483,7 +521,7 @@ class ConversationEngine:
         logger.warning("unknown_callback", data=callback_data)
         return StepResult(response_text="Не понял. Попробуйте ещё раз.")
 
-    # ─── Helper: save one message to DB ──────────────────────────────
+    # ─── Helper: save messages to DB ─────────────────────────────────
 
     async def _save_message_to_db(
         self,
@@ -491,19 +529,25 @@ class ConversationEngine:
         role: str,
         content: str,
         step_name: Optional[str] = None,
-    ) -> None:
-        """Save a single message to the DB. Errors are logged but never break the bot."""
+    ) -> Optional[dict]:
+        """Queue a message for the DB; the turn's messages are written together.
+
+        Returns the queued row (its id and created_at are final), or None if
+        it wasn't queued.
+        """
         if not self.db:
-            return
+            return None
         try:
-            message = Message(
-                conversation_id=uuid.UUID(conversation_id),
-                role=role,
-                content=content,
-                step_name=step_name,
-            )
-            self.db.add(message)
-            await self.db.flush()
+            row = {
+                "id": uuid.uuid4(),
+                "conversation_id": uuid.UUID(conversation_id),
+                "role": role,
+                "content": content,
+                "step_name": step_name,
+                "created_at": self._message_time(),
+            }
+            self._pending_messages.append(row)
+            return row
         except Exception as e:
             logger.warning(
                 "save_message_error",
@@ -511,6 +555,33 @@ class ConversationEngine:
                 conversation_id=conversation_id,
                 role=role,
             )
+
+    def _message_time(self) -> datetime:
+        """Timestamp for the next queued message, strictly after the previous one.
+
+        The chat panel orders and polls messages by created_at, so the user
+        and bot messages of one turn must not share a timestamp.
+        """
+        now = datetime.now(_UTC)
+        if self._last_message_time is not None and now <= self._last_message_time:
+            now = self._last_message_time + timedelta(microseconds=1)
+        self._last_message_time = now
+        return now
+
+    async def _flush_messages(self) -> None:
+        """Write queued messages in one INSERT. Errors are logged but never break the bot."""
+        if not self.db or not self._pending_messages:
+            return
+        rows, self._pending_messages = self._pending_messages, []
+        try:
+            await self.db.execute(sa_insert(_MESSAGES_TABLE).values(rows))
+        except Exception as e:
+            logger.warning(
+                "save_message_error",
+                error=str(e),
+                conversation_id=str(rows[0]["conversation_id"]),
+                count=len(rows),
+            )
             try:
                 await self.db.rollback()
             except Exception:
@@ -519,13 +590,16 @@ class ConversationEngine:
     # ─── Helper: update conversation record ──────────────────────────
 
     async def _update_conversation_in_db(self, state: SessionState) -> None:
-        """UPDATE Conversation row with current step, counts, and collected data."""
+        """UPDATE Conversation row with current step, counts, and collected data.
+
+        Messages queued by _save_message_to_db are inserted by the same statement."""
         if not self.db:
             return
+        rows: list[dict] = []
         try:
             collected = state.collected
-            now = datetime.now(timezone.utc)
-            await self.db.execute(
+            now = self._now
+            stmt = (
                 sa_update(Conversation)
                 .where(Conversation.id == uuid.UUID(state.conversation_id))
                 .values(
@@ -545,8 +619,16 @@ class ConversationEngine:
                     estimated_price_max=collected.estimated_price_max,
                 )
             )
-            await self.db.flush()
+            # Queued messages ride along as a data-modifying CTE, so the
+            # turn is written in a single round-trip
+            rows, self._pending_messages = self._pending_messages, []
+            if rows:
+                stmt = stmt.add_cte(sa_insert(_MESSAGES_TABLE).values(rows).cte("turn_messages"))
+            await self.db.execute(stmt)
         except Exception as e:
+            # Put the messages back for _flush_messages() to retry on their
+            # own — a failed UPDATE shouldn't lose them too
+            self._pending_messages[:0] = rows
             logger.warning(
                 "update_conversation_error",
                 error=str(e),
@@ -566,7 +648,7 @@ class ConversationEngine:
         if not self.db:
             return
         try:
-            now = datetime.now(timezone.utc)
+            now = self._now
             values: dict = {"status": status}
             if status in ("completed", "abandoned", "handoff"):
                 values["completed_at"] = now
@@ -576,7 +658,6 @@ class ConversationEngine:
                 .where(Conversation.id == uuid.UUID(conversation_id))
                 .values(**values)
             )
-            await self.db.flush()
         except Exception as e:
             logger.warning(
                 "update_conversation_status_error",
@@ -589,61 +670,15 @@ class ConversationEngine:
 
     def _callback_to_label(self, callback_data: str) -> str:
         """Convert callback_data like 'device:smartphone' → '[Выбрано: Смартфон]'."""
-        prefix, _, value = callback_data.partition(":")
-        labels = CALLBACK_LABELS.get(prefix, {})
-        label = labels.get(value, value)
+        label = _CALLBACK_LABELS_FLAT.get(callback_data)
+        if label is None:
+            # Unknown value — show it as is
+            label = callback_data.partition(":")[2]
         return f"[Выбрано: {label}]"
 
     # ─── Helper: detect master/operator handoff request ───────────────
 
-    @staticmethod
-    def _is_master_request(lower_text: str) -> bool:
-        """Return True if the message is a request to talk to a human master.
-
-        Uses two-signal approach: if the message contains BOTH a person-word
-        (мастер/оператор/... in any grammatical form) AND an action-word
-        (хочу/позовите/поговорить/...), it's a handoff request.
-        Word order doesn't matter.
-
-        Also matches exact single-word commands: мастер, оператор, etc.
-        """
-        # Exact one-word matches
-        exact = {"мастер", "оператор", "человек", "master", "operator",
-                 "менеджер", "специалист", "консультант"}
-        if lower_text in exact:
-            return True
-
-        # Person-words: all case forms (мастер/мастера/мастеру/мастером/мастере)
-        has_person = bool(re.search(
-            r"мастер\w*|оператор\w*|специалист\w*|менеджер\w*|"
-            r"консультант\w*|человек\w*",
-            lower_text,
-        ))
-
-        # Action-words: verbs and intent markers
-        has_action = bool(re.search(
-            r"позови|позовите|переключи|переключите|соедини|соедините|"
-            r"свяжи|свяжите|подключи|подключите|дай|дайте|"
-            r"хочу|можно|нужен|нужна|нужно|давай|давайте|"
-            r"поговорить|обсудить|связаться|пообщаться|побеседовать|"
-            r"поговорю|обсужу|пообщаюсь|"
-            r"говорить|общаться|звать|вызвать|вызови|вызовите|"
-            r"попрос|жду|ждать|где\b",
-            lower_text,
-        ))
-
-        # Both signals present → handoff request (order doesn't matter)
-        if has_person and has_action:
-            return True
-
-        # Single-signal: "позовите мастера" / "мастера позовите" is strong enough
-        # but "мастер сказал" is NOT. So we only fire on person-word alone
-        # if it looks like a command (short message with just the person-word).
-        words = lower_text.split()
-        if len(words) <= 3 and has_person:
-            return True
-
-        return False
+    _is_master_request = staticmethod(is_master_request)
 
     # ─── Step advance (for "skip") ───────────────────────────────────
 
@@ -651,14 +686,13 @@ class ConversationEngine:
         self, state: SessionState, shop_id: str, user_id: str
     ) -> StepResult:
         """Skip current step and go to the next one."""
-        steps = list(ConversationStep)
-        current_idx = steps.index(state.current_step)
-        if current_idx + 1 < len(steps):
-            state.current_step = steps[current_idx + 1]
+        next_step = _NEXT_STEP[state.current_step]
+        if next_step is not None:
+            state.current_step = next_step
             if state.current_step == ConversationStep.ESTIMATE:
                 await self._lookup_pricing(state)
             await self.session_manager.save(shop_id, user_id, state)
-            handler = STEP_HANDLERS.get(state.current_step.value)
+            handler = STEP_HANDLERS.get(state.current_step)
             if handler:
                 return await handler.get_initial_message(state)
         return StepResult(response_text="Спасибо! Если появятся вопросы — напишите.")
@@ -713,7 +747,7 @@ class ConversationEngine:
         """Create Lead record + update Conversation status.
 
         Conversation already exists in DB (created at /start).
-        Messages are already being saved individually.
+        Messages are written with the turn's conversation update.
         """
         if not self.db:
             logger.warning("no_db_session", action="save_lead")
@@ -721,7 +755,7 @@ class ConversationEngine:
 
         try:
             collected = state.collected
-            now = datetime.now(timezone.utc)
+            now = self._now
 
             logger.info(
                 "save_lead_start",
@@ -784,8 +818,8 @@ class ConversationEngine:
                     last_message_at=now,
                     mode="bot",
                 )
+                # Inserted ahead of the lead by the lead's flush
                 self.db.add(conversation)
-                await self.db.flush()
 
             # Create Lead
             device_parts = [collected.device_brand or "", collected.device_model or ""]
@@ -894,8 +928,9 @@ class ConversationEngine:
             )
 
             bot = await get_or_create_bot(bot_token)
+            # Off the reply path — the customer doesn't wait on the owner's card
             notifier = TelegramNotifier()
-            await notifier.send_lead_notification(bot, int(chat_id), notification)
+            notifier.send_lead_notification_in_background(bot, int(chat_id), notification)
         except Exception as e:
             logger.error("owner_notification_error", error=str(e), shop_id=state.shop_id)
 
@@ -954,7 +989,7 @@ class ConversationEngine:
         try:
             # Create datetime in shop timezone, then convert to UTC for storage
             local_dt = datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz)
-            return local_dt.astimezone(timezone.utc)
+            return local_dt.astimezone(_UTC)
         except ValueError:
             return None
 
@@ -972,7 +1007,7 @@ class ConversationEngine:
             return
 
         try:
-            now = datetime.now(timezone.utc)
+            now = self._now
             collected = state.collected
 
             # Update lead status + customer info (name/phone collected AFTER lead was created)
@@ -1010,8 +1045,7 @@ class ConversationEngine:
                         status="pending",
                     )
                     self.db.add(appointment)
-
-            await self.db.flush()
+                    await self.db.flush()
 
             logger.info(
                 "lead_status_updated",
@@ -1036,7 +1070,7 @@ class ConversationEngine:
     ) -> SessionState:
         """Create a new session state AND insert Conversation row in DB."""
         conversation_id = str(uuid.uuid4())
-        now = datetime.now(timezone.utc)
+        now = self._now
 
         # Insert Conversation record immediately
         if self.db:
@@ -0,0 +1,59 @@
+"""Conversation events — Redis Pub/Sub fan-out of new chat messages.
+
+The engine publishes customer messages that arrive while a master has
+taken over the conversation; the admin chat panel subscribes over SSE
+instead of polling the DB.
+"""
+
+from __future__ import annotations
+
+import uuid
+from datetime import datetime
+from typing import Optional
+
+import orjson
+import redis.asyncio as redis
+import structlog
+
+logger = structlog.get_logger()
+
+CHANNEL_PREFIX = "conv:"
+
+
+def conversation_channel(conversation_id: str) -> str:
+    """Pub/Sub channel name for a conversation."""
+    return f"{CHANNEL_PREFIX}{conversation_id}"
+
+
+async def publish_message(
+    redis_client: redis.Redis,
+    conversation_id: str,
+    message_id: uuid.UUID,
+    role: str,
+    content: str,
+    created_at: datetime,
+    step_name: Optional[str] = None,
+) -> None:
+    """Publish a new message to the conversation channel.
+
+    `message_id` and `created_at` are those of the message row, so the live
+    bubble matches what the panel later loads from the DB.
+    Errors are logged but never break the bot.
+    """
+    payload = {
+        "id": str(message_id),
+        "role": role,
+        "content": content,
+        "step_name": step_name,
+        "created_at": created_at.isoformat(),
+    }
+    try:
+        await redis_client.publish(
+            conversation_channel(conversation_id), orjson.dumps(payload)
+        )
+    except Exception as e:
+        logger.warning(
+            "publish_message_error",
+            error=str(e),
+            conversation_id=conversation_id,
+        )
@@ -0,0 +1,93 @@
+"""Handoff detection — does a message ask for a human master?
+
+Shared by the auto-repair and construction engines. Runs on every inbound
+message, so the patterns are built once at import.
+"""
+
+import re
+
+# Exact one-word commands
+MASTER_EXACT = frozenset({
+    "мастер", "оператор", "человек", "master", "operator",
+    "менеджер", "специалист", "консультант",
+})
+
+# Person-words. Matching is by substring, so a stem covers every case form
+# (мастер/мастера/мастеру/мастером/мастере).
+PERSON_STEMS = (
+    "мастер", "оператор", "специалист", "менеджер", "консультант", "человек",
+)
+
+# Action-words: verbs and intent markers. Longer forms that contain a listed
+# stem (позовите, дайте, давайте, поговорить, пообщаться) match through it.
+ACTION_STEMS = (
+    "позови", "переключи", "соедини", "свяжи", "подключи", "дай",
+    "хочу", "можно", "нужен", "нужна", "нужно", "давай",
+    "обсудить", "связаться", "побеседовать",
+    "поговорю", "обсужу", "пообщаюсь",
+    "говорить", "общаться", "звать", "вызвать", "вызови",
+    "попрос", "жду", "ждать",
+)
+
+
+def _trie_pattern(words: tuple[str, ...]) -> str:
+    """Regex alternation of `words`, factored by shared prefixes.
+
+    With a flat `a|b|c` the regex engine retries every word at each position
+    of the message; with the prefixes merged (по(?:зови|дключи|...)) one
+    failed character rules out a whole branch.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def branches(node: dict) -> list[str]:
+        # A word ends here — anything longer is redundant for a search
+        if "" in node:
+            return [""]
+        return [re.escape(char) + group(child) for char, child in node.items()]
+
+    def group(node: dict) -> str:
+        alternatives = branches(node)
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return "(?:" + "|".join(alternatives) + ")"
+
+    # The top level stays a bare alternation: re then skips ahead to the
+    # possible first characters instead of trying every position
+    return "|".join(branches(trie))
+
+
+_PERSON_RE = re.compile(_trie_pattern(PERSON_STEMS))
+_ACTION_RE = re.compile(_trie_pattern(ACTION_STEMS) + r"|где\b")
+
+
+def is_master_request(lower_text: str) -> bool:
+    """Return True if the message is a request to talk to a human master.
+
+    Uses two-signal approach: if the message contains BOTH a person-word
+    (мастер/оператор/... in any grammatical form) AND an action-word
+    (хочу/позовите/поговорить/...), it's a handoff request.
+    Word order doesn't matter.
+
+    Also matches exact single-word commands: мастер, оператор, etc.
+    """
+    if lower_text in MASTER_EXACT:
+        return True
+
+    has_person = _PERSON_RE.search(lower_text) is not None
+    has_action = _ACTION_RE.search(lower_text) is not None
+
+    # Both signals present → handoff request (order doesn't matter)
+    if has_person and has_action:
+        return True
+
+    # Single-signal: "позовите мастера" / "мастера позовите" is strong enough
+    # but "мастер сказал" is NOT. So we only fire on person-word alone
+    # if it looks like a command (short message with just the person-word).
+    # maxsplit keeps a pasted essay from being split word by word just to
+    # learn it has more than three.
+    return has_person and len(lower_text.split(None, 3)) <= 3
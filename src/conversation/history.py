@@ -0,0 +1,50 @@
+"""Bulk message history writes — imports and backfills.
+
+The bot writes a handful of rows per turn with a plain INSERT (see the
+engines); this path streams large batches with COPY instead.
+"""
+
+import uuid
+from datetime import datetime, timezone
+
+import structlog
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.conversation import Message
+
+logger = structlog.get_logger()
+
+# Column order of the records persist_messages_bulk() copies in
+_COPY_COLUMNS = ["id", "conversation_id", "role", "content", "step_name", "created_at"]
+
+
+async def persist_messages_bulk(db: AsyncSession, messages: list[dict]) -> int:
+    """Write many messages with a single COPY on the session's connection.
+
+    Each dict has conversation_id, role and content, and optionally id,
+    step_name and created_at (defaults: new uuid, None, the time of the
+    call). The rows land in the caller's transaction; errors propagate.
+    Returns the number of rows written.
+    """
+    if not messages:
+        return 0
+    now = datetime.now(timezone.utc)
+    records = [
+        (
+            m.get("id") or uuid.uuid4(),
+            uuid.UUID(str(m["conversation_id"])),
+            m["role"],
+            m["content"],
+            m.get("step_name"),
+            m.get("created_at") or now,
+        )
+        for m in messages
+    ]
+    # COPY is asyncpg-only — reach the driver connection under the session
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        Message.__tablename__, records=records, columns=_COPY_COLUMNS
+    )
+    logger.info("messages_copied", count=len(records))
+    return len(records)
@@ -8,6 +8,7 @@ from typing import Optional, Type, TypeVar, Union
 
 import redis.asyncio as redis
 import structlog
+from cachetools import TTLCache
 
 from src.config import settings
 from src.schemas.conversation import SessionState
@@ -17,6 +18,16 @@ logger = structlog.get_logger()
 # Generic type for any Pydantic model with .model_validate_json / .model_dump_json
 T = TypeVar("T")
 
+# Messages often arrive in bursts (a long paste is split into several), and
+# each turn re-reads the session its predecessor just wrote. Keep the last
+# read/written copy per key for a second — as JSON, so every reader gets its
+# own model — together with the takeover flag read alongside it. Updates of
+# one chat are processed in order within this process, and a takeover here
+# drops the entry; writes from other replicas show up once a chat pauses
+# for SESSION_LOCAL_CACHE_TTL.
+SESSION_LOCAL_CACHE_TTL = 1.0  # seconds
+_recent_sessions: TTLCache = TTLCache(maxsize=10_000, ttl=SESSION_LOCAL_CACHE_TTL)
+
 
 class SessionManager:
     """Manages conversation state in Redis with TTL.
@@ -33,20 +44,72 @@ class SessionManager:
     def _key(self, shop_id: str, user_id: str) -> str:
         return f"session:{shop_id}:{user_id}"
 
+    def _human_key(self, shop_id: str, user_id: str) -> str:
+        return f"session_human:{shop_id}:{user_id}"
+
     async def get(self, shop_id: str, user_id: str) -> Optional[T]:
         """Get session state from Redis."""
-        data = await self.redis.get(self._key(shop_id, user_id))
+        cached = _recent_sessions.get(self._key(shop_id, user_id))
+        data = cached[0] if cached else await self.redis.get(self._key(shop_id, user_id))
         if data:
             return self.state_model.model_validate_json(data)
         return None
 
+    async def get_with_mode(self, shop_id: str, user_id: str) -> tuple[Optional[T], bool]:
+        """Get session state and whether a master has taken it over.
+
+        Both keys are read in one round-trip. The takeover flag holds the
+        conversation ID, so it never carries over to a new conversation.
+        """
+        key = self._key(shop_id, user_id)
+        cached = _recent_sessions.get(key)
+        if cached:
+            data, human_conversation_id = cached
+        else:
+            data, human_conversation_id = await self.redis.mget(
+                key, self._human_key(shop_id, user_id)
+            )
+            if data:
+                _recent_sessions[key] = (data, human_conversation_id)
+        if not data:
+            return None, False
+        state = self.state_model.model_validate_json(data)
+        return state, human_conversation_id == state.conversation_id
+
+    async def set_human_mode(
+        self, shop_id: str, user_id: str, conversation_id: str, human: bool
+    ) -> None:
+        """Flag the conversation as taken over by a master, or hand it back.
+
+        Outlives the session it belongs to: the bot doesn't save the session
+        while a master is chatting, so it expires first.
+        """
+        _recent_sessions.pop(self._key(shop_id, user_id), None)
+        key = self._human_key(shop_id, user_id)
+        if human:
+            await self.redis.set(key, conversation_id, ex=self.ttl)
+        else:
+            await self.redis.delete(key)
+
+    async def restore_human_modes(self, taken_over: list[tuple[str, str, str]]) -> None:
+        """Set the takeover flag for many (shop_id, user_id, conversation_id) at once."""
+        if not taken_over:
+            return
+        pipe = self.redis.pipeline()
+        for shop_id, user_id, conversation_id in taken_over:
+            _recent_sessions.pop(self._key(shop_id, user_id), None)
+            pipe.set(self._human_key(shop_id, user_id), conversation_id, ex=self.ttl)
+        await pipe.execute()
+
     async def save(self, shop_id: str, user_id: str, state: T) -> None:
         """Save session state to Redis with TTL."""
-        await self.redis.setex(
-            self._key(shop_id, user_id),
-            self.ttl,
-            state.model_dump_json(),
-        )
+        key = self._key(shop_id, user_id)
+        data = state.model_dump_json()
+        await self.redis.setex(key, self.ttl, data)
+        # Refresh a cached copy; the takeover flag it was read with still holds
+        cached = _recent_sessions.get(key)
+        if cached:
+            _recent_sessions[key] = (data, cached[1])
         logger.debug(
             "session_saved",
             shop_id=shop_id,
@@ -54,8 +117,20 @@ class SessionManager:
             step=state.current_step.value if hasattr(state, 'current_step') else "unknown",
         )
 
+    async def pop(self, shop_id: str, user_id: str) -> Optional[T]:
+        """Get session state and delete it from Redis in one round-trip."""
+        _recent_sessions.pop(self._key(shop_id, user_id), None)
+        pipe = self.redis.pipeline()
+        pipe.get(self._key(shop_id, user_id))
+        pipe.delete(self._key(shop_id, user_id))
+        data, _ = await pipe.execute()
+        if data:
+            return self.state_model.model_validate_json(data)
+        return None
+
     async def delete(self, shop_id: str, user_id: str) -> None:
         """Delete session from Redis."""
+        _recent_sessions.pop(self._key(shop_id, user_id), None)
         await self.redis.delete(self._key(shop_id, user_id))
 
     async def exists(self, shop_id: str, user_id: str) -> bool:
@@ -9,8 +9,14 @@ from src.config import settings
 engine = create_async_engine(
     settings.database_url,
     echo=settings.environment == "development",
-    pool_size=5,
-    max_overflow=10,
+    # Every request takes a session via get_db: keep warm connections
+    # around, and ping on checkout so a connection dropped by the server
+    # or pooler is replaced instead of failing the request.
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=True,
 )
 
 async_session_factory = async_sessionmaker(
@@ -2,6 +2,7 @@
 
 import logging
 import pathlib
+import orjson
 import structlog
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
@@ -20,23 +21,41 @@ from src.admin.views.settings import router as admin_settings_router
 from src.admin.views.schedule import router as admin_schedule_router
 from src.admin.views.dashboard import router as admin_dashboard_router
 from src.admin.views.conversations import router as admin_conversations_router
-from src.admin.views.chat import router as admin_chat_router
+from src.admin.views.chat import restore_human_mode_flags, router as admin_chat_router
 from src.config import settings
+from src.admin.templating import warm_templates
+from src.bot.factory import close_bots
+from src.bot.handlers.message import dispatcher
+from src.notifications.telegram import drain_notifications
+from src.redis_client import close_redis, get_redis_client
+
+_dev_logging = settings.environment == "development"
 
 structlog.configure(
     processors=[
         structlog.processors.TimeStamper(fmt="iso"),
         structlog.processors.add_log_level,
-        structlog.dev.ConsoleRenderer() if settings.environment == "development"
-        else structlog.processors.JSONRenderer(),
+        # Tracebacks from exc_info: ConsoleRenderer formats them itself
+        *([] if _dev_logging else [structlog.processors.format_exc_info]),
+        # Outside development render JSON with orjson straight to bytes
+        structlog.dev.ConsoleRenderer() if _dev_logging
+        else structlog.processors.JSONRenderer(serializer=orjson.dumps),
     ],
     wrapper_class=structlog.make_filtering_bound_logger(
         getattr(logging, settings.log_level.upper(), logging.INFO)
     ),
+    logger_factory=structlog.PrintLoggerFactory() if _dev_logging
+    else structlog.BytesLoggerFactory(),
+    cache_logger_on_first_use=True,
 )
 
 logger = structlog.get_logger()
 
+# How long shutdown waits for in-flight Telegram updates
+SHUTDOWN_DRAIN_SECONDS = 25
+# ...and for owner notifications those updates left sending
+NOTIFICATION_DRAIN_SECONDS = 5
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -52,8 +71,23 @@ async def lifespan(app: FastAPI):
     import src.models  # noqa: F401 — register all models
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    # Create the shared Redis client once, before the first request
+    redis = get_redis_client()
+    # Takeovers live in Conversation.mode; make sure the bot sees them
+    try:
+        restored = await restore_human_mode_flags(redis)
+        logger.info("human_mode_flags_restored", count=restored)
+    except Exception as e:
+        logger.warning("human_mode_flags_restore_error", error=str(e))
+    # Compile admin templates now rather than on each one's first render
+    warm_templates()
     yield
     logger.info("app_shutting_down")
+    # Let updates already acknowledged to Telegram finish
+    await dispatcher.drain(timeout=SHUTDOWN_DRAIN_SECONDS)
+    await drain_notifications(timeout=NOTIFICATION_DRAIN_SECONDS)
+    await close_redis()
+    await close_bots()
 
 
 app = FastAPI(
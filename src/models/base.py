@@ -3,7 +3,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, func
+from sqlalchemy import DDL, DateTime, event, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
@@ -14,6 +14,14 @@ class Base(DeclarativeBase):
     pass
 
 
+# Trigram (gin_trgm_ops) indexes need the extension before create_all builds them
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
 class TimestampMixin:
     """Mixin for created_at / updated_at fields."""
 
@@ -4,7 +4,7 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text, Boolean
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text, Boolean
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -13,6 +13,33 @@ from src.models.base import Base, UUIDMixin, TimestampMixin
 
 class Conversation(Base, UUIDMixin, TimestampMixin):
     __tablename__ = "conversations"
+    # Trigram indexes back the admin list search (ILIKE '%term%')
+    __table_args__ = (
+        Index(
+            "idx_conversations_customer_name_trgm",
+            "customer_name",
+            postgresql_using="gin",
+            postgresql_ops={"customer_name": "gin_trgm_ops"},
+        ),
+        Index(
+            "idx_conversations_device_brand_trgm",
+            "device_brand",
+            postgresql_using="gin",
+            postgresql_ops={"device_brand": "gin_trgm_ops"},
+        ),
+        Index(
+            "idx_conversations_device_model_trgm",
+            "device_model",
+            postgresql_using="gin",
+            postgresql_ops={"device_model": "gin_trgm_ops"},
+        ),
+        Index(
+            "idx_conversations_problem_description_trgm",
+            "problem_description",
+            postgresql_using="gin",
+            postgresql_ops={"problem_description": "gin_trgm_ops"},
+        ),
+    )
 
     shop_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), ForeignKey("shops.id"), nullable=False
@@ -64,8 +91,30 @@ class Conversation(Base, UUIDMixin, TimestampMixin):
     messages = relationship("Message", back_populates="conversation", lazy="noload")
 
 
+# Admin conversations list: ORDER BY last_message_at DESC NULLS LAST, id DESC
+# per shop, also used for keyset pagination
+Index(
+    "idx_conversations_shop_last_msg_id",
+    Conversation.shop_id,
+    Conversation.last_message_at.desc().nullslast(),
+    Conversation.id.desc(),
+)
+
+# Same order for the list filtered to a single status
+Index(
+    "idx_conversations_shop_status_last_msg",
+    Conversation.shop_id,
+    Conversation.status,
+    Conversation.last_message_at.desc().nullslast(),
+    Conversation.id.desc(),
+)
+
+
 class Message(Base, UUIDMixin):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("idx_messages_conversation", "conversation_id", "created_at"),
+    )
 
     conversation_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False
@@ -4,7 +4,7 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, Text, Numeric
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, String, Text, Numeric
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -13,6 +13,27 @@ from src.models.base import Base, UUIDMixin, TimestampMixin
 
 class Lead(Base, UUIDMixin, TimestampMixin):
     __tablename__ = "leads"
+    # Trigram indexes back the admin list search (ILIKE '%term%')
+    __table_args__ = (
+        Index(
+            "idx_leads_customer_name_trgm",
+            "customer_name",
+            postgresql_using="gin",
+            postgresql_ops={"customer_name": "gin_trgm_ops"},
+        ),
+        Index(
+            "idx_leads_device_full_name_trgm",
+            "device_full_name",
+            postgresql_using="gin",
+            postgresql_ops={"device_full_name": "gin_trgm_ops"},
+        ),
+        Index(
+            "idx_leads_problem_summary_trgm",
+            "problem_summary",
+            postgresql_using="gin",
+            postgresql_ops={"problem_summary": "gin_trgm_ops"},
+        ),
+    )
 
     shop_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), ForeignKey("shops.id"), nullable=False
@@ -40,3 +40,4 @@ class PriceRule(Base, UUIDMixin, TimestampMixin):
 
     # Relationships
     shop = relationship("Shop", back_populates="price_rules")
+    repair_type = relationship("RepairType")
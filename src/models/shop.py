@@ -2,7 +2,7 @@
 
 from typing import Dict, Optional
 
-from sqlalchemy import Boolean, Integer, String, Text
+from sqlalchemy import Boolean, Index, Integer, String, Text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -72,3 +72,24 @@ class Shop(Base, UUIDMixin, TimestampMixin):
     conversations = relationship("Conversation", back_populates="shop", lazy="noload")
     leads = relationship("Lead", back_populates="shop", lazy="noload")
     price_rules = relationship("PriceRule", back_populates="shop", lazy="noload")
+
+
+# Admin login: newest active shop for an owner (ORDER BY created_at DESC LIMIT 1)
+Index(
+    "idx_shops_owner_tg_created",
+    Shop.owner_telegram_id,
+    Shop.created_at.desc(),
+    postgresql_where=Shop.is_active,
+)
+
+# Webhook shop resolution: active shop by bot token / WhatsApp number
+Index(
+    "idx_shops_bot_token",
+    Shop.telegram_bot_token,
+    postgresql_where=Shop.is_active,
+)
+Index(
+    "idx_shops_whatsapp_number",
+    Shop.whatsapp_phone_number,
+    postgresql_where=Shop.is_active,
+)
@@ -1,5 +1,7 @@
 """Telegram notification service — sends lead cards to shop owners."""
 
+import asyncio
+
 from aiogram import Bot
 import structlog
 
@@ -23,6 +25,9 @@ LEAD_TEMPLATE_RU = """🔔 <b>Новая заявка!</b>
 
 <i>Заявка #{lead_id} · Этапов диалога: {messages_count}</i>"""
 
+# Notifications still being sent — strong references keep the tasks alive
+_pending_notifications: set[asyncio.Task] = set()
+
 
 class TelegramNotifier:
     """Sends formatted lead notifications via Telegram."""
@@ -89,3 +94,27 @@ class TelegramNotifier:
                 owner_chat_id=owner_chat_id,
             )
             return False
+
+    def send_lead_notification_in_background(
+        self,
+        bot: Bot,
+        owner_chat_id: int,
+        notification: LeadNotification,
+    ) -> None:
+        """Send a lead notification without waiting for Telegram.
+
+        The customer's reply doesn't depend on it; failures are logged by
+        send_lead_notification. Flushed on shutdown by drain_notifications().
+        """
+        task = asyncio.create_task(
+            self.send_lead_notification(bot, owner_chat_id, notification)
+        )
+        _pending_notifications.add(task)
+        task.add_done_callback(_pending_notifications.discard)
+
+
+async def drain_notifications(timeout: float) -> None:
+    """Wait up to `timeout` seconds for background notifications (called on shutdown)."""
+    if _pending_notifications:
+        logger.info("notifications_draining", pending=len(_pending_notifications))
+        await asyncio.wait(set(_pending_notifications), timeout=timeout)
@@ -7,15 +7,17 @@ and creates leads on completion.
 
 from __future__ import annotations
 
-import re
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 import structlog
+from sqlalchemy import insert as sa_insert
 from sqlalchemy import update as sa_update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.conversation.events import publish_message
+from src.conversation.handoff import is_master_request
 from src.conversation.session import SessionManager
 from src.products.inbuild.steps.base import BuildBaseStep, BuildStepResult
 from src.products.inbuild.steps.greeting import BuildGreetingStep
@@ -42,19 +44,30 @@ from src.schemas.lead import LeadNotification
 
 logger = structlog.get_logger()
 
-# Step registry mapping BuildStep values to handler instances
-STEP_HANDLERS: dict[str, BuildBaseStep] = {
-    BuildStep.GREETING.value: BuildGreetingStep(),
-    BuildStep.SERVICE_TYPE.value: ServiceTypeStep(),
-    BuildStep.PROPERTY_INFO.value: PropertyInfoStep(),
-    BuildStep.PROJECT_DESCRIPTION.value: ProjectDescriptionStep(),
-    BuildStep.TIMELINE_BUDGET.value: TimelineBudgetStep(),
-    BuildStep.ESTIMATE.value: BuildEstimateStep(),
-    BuildStep.CONTACT_INFO.value: BuildContactInfoStep(),
+# Step registry mapping BuildStep members to handler instances
+STEP_HANDLERS: dict[BuildStep, BuildBaseStep] = {
+    BuildStep.GREETING: BuildGreetingStep(),
+    BuildStep.SERVICE_TYPE: ServiceTypeStep(),
+    BuildStep.PROPERTY_INFO: PropertyInfoStep(),
+    BuildStep.PROJECT_DESCRIPTION: ProjectDescriptionStep(),
+    BuildStep.TIMELINE_BUDGET: TimelineBudgetStep(),
+    BuildStep.ESTIMATE: BuildEstimateStep(),
+    BuildStep.CONTACT_INFO: BuildContactInfoStep(),
 }
 
+# Step that "skip" moves to — the next in declaration order, None after the last
+_NEXT_STEP: dict[BuildStep, Optional[BuildStep]] = dict(
+    zip(BuildStep, [*list(BuildStep)[1:], None])
+)
+
 MAX_HISTORY = 6  # Keep last 3 exchanges (sliding window for LLM context)
 
+# Messages are write-only here — insert into the table directly and skip
+# the ORM's entity handling for rows nothing reads back
+_MESSAGES_TABLE = Message.__table__
+
+_UTC = timezone.utc
+
 # Human-readable labels for construction callback buttons
 CALLBACK_LABELS: dict[str, dict[str, str]] = {
     "service": SERVICE_LABELS,
@@ -63,6 +76,13 @@ CALLBACK_LABELS: dict[str, dict[str, str]] = {
     "timeline": TIMELINE_LABELS,
 }
 
+# Same labels keyed by the full callback_data ("service:plumbing" → "Сантехника")
+_CALLBACK_LABELS_FLAT: dict[str, str] = {
+    f"{prefix}:{value}": label
+    for prefix, labels in CALLBACK_LABELS.items()
+    for value, label in labels.items()
+}
+
 
 class BuildConversationEngine:
     """Main orchestrator for the construction intake dialog."""
@@ -76,6 +96,13 @@ class BuildConversationEngine:
         self.session_manager = session_manager
         self.shop_config = shop_config
         self.db = db
+        # Message rows of the current turn — written along with the next
+        # conversation UPDATE, or by _flush_messages() when the turn ends
+        self._pending_messages: list[dict] = []
+        # Timestamp for the turn's writes — the clock is read once per update
+        self._now = datetime.now(_UTC)
+        # created_at of the last queued message (see _message_time)
+        self._last_message_time: Optional[datetime] = None
 
     # ─── Public entry points ─────────────────────────────────────────
 
@@ -88,12 +115,16 @@ class BuildConversationEngine:
         channel: str = "telegram",
     ) -> BuildStepResult:
         """Process incoming user message and return bot response."""
+        self._now = datetime.now(_UTC)
         _config_token = current_build_shop_config.set(self.shop_config)
         try:
             return await self._handle_message_inner(
                 shop_id, user_id, message_text, user_telegram_username, channel
             )
         finally:
+            # Also on error: the rows queued so far (the incoming message
+            # at least) are still written before the update commits
+            await self._flush_messages()
             current_build_shop_config.reset(_config_token)
 
     async def handle_callback(
@@ -103,10 +134,14 @@ class BuildConversationEngine:
         callback_data: str,
     ) -> BuildStepResult:
         """Process inline keyboard callback."""
+        self._now = datetime.now(_UTC)
         _config_token = current_build_shop_config.set(self.shop_config)
         try:
             return await self._handle_callback_inner(shop_id, user_id, callback_data)
         finally:
+            # Also on error: the rows queued so far (the incoming message
+            # at least) are still written before the update commits
+            await self._flush_messages()
             current_build_shop_config.reset(_config_token)
 
     # ─── Core message handler ────────────────────────────────────────
@@ -131,11 +166,11 @@ class BuildConversationEngine:
                     old_state.conversation_id, "abandoned"
                 )
 
-            await self.session_manager.delete(shop_id, user_id)
+            # save() overwrites the old session — no separate delete
             state = await self._create_new_session(shop_id, user_id, channel=channel)
             await self.session_manager.save(shop_id, user_id, state)
 
-            handler = STEP_HANDLERS[BuildStep.GREETING.value]
+            handler = STEP_HANDLERS[BuildStep.GREETING]
             result = await handler.get_initial_message(state)
 
             # Save /start + greeting to DB
@@ -146,7 +181,8 @@ class BuildConversationEngine:
 
         # ── "мастер" — handoff to human ──
         if self._is_master_request(lower_text):
-            state = await self.session_manager.get(shop_id, user_id)
+            # The session ends here: read and drop it in one round-trip
+            state = await self.session_manager.pop(shop_id, user_id)
             response_text = (
                 "Сейчас свяжу со специалистом — он ответит в течение 30 минут. "
                 "Если появятся вопросы, пишите!"
@@ -158,56 +194,58 @@ class BuildConversationEngine:
                 await self._save_message_to_db(conv_id, "bot", response_text, step_name="handoff")
                 await self._update_conversation_status(conv_id, "handoff")
 
-            await self.session_manager.delete(shop_id, user_id)
             return BuildStepResult(
                 response_text=response_text,
                 next_step=BuildStep.COMPLETED.value,
             )
 
+        # Read the session once (with the takeover flag, same round-trip);
+        # every path below works from this copy
+        state, human_mode = await self.session_manager.get_with_mode(shop_id, user_id)
+
         # ── Human mode check — save message but don't auto-reply ──
-        if self.db:
-            from sqlalchemy import select as sa_select
-            state_for_mode = await self.session_manager.get(shop_id, user_id)
-            if state_for_mode:
-                conv_result = await self.db.execute(
-                    sa_select(Conversation.mode).where(
-                        Conversation.id == uuid.UUID(state_for_mode.conversation_id)
-                    )
+        if self.db and human_mode:
+            row = await self._save_message_to_db(
+                state.conversation_id,
+                "user",
+                message_text,
+                step_name="human_chat",
+            )
+            # Push to any open admin chat panel (SSE) — same id and timestamp as the row
+            if row:
+                await publish_message(
+                    self.session_manager.redis,
+                    state.conversation_id,
+                    row["id"],
+                    "user",
+                    message_text,
+                    row["created_at"],
+                    step_name="human_chat",
                 )
-                conv_mode = conv_result.scalar_one_or_none()
-                if conv_mode == "human":
-                    await self._save_message_to_db(
-                        state_for_mode.conversation_id,
-                        "user",
-                        message_text,
-                        step_name="human_chat",
-                    )
-                    # Update last_message_at so the specialist sees new activity
-                    try:
-                        now = datetime.now(timezone.utc)
-                        await self.db.execute(
-                            sa_update(Conversation)
-                            .where(Conversation.id == uuid.UUID(state_for_mode.conversation_id))
-                            .values(last_message_at=now)
-                        )
-                        await self.db.flush()
-                    except Exception as e:
-                        logger.warning("human_mode_update_ts_error", error=str(e))
-                    logger.info(
-                        "message_silenced_human_mode",
-                        shop_id=shop_id,
-                        user_id=user_id,
-                        conversation_id=state_for_mode.conversation_id,
-                    )
-                    return BuildStepResult(response_text="")
-
-        # ── Get or create session ──
-        state = await self.session_manager.get(shop_id, user_id)
+            # Update last_message_at so the specialist sees new activity
+            try:
+                now = self._now
+                await self.db.execute(
+                    sa_update(Conversation)
+                    .where(Conversation.id == uuid.UUID(state.conversation_id))
+                    .values(last_message_at=now)
+                )
+            except Exception as e:
+                logger.warning("human_mode_update_ts_error", error=str(e))
+            logger.info(
+                "message_silenced_human_mode",
+                shop_id=shop_id,
+                user_id=user_id,
+                conversation_id=state.conversation_id,
+            )
+            return BuildStepResult(response_text="")
+
+        # ── Create session on first contact ──
         if state is None:
             state = await self._create_new_session(shop_id, user_id, channel=channel)
             await self.session_manager.save(shop_id, user_id, state)
 
-            handler = STEP_HANDLERS[BuildStep.GREETING.value]
+            handler = STEP_HANDLERS[BuildStep.GREETING]
             result = await handler.get_initial_message(state)
 
             # Save first message + greeting
@@ -242,7 +280,7 @@ class BuildConversationEngine:
 
         # ── Normal step processing ──
         current = state.current_step.value
-        handler = STEP_HANDLERS.get(current)
+        handler = STEP_HANDLERS.get(state.current_step)
 
         if handler is None:
             logger.warning("unknown_build_step", step=current)
@@ -289,7 +327,7 @@ class BuildConversationEngine:
 
             # Attach keyboard / initial message from next step
             if result.next_step != BuildStep.COMPLETED.value:
-                next_handler = STEP_HANDLERS.get(result.next_step)
+                next_handler = STEP_HANDLERS.get(state.current_step)
                 if next_handler:
                     next_result = await next_handler.get_initial_message(state)
 
@@ -387,7 +425,7 @@ class BuildConversationEngine:
             state.collected.service_category = value
             state.current_step = BuildStep.SERVICE_TYPE
             await self.session_manager.save(shop_id, user_id, state)
-            handler = STEP_HANDLERS[BuildStep.SERVICE_TYPE.value]
+            handler = STEP_HANDLERS[BuildStep.SERVICE_TYPE]
             result = await handler.get_initial_message(state)
 
             await self._save_message_to_db(state.conversation_id, "user", callback_label, step_name=step_before)
@@ -400,7 +438,7 @@ class BuildConversationEngine:
             state.collected.property_type = value
             state.current_step = BuildStep.PROJECT_DESCRIPTION
             await self.session_manager.save(shop_id, user_id, state)
-            handler = STEP_HANDLERS[BuildStep.PROJECT_DESCRIPTION.value]
+            handler = STEP_HANDLERS[BuildStep.PROJECT_DESCRIPTION]
             result = await handler.get_initial_message(state)
 
             await self._save_message_to_db(state.conversation_id, "user", callback_label, step_name=step_before)
@@ -413,7 +451,7 @@ class BuildConversationEngine:
             state.collected.scope = value
             state.current_step = BuildStep.TIMELINE_BUDGET
             await self.session_manager.save(shop_id, user_id, state)
-            handler = STEP_HANDLERS[BuildStep.TIMELINE_BUDGET.value]
+            handler = STEP_HANDLERS[BuildStep.TIMELINE_BUDGET]
             result = await handler.get_initial_message(state)
 
             await self._save_message_to_db(state.conversation_id, "user", callback_label, step_name=step_before)
@@ -430,7 +468,7 @@ class BuildConversationEngine:
                 user_telegram_username=None, status="pending",
             )
             await self.session_manager.save(shop_id, user_id, state)
-            handler = STEP_HANDLERS[BuildStep.ESTIMATE.value]
+            handler = STEP_HANDLERS[BuildStep.ESTIMATE]
             result = await handler.get_initial_message(state)
 
             await self._save_message_to_db(state.conversation_id, "user", callback_label, step_name=step_before)
@@ -441,7 +479,7 @@ class BuildConversationEngine:
         logger.warning("unknown_build_callback", data=callback_data)
         return BuildStepResult(response_text="Не понял. Попробуйте ещё раз.")
 
-    # ─── Helper: save one message to DB ──────────────────────────────
+    # ─── Helper: save messages to DB ─────────────────────────────────
 
     async def _save_message_to_db(
         self,
@@ -449,19 +487,25 @@ class BuildConversationEngine:
         role: str,
         content: str,
         step_name: Optional[str] = None,
-    ) -> None:
-        """Save a single message to the DB. Errors are logged but never break the bot."""
+    ) -> Optional[dict]:
+        """Queue a message for the DB; the turn's messages are written together.
+
+        Returns the queued row (its id and created_at are final), or None if
+        it wasn't queued.
+        """
         if not self.db:
-            return
+            return None
         try:
-            message = Message(
-                conversation_id=uuid.UUID(conversation_id),
-                role=role,
-                content=content,
-                step_name=step_name,
-            )
-            self.db.add(message)
-            await self.db.flush()
+            row = {
+                "id": uuid.uuid4(),
+                "conversation_id": uuid.UUID(conversation_id),
+                "role": role,
+                "content": content,
+                "step_name": step_name,
+                "created_at": self._message_time(),
+            }
+            self._pending_messages.append(row)
+            return row
         except Exception as e:
             logger.warning(
                 "build_save_message_error",
@@ -469,6 +513,33 @@ class BuildConversationEngine:
                 conversation_id=conversation_id,
                 role=role,
             )
+
+    def _message_time(self) -> datetime:
+        """Timestamp for the next queued message, strictly after the previous one.
+
+        The chat panel orders and polls messages by created_at, so the user
+        and bot messages of one turn must not share a timestamp.
+        """
+        now = datetime.now(_UTC)
+        if self._last_message_time is not None and now <= self._last_message_time:
+            now = self._last_message_time + timedelta(microseconds=1)
+        self._last_message_time = now
+        return now
+
+    async def _flush_messages(self) -> None:
+        """Write queued messages in one INSERT. Errors are logged but never break the bot."""
+        if not self.db or not self._pending_messages:
+            return
+        rows, self._pending_messages = self._pending_messages, []
+        try:
+            await self.db.execute(sa_insert(_MESSAGES_TABLE).values(rows))
+        except Exception as e:
+            logger.warning(
+                "build_save_message_error",
+                error=str(e),
+                conversation_id=str(rows[0]["conversation_id"]),
+                count=len(rows),
+            )
             try:
                 await self.db.rollback()
             except Exception:
@@ -479,6 +550,8 @@ class BuildConversationEngine:
     async def _update_conversation_in_db(self, state: BuildSessionState) -> None:
         """UPDATE Conversation row with current step, counts, and collected data.
 
+        Messages queued by _save_message_to_db are inserted by the same statement.
+
         Field mapping (construction → shared Conversation columns):
           service_category  → device_category
           property_type     → device_brand
@@ -488,16 +561,17 @@ class BuildConversationEngine:
         """
         if not self.db:
             return
+        rows: list[dict] = []
         try:
             collected = state.collected
-            now = datetime.now(timezone.utc)
+            now = self._now
 
             # Combine area and address into device_model column
             area_str = f"{collected.property_area_sqm} м²" if collected.property_area_sqm else ""
             address_str = collected.property_address or ""
             device_model_value = " | ".join(p for p in [area_str, address_str] if p) or None
 
-            await self.db.execute(
+            stmt = (
                 sa_update(Conversation)
                 .where(Conversation.id == uuid.UUID(state.conversation_id))
                 .values(
@@ -516,8 +590,16 @@ class BuildConversationEngine:
                     estimated_price_max=collected.estimated_price_max,
                 )
             )
-            await self.db.flush()
+            # Queued messages ride along as a data-modifying CTE, so the
+            # turn is written in a single round-trip
+            rows, self._pending_messages = self._pending_messages, []
+            if rows:
+                stmt = stmt.add_cte(sa_insert(_MESSAGES_TABLE).values(rows).cte("turn_messages"))
+            await self.db.execute(stmt)
         except Exception as e:
+            # Put the messages back for _flush_messages() to retry on their
+            # own — a failed UPDATE shouldn't lose them too
+            self._pending_messages[:0] = rows
             logger.warning(
                 "build_update_conversation_error",
                 error=str(e),
@@ -537,7 +619,7 @@ class BuildConversationEngine:
         if not self.db:
             return
         try:
-            now = datetime.now(timezone.utc)
+            now = self._now
             values: dict = {"status": status}
             if status in ("completed", "abandoned", "handoff"):
                 values["completed_at"] = now
@@ -547,7 +629,6 @@ class BuildConversationEngine:
                 .where(Conversation.id == uuid.UUID(conversation_id))
                 .values(**values)
             )
-            await self.db.flush()
         except Exception as e:
             logger.warning(
                 "build_update_conversation_status_error",
@@ -560,59 +641,15 @@ class BuildConversationEngine:
 
     def _callback_to_label(self, callback_data: str) -> str:
         """Convert callback_data like 'service:plumbing' → '[Выбрано: Сантехника]'."""
-        prefix, _, value = callback_data.partition(":")
-        labels = CALLBACK_LABELS.get(prefix, {})
-        label = labels.get(value, value)
+        label = _CALLBACK_LABELS_FLAT.get(callback_data)
+        if label is None:
+            # Unknown value — show it as is
+            label = callback_data.partition(":")[2]
         return f"[Выбрано: {label}]"
 
     # ─── Helper: detect master/operator handoff request ───────────────
 
-    @staticmethod
-    def _is_master_request(lower_text: str) -> bool:
-        """Return True if the message is a request to talk to a human specialist.
-
-        Uses two-signal approach: if the message contains BOTH a person-word
-        (мастер/специалист/... in any grammatical form) AND an action-word
-        (хочу/позовите/поговорить/...), it's a handoff request.
-        Word order doesn't matter.
-
-        Also matches exact single-word commands: мастер, оператор, etc.
-        """
-        # Exact one-word matches
-        exact = {"мастер", "оператор", "человек", "master", "operator",
-                 "менеджер", "специалист", "консультант"}
-        if lower_text in exact:
-            return True
-
-        # Person-words: all case forms
-        has_person = bool(re.search(
-            r"мастер\w*|оператор\w*|специалист\w*|менеджер\w*|"
-            r"консультант\w*|человек\w*",
-            lower_text,
-        ))
-
-        # Action-words: verbs and intent markers
-        has_action = bool(re.search(
-            r"позови|позовите|переключи|переключите|соедини|соедините|"
-            r"свяжи|свяжите|подключи|подключите|дай|дайте|"
-            r"хочу|можно|нужен|нужна|нужно|давай|давайте|"
-            r"поговорить|обсудить|связаться|пообщаться|побеседовать|"
-            r"поговорю|обсужу|пообщаюсь|"
-            r"говорить|общаться|звать|вызвать|вызови|вызовите|"
-            r"попрос|жду|ждать|где\b",
-            lower_text,
-        ))
-
-        # Both signals present → handoff request
-        if has_person and has_action:
-            return True
-
-        # Short message (≤3 words) with a person-word alone
-        words = lower_text.split()
-        if len(words) <= 3 and has_person:
-            return True
-
-        return False
+    _is_master_request = staticmethod(is_master_request)
 
     # ─── Step advance (for "skip") ───────────────────────────────────
 
@@ -620,12 +657,11 @@ class BuildConversationEngine:
         self, state: BuildSessionState, shop_id: str, user_id: str
     ) -> BuildStepResult:
         """Skip current step and go to the next one."""
-        steps = list(BuildStep)
-        current_idx = steps.index(state.current_step)
-        if current_idx + 1 < len(steps):
-            state.current_step = steps[current_idx + 1]
+        next_step = _NEXT_STEP[state.current_step]
+        if next_step is not None:
+            state.current_step = next_step
             await self.session_manager.save(shop_id, user_id, state)
-            handler = STEP_HANDLERS.get(state.current_step.value)
+            handler = STEP_HANDLERS.get(state.current_step)
             if handler:
                 return await handler.get_initial_message(state)
         return BuildStepResult(response_text="Спасибо! Если появятся вопросы — напишите.")
@@ -642,7 +678,7 @@ class BuildConversationEngine:
         """Create Lead record + update Conversation status.
 
         Conversation is already in DB (created at /start).
-        Messages are saved individually via _save_message_to_db.
+        Messages are queued via _save_message_to_db and flushed per turn.
 
         Field mapping to shared Lead columns:
           service_category + property_type → device_category / device_full_name
@@ -655,7 +691,7 @@ class BuildConversationEngine:
 
         try:
             collected = state.collected
-            now = datetime.now(timezone.utc)
+            now = self._now
 
             # Build a descriptive name for the project object
             property_label = PROPERTY_LABELS.get(collected.property_type or "", collected.property_type or "")
@@ -733,8 +769,8 @@ class BuildConversationEngine:
                     last_message_at=now,
                     mode="bot",
                 )
+                # Inserted ahead of the lead by the lead's flush
                 self.db.add(conversation)
-                await self.db.flush()
 
             # Channel-aware contact identifier
             if state.channel == "whatsapp":
@@ -850,8 +886,9 @@ class BuildConversationEngine:
             )
 
             bot = await get_or_create_bot(bot_token)
+            # Off the reply path — the customer doesn't wait on the owner's card
             notifier = TelegramNotifier()
-            await notifier.send_lead_notification(bot, int(chat_id), notification)
+            notifier.send_lead_notification_in_background(bot, int(chat_id), notification)
         except Exception as e:
             logger.error("build_owner_notification_error", error=str(e), shop_id=state.shop_id)
 
@@ -869,7 +906,7 @@ class BuildConversationEngine:
             return
 
         try:
-            now = datetime.now(timezone.utc)
+            now = self._now
             collected = state.collected
 
             # Update lead status + customer info (name/phone may arrive after lead creation)
@@ -896,8 +933,6 @@ class BuildConversationEngine:
                 .values(**conv_values)
             )
 
-            await self.db.flush()
-
             logger.info(
                 "build_lead_status_updated",
                 lead_id=state.lead_id,
@@ -921,7 +956,7 @@ class BuildConversationEngine:
     ) -> BuildSessionState:
         """Create a new session state AND insert Conversation row in DB."""
         conversation_id = str(uuid.uuid4())
-        now = datetime.now(timezone.utc)
+        now = self._now
 
         # Insert Conversation record immediately so messages can reference it
         if self.db:
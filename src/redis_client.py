@@ -23,3 +23,11 @@ def get_redis_client() -> redis.Redis:
 async def get_redis() -> redis.Redis:
     """FastAPI dependency for Redis client."""
     return get_redis_client()
+
+
+async def close_redis() -> None:
+    """Close the shared Redis client (called on app shutdown)."""
+    global _redis_client
+    if _redis_client is not None:
+        await _redis_client.aclose()
+        _redis_client = None
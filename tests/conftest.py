@@ -14,16 +14,29 @@ os.environ.setdefault("TELEGRAM_WEBHOOK_SECRET", "test-webhook-secret")
 os.environ.setdefault("ADMIN_SECRET_KEY", "test-admin-secret-key")
 os.environ.setdefault("ENVIRONMENT", "development")
 
+from src.conversation import session as session_module
 from src.conversation.engine import ConversationEngine
 from src.conversation.session import SessionManager
 from src.schemas.conversation import CollectedData, ConversationStep, SessionState
 
 
+@pytest.fixture(autouse=True)
+def _clear_session_cache():
+    """Don't let one test's cached sessions leak into the next."""
+    session_module._recent_sessions.clear()
+    yield
+    session_module._recent_sessions.clear()
+
+
 @pytest.fixture
 def mock_redis():
     """Mock Redis client."""
     redis = AsyncMock()
     redis.get = AsyncMock(return_value=None)
+    redis.mget = AsyncMock(return_value=[None, None])
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[None, 0])
+    redis.pipeline = MagicMock(return_value=pipe)
     redis.setex = AsyncMock()
     redis.delete = AsyncMock()
     redis.exists = AsyncMock(return_value=False)
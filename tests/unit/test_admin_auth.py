@@ -0,0 +1,117 @@
+"""Tests for admin panel Telegram Login verification and session checks."""
+
+import hashlib
+import hmac
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import orjson
+
+from src.admin import dependencies
+from src.admin.auth import (
+    _telegram_secret_key,
+    create_session,
+    delete_shop_sessions,
+    verify_telegram_login,
+)
+from src.admin.dependencies import get_current_shop
+
+BOT_TOKEN = "123456:TEST-token"
+
+
+def _sign(data: dict, bot_token: str = BOT_TOKEN) -> dict:
+    """Return a copy of data with a valid Telegram Login hash attached."""
+    check_string = "\n".join(f"{k}={v}" for k, v in sorted(data.items()))
+    secret = hashlib.sha256(bot_token.encode("utf-8")).digest()
+    signed = dict(data)
+    signed["hash"] = hmac.new(
+        secret, check_string.encode("utf-8"), hashlib.sha256
+    ).hexdigest()
+    return signed
+
+
+class TestVerifyTelegramLogin:
+    """Test Telegram Login Widget hash verification."""
+
+    def test_valid_hash(self):
+        data = _sign({"id": "42", "first_name": "Иван", "auth_date": "1700000000"})
+        assert verify_telegram_login(data, BOT_TOKEN) is True
+
+    def test_tampered_field_rejected(self):
+        data = _sign({"id": "42", "auth_date": "1700000000"})
+        data["id"] = "43"
+        assert verify_telegram_login(data, BOT_TOKEN) is False
+
+    def test_wrong_token_rejected(self):
+        data = _sign({"id": "42", "auth_date": "1700000000"})
+        assert verify_telegram_login(data, "999:other-token") is False
+
+    def test_missing_hash_rejected(self):
+        assert verify_telegram_login({"id": "42"}, BOT_TOKEN) is False
+
+    def test_secret_key_is_memoized(self):
+        _telegram_secret_key.cache_clear()
+        first = _telegram_secret_key(BOT_TOKEN)
+        second = _telegram_secret_key(BOT_TOKEN)
+        assert first is second
+        assert first == hashlib.sha256(BOT_TOKEN.encode("utf-8")).digest()
+        assert _telegram_secret_key.cache_info().hits == 1
+
+
+class TestCurrentShop:
+    """Admin session → shop, with the active flag re-checked in the DB."""
+
+    def _db_returning(self, is_active):
+        result = MagicMock()
+        result.scalar_one_or_none.return_value = is_active
+        db = AsyncMock()
+        db.execute = AsyncMock(return_value=result)
+        factory = MagicMock()
+        factory.return_value.__aenter__ = AsyncMock(return_value=db)
+        factory.return_value.__aexit__ = AsyncMock(return_value=False)
+        return factory, db
+
+    async def test_deactivated_shop_loses_access(self, mock_redis):
+        dependencies._active_shops.clear()
+        shop_id = str(uuid.uuid4())
+        # Session snapshot from login still says the shop is active
+        mock_redis.get = AsyncMock(
+            return_value=orjson.dumps({"shop_id": shop_id, "is_active": True})
+        )
+        factory, _ = self._db_returning(False)
+
+        with patch.object(dependencies, "async_session_factory", factory):
+            assert await get_current_shop(MagicMock(), "token", mock_redis) is None
+
+    async def test_active_check_is_cached(self, mock_redis):
+        dependencies._active_shops.clear()
+        mock_redis.get = AsyncMock(return_value=orjson.dumps({"shop_id": str(uuid.uuid4())}))
+        factory, db = self._db_returning(True)
+
+        with patch.object(dependencies, "async_session_factory", factory):
+            assert await get_current_shop(MagicMock(), "token", mock_redis) is not None
+            assert await get_current_shop(MagicMock(), "token", mock_redis) is not None
+
+        db.execute.assert_awaited_once()
+
+
+class TestShopSessions:
+    """Per-shop index of admin sessions."""
+
+    async def test_session_indexed_under_shop(self, mock_redis):
+        token = await create_session(mock_redis, "shop-1", telegram_id=42)
+
+        pipe = mock_redis.pipeline.return_value
+        pipe.sadd.assert_called_once_with("admin_shop_sessions:shop-1", token)
+
+    async def test_delete_shop_sessions_revokes_all(self, mock_redis):
+        mock_redis.smembers = AsyncMock(return_value={"t1", "t2"})
+
+        assert await delete_shop_sessions(mock_redis, "shop-1") == 2
+
+        (args, _) = mock_redis.delete.call_args
+        assert set(args) == {
+            "admin_shop_sessions:shop-1",
+            "admin_session:t1",
+            "admin_session:t2",
+        }
@@ -65,3 +65,126 @@ class TestConversationEngine:
             callback_data="device:Toyota",
         )
         assert "истекла" in result.response_text.lower() or "start" in result.response_text.lower()
+
+    @pytest.mark.asyncio
+    async def test_turn_messages_flushed_together(self, session_manager, sample_session):
+        db = AsyncMock()
+        engine = ConversationEngine(session_manager, db=db)
+
+        await engine._save_message_to_db(sample_session.conversation_id, "user", "привет")
+        await engine._save_message_to_db(sample_session.conversation_id, "bot", "здравствуйте")
+        db.execute.assert_not_awaited()
+
+        await engine._flush_messages()
+
+        db.execute.assert_awaited_once()
+        (stmt,), _ = db.execute.call_args
+        assert stmt.is_insert
+
+    @pytest.mark.asyncio
+    async def test_queued_messages_written_when_turn_fails(self, session_manager, sample_session):
+        db = AsyncMock()
+        engine = ConversationEngine(session_manager, db=db)
+
+        async def fails(*args):
+            await engine._save_message_to_db(sample_session.conversation_id, "user", "привет")
+            raise RuntimeError("boom")
+
+        engine._handle_message_inner = fails
+        with pytest.raises(RuntimeError):
+            await engine.handle_message(shop_id="shop-1", user_id="user-1", message_text="привет")
+
+        db.execute.assert_awaited_once()
+        (stmt,), _ = db.execute.call_args
+        assert stmt.is_insert
+
+    @pytest.mark.asyncio
+    async def test_turn_messages_get_increasing_timestamps(self, session_manager, sample_session):
+        engine = ConversationEngine(session_manager, db=AsyncMock())
+
+        for text in ("привет", "здравствуйте", "чем помочь?"):
+            await engine._save_message_to_db(sample_session.conversation_id, "bot", text)
+
+        times = [row["created_at"] for row in engine._pending_messages]
+        assert times == sorted(times)
+        assert len(set(times)) == len(times)
+
+    @pytest.mark.asyncio
+    async def test_conversation_update_carries_messages(self, session_manager, sample_session):
+        db = AsyncMock()
+        engine = ConversationEngine(session_manager, db=db)
+
+        await engine._save_message_to_db(sample_session.conversation_id, "user", "привет")
+        await engine._save_message_to_db(sample_session.conversation_id, "bot", "здравствуйте")
+        await engine._update_conversation_in_db(sample_session)
+        await engine._flush_messages()
+
+        db.execute.assert_awaited_once()
+        (stmt,), _ = db.execute.call_args
+        assert stmt.is_update
+        assert "INSERT INTO messages" in str(stmt)
+
+    @pytest.mark.asyncio
+    async def test_failed_update_requeues_messages(self, session_manager, sample_session):
+        db = AsyncMock()
+        db.execute = AsyncMock(side_effect=[RuntimeError("boom"), None])
+        engine = ConversationEngine(session_manager, db=db)
+
+        await engine._save_message_to_db(sample_session.conversation_id, "user", "привет")
+        await engine._update_conversation_in_db(sample_session)
+        await engine._flush_messages()
+
+        assert db.execute.await_count == 2
+        (stmt,), _ = db.execute.call_args
+        assert stmt.is_insert
+
+    @pytest.mark.asyncio
+    async def test_human_mode_silences_bot(self, session_manager, mock_redis, sample_session):
+        mock_redis.mget = AsyncMock(
+            return_value=[sample_session.model_dump_json(), sample_session.conversation_id]
+        )
+        engine = ConversationEngine(session_manager, db=AsyncMock())
+
+        with patch("src.conversation.engine.publish_message", AsyncMock()):
+            result = await engine.handle_message(
+                shop_id=sample_session.shop_id,
+                user_id="user-1",
+                message_text="когда будет готово?",
+            )
+
+        assert result.response_text == ""
+
+    @pytest.mark.asyncio
+    async def test_human_mode_publishes_the_saved_row(
+        self, session_manager, mock_redis, sample_session
+    ):
+        mock_redis.mget = AsyncMock(
+            return_value=[sample_session.model_dump_json(), sample_session.conversation_id]
+        )
+        engine = ConversationEngine(session_manager, db=AsyncMock())
+        engine._flush_messages = AsyncMock()
+
+        with patch("src.conversation.engine.publish_message", AsyncMock()) as publish:
+            await engine.handle_message(
+                shop_id=sample_session.shop_id,
+                user_id="user-1",
+                message_text="когда будет готово?",
+            )
+
+        (row,) = engine._pending_messages
+        _, _, message_id, _, _, created_at = publish.call_args.args
+        assert message_id == row["id"]
+        assert created_at == row["created_at"]
+
+    @pytest.mark.asyncio
+    async def test_takeover_flag_ignored_for_other_conversation(
+        self, session_manager, mock_redis, sample_session
+    ):
+        mock_redis.mget = AsyncMock(
+            return_value=[sample_session.model_dump_json(), "previous-conversation"]
+        )
+
+        state, human_mode = await session_manager.get_with_mode("shop-1", "user-1")
+
+        assert state.conversation_id == sample_session.conversation_id
+        assert human_mode is False
@@ -2,7 +2,7 @@
 
 import pytest
 import uuid
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from src.conversation.session import SessionManager
 from src.products.inbuild.engine import BuildConversationEngine
@@ -14,6 +14,10 @@ def build_mock_redis():
     """Mock Redis client for build tests."""
     redis = AsyncMock()
     redis.get = AsyncMock(return_value=None)
+    redis.mget = AsyncMock(return_value=[None, None])
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[None, 0])
+    redis.pipeline = MagicMock(return_value=pipe)
     redis.setex = AsyncMock()
     redis.delete = AsyncMock()
     redis.exists = AsyncMock(return_value=False)
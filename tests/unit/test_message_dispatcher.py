@@ -0,0 +1,64 @@
+"""Tests for the background Telegram update dispatcher."""
+
+import asyncio
+
+from src.bot.handlers.message import MessageDispatcher
+
+
+class TestMessageDispatcher:
+    """Bounded, per-chat ordered background processing."""
+
+    async def test_same_chat_runs_in_order(self):
+        dispatcher = MessageDispatcher(max_inflight=10, timeout=5)
+        seen = []
+
+        def work(n: int, delay: float):
+            async def run():
+                await asyncio.sleep(delay)
+                seen.append(n)
+            return run
+
+        # The first update is the slowest; it must still finish first
+        dispatcher.submit("shop:1", work(1, 0.03))
+        dispatcher.submit("shop:1", work(2, 0.0))
+        await dispatcher.drain(timeout=1)
+
+        assert seen == [1, 2]
+
+    async def test_inflight_is_bounded(self):
+        dispatcher = MessageDispatcher(max_inflight=2, timeout=5)
+        running = 0
+        peak = 0
+
+        async def work():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        for chat in range(6):
+            dispatcher.submit(f"shop:{chat}", work)
+        await dispatcher.drain(timeout=1)
+
+        assert peak == 2
+
+    async def test_timeout_and_errors_are_contained(self):
+        dispatcher = MessageDispatcher(max_inflight=2, timeout=0.01)
+        done = []
+
+        async def hangs():
+            await asyncio.sleep(1)
+
+        async def fails():
+            raise RuntimeError("boom")
+
+        async def works():
+            done.append(True)
+
+        dispatcher.submit("shop:1", hangs)
+        dispatcher.submit("shop:1", fails)
+        dispatcher.submit("shop:1", works)
+        await dispatcher.drain(timeout=1)
+
+        assert done == [True]
@@ -0,0 +1,54 @@
+"""Tests for the bulk message history writer."""
+
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+from src.conversation.history import persist_messages_bulk
+from src.models.conversation import Message
+
+
+def _db_with_copy() -> tuple[AsyncMock, AsyncMock]:
+    """AsyncSession mock and the asyncpg copy_records_to_table under it."""
+    raw = MagicMock()
+    raw.driver_connection.copy_records_to_table = AsyncMock()
+    conn = AsyncMock()
+    conn.get_raw_connection = AsyncMock(return_value=raw)
+    db = AsyncMock()
+    db.connection = AsyncMock(return_value=conn)
+    return db, raw.driver_connection.copy_records_to_table
+
+
+class TestPersistMessagesBulk:
+    """COPY-based writes of many message rows."""
+
+    async def test_messages_copied_in_one_call(self):
+        db, copy = _db_with_copy()
+        conversation_id = str(uuid.uuid4())
+
+        count = await persist_messages_bulk(db, [
+            {"conversation_id": conversation_id, "role": "user", "content": "привет"},
+            {"conversation_id": conversation_id, "role": "bot", "content": "здравствуйте"},
+        ])
+
+        assert count == 2
+        copy.assert_awaited_once()
+        assert copy.call_args.args == ("messages",)
+        records = copy.call_args.kwargs["records"]
+        assert len(records) == 2
+
+        # Records line up with real columns of the messages table
+        columns = copy.call_args.kwargs["columns"]
+        table = Message.__table__
+        assert set(columns) <= set(table.columns.keys())
+        required = {c.name for c in table.columns if not c.nullable and c.server_default is None}
+        assert required <= set(columns)
+        row = dict(zip(columns, records[0]))
+        assert row["role"] == "user"
+        assert row["content"] == "привет"
+        assert str(row["conversation_id"]) == conversation_id
+
+    async def test_empty_batch_skips_db(self):
+        db, copy = _db_with_copy()
+
+        assert await persist_messages_bulk(db, []) == 0
+        copy.assert_not_awaited()
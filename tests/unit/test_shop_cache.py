@@ -0,0 +1,131 @@
+"""Tests for the webhook shop snapshot cache."""
+
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import orjson
+import pytest
+
+from src.bot import middleware
+from src.bot.middleware import (
+    forget_unknown_token,
+    get_cached_shop_by_token,
+    invalidate_shop_cache,
+    shop_snapshot,
+)
+from src.models.shop import Shop
+
+BOT_TOKEN = "123456:TEST-token"
+
+
+def _shop() -> Shop:
+    return Shop(
+        id=uuid.uuid4(),
+        slug="test-shop",
+        name="Test Shop",
+        owner_telegram_id=42,
+        telegram_bot_token=BOT_TOKEN,
+        product_type="auto_repair",
+        is_active=True,
+    )
+
+
+def _db_returning(shop) -> AsyncMock:
+    """AsyncSession mock whose execute() yields `shop`."""
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = shop
+    db = AsyncMock()
+    db.execute = AsyncMock(return_value=result)
+    return db
+
+
+@pytest.fixture(autouse=True)
+def _clear_local_cache():
+    middleware._local_shops.clear()
+    middleware._unknown_tokens.clear()
+    yield
+    middleware._local_shops.clear()
+    middleware._unknown_tokens.clear()
+
+
+class TestShopCache:
+    """Per-process cache in front of Redis in front of the DB."""
+
+    async def test_miss_loads_from_db_and_backfills(self, mock_redis):
+        shop = _shop()
+        db = _db_returning(shop)
+
+        snapshot = await get_cached_shop_by_token(db, mock_redis, BOT_TOKEN)
+
+        assert snapshot["id"] == str(shop.id)
+        assert snapshot["shop_config"]["shop_name"] == "Test Shop"
+        db.execute.assert_awaited_once()
+        mock_redis.set.assert_awaited_once()
+
+    async def test_repeat_lookup_skips_redis_and_db(self, mock_redis):
+        db = _db_returning(_shop())
+        await get_cached_shop_by_token(db, mock_redis, BOT_TOKEN)
+
+        await get_cached_shop_by_token(db, mock_redis, BOT_TOKEN)
+
+        assert db.execute.await_count == 1
+        assert mock_redis.get.await_count == 1
+
+    async def test_redis_hit_skips_db(self, mock_redis):
+        mock_redis.get = AsyncMock(return_value=orjson.dumps(shop_snapshot(_shop())))
+        db = _db_returning(None)
+
+        snapshot = await get_cached_shop_by_token(db, mock_redis, BOT_TOKEN)
+
+        assert snapshot["owner_telegram_id"] == 42
+        db.execute.assert_not_awaited()
+
+    async def test_unknown_token_not_cached(self, mock_redis):
+        db = _db_returning(None)
+
+        assert await get_cached_shop_by_token(db, mock_redis, BOT_TOKEN) is None
+        mock_redis.set.assert_not_awaited()
+
+    async def test_unknown_token_answered_from_memory(self, mock_redis):
+        db = _db_returning(None)
+        await get_cached_shop_by_token(db, mock_redis, BOT_TOKEN)
+
+        assert await get_cached_shop_by_token(db, mock_redis, BOT_TOKEN) is None
+        assert db.execute.await_count == 1
+        assert mock_redis.get.await_count == 1
+
+    async def test_forget_unknown_token_allows_lookup(self, mock_redis):
+        db = _db_returning(None)
+        await get_cached_shop_by_token(db, mock_redis, BOT_TOKEN)
+        db.execute.return_value.scalar_one_or_none.return_value = _shop()
+
+        forget_unknown_token(BOT_TOKEN)
+        snapshot = await get_cached_shop_by_token(db, mock_redis, BOT_TOKEN)
+
+        assert snapshot["owner_telegram_id"] == 42
+
+    async def test_invalidate_drops_both_layers(self, mock_redis):
+        shop = _shop()
+        db = _db_returning(shop)
+        await get_cached_shop_by_token(db, mock_redis, BOT_TOKEN)
+
+        await invalidate_shop_cache(mock_redis, shop)
+        await get_cached_shop_by_token(db, mock_redis, BOT_TOKEN)
+
+        mock_redis.delete.assert_awaited_once()
+        assert db.execute.await_count == 2
+
+    async def test_invalidate_deletes_again_after_delay(self, mock_redis, monkeypatch):
+        monkeypatch.setattr(middleware, "SHOP_CACHE_REDELETE_DELAY", 0)
+
+        await invalidate_shop_cache(mock_redis, _shop())
+        await asyncio.gather(*middleware._pending_redeletes)
+
+        assert mock_redis.delete.await_count == 2
+
+    def test_token_not_in_cache_key(self):
+        assert BOT_TOKEN not in middleware._token_key(BOT_TOKEN)
+
+    def test_bot_token_not_in_snapshot(self):
+        assert BOT_TOKEN not in orjson.dumps(shop_snapshot(_shop())).decode()
@@ -2,6 +2,7 @@
 
 import json
 import uuid
+from unittest.mock import AsyncMock
 
 import pytest
 
@@ -111,3 +112,41 @@ class TestSessionManager:
     async def test_delete(self, session_manager, mock_redis):
         await session_manager.delete("shop-1", "user-1")
         mock_redis.delete.assert_called_once_with("session:shop-1:user-1")
+
+    @pytest.mark.asyncio
+    async def test_burst_reuses_saved_session(self, session_manager, mock_redis):
+        state = SessionState(conversation_id="conv-1", shop_id="shop-1")
+        mock_redis.mget = AsyncMock(return_value=[state.model_dump_json(), None])
+        await session_manager.get_with_mode("shop-1", "user-1")
+        state.messages_count = 5
+        await session_manager.save("shop-1", "user-1", state)
+
+        cached, human = await session_manager.get_with_mode("shop-1", "user-1")
+
+        assert mock_redis.mget.await_count == 1
+        assert cached.messages_count == 5
+        assert human is False
+
+    @pytest.mark.asyncio
+    async def test_takeover_drops_cached_session(self, session_manager, mock_redis):
+        state = SessionState(conversation_id="conv-1", shop_id="shop-1")
+        mock_redis.mget = AsyncMock(return_value=[state.model_dump_json(), None])
+        await session_manager.get_with_mode("shop-1", "user-1")
+
+        await session_manager.set_human_mode("shop-1", "user-1", "conv-1", human=True)
+        mock_redis.mget = AsyncMock(return_value=[state.model_dump_json(), "conv-1"])
+        _, human = await session_manager.get_with_mode("shop-1", "user-1")
+
+        assert human is True
+
+    @pytest.mark.asyncio
+    async def test_restore_human_modes_pipelines_flags(self, session_manager, mock_redis):
+        await session_manager.restore_human_modes([
+            ("shop-1", "user-1", "conv-1"),
+            ("shop-1", "user-2", "conv-2"),
+        ])
+
+        pipe = mock_redis.pipeline.return_value
+        pipe.set.assert_any_call("session_human:shop-1:user-2", "conv-2", ex=session_manager.ttl)
+        assert pipe.set.call_count == 2
+        pipe.execute.assert_awaited_once()